@@ -3,7 +3,8 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from auth.models import User
-from database.db import get_session, get_student_by_id, add_student, get_unique_classes_sorted
+from database.db import get_session, get_student_by_id, get_unique_classes_sorted, invalidate_subject_cache, invalidate_class_cache
+from database.db import add_student as add_student_to_db
 from database.models import Subject, ClassProfile, Student
 from auth.routes import admin_required
 
@@ -21,11 +22,9 @@ def dashboard():
 @admin_bp.route('/students')
 @admin_required
 def students():
-    """Страница управления учениками"""
-    session = get_session()
-    students = session.query(Student).all()  # Запрашиваем правильную модель Student
-    session.close()
-    return render_template('admin/students.html', students=students)
+    """Страница управления учениками (список загружается постранично через /api/students)"""
+    classes = get_unique_classes_sorted()
+    return render_template('admin/students.html', classes=classes)
 
 @admin_bp.route('/subjects')
 @admin_required
@@ -36,6 +35,80 @@ def subjects():
     session.close()
     return render_template('admin/subjects.html', subjects=subjects)
 
+@admin_bp.route('/add_subject', methods=['POST'])
+@admin_required
+def add_subject():
+    """Добавление нового предмета"""
+    name = (request.form.get('name') or '').strip()
+    
+    if not name:
+        return jsonify({'success': False, 'message': 'Введите название предмета'})
+    
+    session = get_session()
+    
+    try:
+        subject = Subject(name=name)
+        session.add(subject)
+        session.commit()
+        invalidate_subject_cache()
+        return jsonify({'success': True, 'message': 'Предмет успешно добавлен', 'id': subject.id})
+    except Exception as e:
+        session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при добавлении предмета: {str(e)}'})
+    finally:
+        session.close()
+
+@admin_bp.route('/update_subject', methods=['POST'])
+@admin_required
+def update_subject():
+    """Переименование предмета"""
+    subject_id = request.form.get('subject_id')
+    name = (request.form.get('name') or '').strip()
+    
+    if not subject_id or not name:
+        return jsonify({'success': False, 'message': 'Заполните все обязательные поля'})
+    
+    session = get_session()
+    subject = session.query(Subject).filter_by(id=subject_id).first()
+    
+    if not subject:
+        session.close()
+        return jsonify({'success': False, 'message': 'Предмет не найден'})
+    
+    try:
+        subject.name = name
+        session.commit()
+        invalidate_subject_cache()
+        return jsonify({'success': True, 'message': 'Предмет успешно обновлен'})
+    except Exception as e:
+        session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при обновлении предмета: {str(e)}'})
+    finally:
+        session.close()
+
+@admin_bp.route('/delete_subject/<int:subject_id>', methods=['POST'])
+@admin_required
+def delete_subject(subject_id):
+    """Удаление предмета"""
+    session = get_session()
+    subject = session.query(Subject).filter_by(id=subject_id).first()
+    
+    if not subject:
+        session.close()
+        return jsonify({'success': False, 'message': 'Предмет не найден'})
+    
+    try:
+        session.delete(subject)
+        session.commit()
+        invalidate_subject_cache()
+        return jsonify({'success': True, 'message': 'Предмет успешно удален'})
+    except Exception as e:
+        # Предмет, используемый в уведомлениях или профилях классов, удалить нельзя
+        session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при удалении предмета: {str(e)}'})
+    finally:
+        session.close()
+
 @admin_bp.route('/class_profiles')
 @admin_required
 def class_profiles():
@@ -101,7 +174,7 @@ def add_student():
         return jsonify({'success': False, 'message': 'Заполните все обязательные поля'})
     
     try:
-        student_id = add_student(full_name, class_name)
+        student_id = add_student_to_db(full_name, class_name)
         return jsonify({'success': True, 'message': 'Ученик успешно добавлен', 'id': student_id})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Ошибка при добавлении ученика: {str(e)}'})
@@ -179,6 +252,7 @@ def update_student():
         student.full_name = full_name
         student.class_name = class_name
         session.commit()
+        invalidate_class_cache()
         return jsonify({'success': True, 'message': 'Данные ученика успешно обновлены'})
     except Exception as e:
         session.rollback()
@@ -189,7 +263,13 @@ def update_student():
 @admin_bp.route('/delete_student/<int:student_id>', methods=['POST'])
 @admin_required
 def delete_student(student_id):
-    """Удаление ученика"""
+    """
+    Удаление ученика.
+    
+    Если у ученика есть уведомления, удаление выполняется только с подтверждением
+    (параметр with_notifications=1): уведомления удаляются вместе с учеником.
+    """
+    from database.models import Notification, NotificationSubject, NotificationMeta, NotificationConsultation, DeadlineDate
     session = get_session()
     student = session.query(Student).filter_by(id=student_id).first()
     
@@ -197,9 +277,29 @@ def delete_student(student_id):
         session.close()
         return jsonify({'success': False, 'message': 'Ученик не найден'})
     
+    notifications_count = session.query(Notification).filter_by(student_id=student_id).count()
+    if notifications_count and request.values.get('with_notifications') != '1':
+        session.close()
+        return jsonify({
+            'success': False,
+            'requires_confirmation': True,
+            'notifications_count': notifications_count,
+            'message': f'У ученика есть уведомления ({notifications_count}). '
+                       f'Они будут удалены вместе с учеником, история уведомлений будет потеряна.'
+        })
+    
     try:
+        # Удаляем уведомления ученика и связанные с ними записи
+        # (внешние ключи в SQLite включены, поэтому порядок важен)
+        notification_ids = session.query(Notification.id).filter_by(student_id=student_id)
+        
+        for model in (NotificationConsultation, NotificationMeta, NotificationSubject, DeadlineDate):
+            session.query(model).filter(model.notification_id.in_(notification_ids)).delete(synchronize_session=False)
+        session.query(Notification).filter_by(student_id=student_id).delete(synchronize_session=False)
+        
         session.delete(student)
         session.commit()
+        invalidate_class_cache()
         return jsonify({'success': True, 'message': 'Ученик успешно удален'})
     except Exception as e:
         session.rollback()
@@ -216,7 +316,7 @@ def delete_all_students():
     
     try:
         # Удаляем все уведомления и связанные с ними записи
-        from database.models import Notification, NotificationSubject, NotificationMeta, NotificationConsultation
+        from database.models import Notification, NotificationSubject, NotificationMeta, NotificationConsultation, DeadlineDate
         
         # Удаляем связанные записи консультаций
         session.query(NotificationConsultation).delete()
@@ -227,6 +327,9 @@ def delete_all_students():
         # Удаляем связанные записи предметов уведомлений
         session.query(NotificationSubject).delete()
         
+        # Удаляем сроки ликвидации задолженностей
+        session.query(DeadlineDate).delete()
+        
         # Удаляем уведомления
         session.query(Notification).delete()
         
@@ -234,6 +337,7 @@ def delete_all_students():
         session.query(Student).delete()
         
         session.commit()
+        invalidate_class_cache()
         return jsonify({'success': True, 'message': 'Все ученики успешно удалены'})
     except Exception as e:
         session.rollback()
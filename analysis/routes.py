@@ -1,15 +1,45 @@
-from flask import Blueprint, render_template, request, jsonify, session, send_file, flash, redirect, url_for
+from flask import Blueprint, Request, render_template, request, jsonify, session, send_file, flash, redirect, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import MultipartDecoder, NEED_DATA, Data, Epilogue, Field, File
 from werkzeug.utils import secure_filename
+import logging
 import os
-import json
 import pandas as pd
 import re
-from utils.excel_analyzer import analyze_excel_files, save_results_to_csv, extract_file_dates  # Добавлен extract_file_dates
-from database.db import get_session, get_student_by_name, add_student, get_subject_by_name, create_notification, get_unique_classes_sorted, get_students_by_class_sorted
-from database.models import AnalysisSession  # Добавлен импорт модели AnalysisSession
+import shutil
+import zipfile
+from config import get_config
+from utils.excel_analyzer import (analyze_report_files, list_report_sources, list_archive_reports, save_results_to_csv,
+                                  slowest_files, split_appended_files, summarize_by_class,
+                                  WHOLE_SCHOOL_CLASS_NAME)
+from database.db import (get_session, resolve_subjects, create_notification,
+                         get_unique_classes_sorted, get_students_by_class_sorted,
+                         save_analysis_results, get_analysis_results, get_analysis_students,
+                         get_or_create_student_ids, replace_student_analysis_results, get_analysis_files,
+                         get_analysis_job, fail_unfinished_analysis_jobs)
+from utils.analysis_jobs import ReportQueue, submit_analysis_job
+from database.models import AnalysisSession, class_sort_key  # Добавлен импорт модели AnalysisSession
 import uuid
 
 analysis_bp = Blueprint('analysis', __name__, url_prefix='/analysis')
+logger = logging.getLogger(__name__)
+
+# Размер блока, которым читается тело запроса загрузки
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Маршруты загрузки отчетов, принимающие ZIP-архивы
+ARCHIVE_UPLOAD_ENDPOINTS = {'analysis.upload_files', 'analysis.append_files'}
+
+class AnalysisUploadRequest(Request):
+    """
+    Запрос приложения: для маршрутов загрузки отчетов предел размера тела -
+    MAX_ARCHIVE_CONTENT_LENGTH, для остальных - общий MAX_CONTENT_LENGTH приложения.
+    """
+    @property
+    def max_content_length(self):
+        if self.endpoint in ARCHIVE_UPLOAD_ENDPOINTS:
+            return get_config()['MAX_ARCHIVE_CONTENT_LENGTH']
+        return super().max_content_length
 
 # Убедимся, что папки для временных файлов существуют
 os.makedirs('uploads/excel_files', exist_ok=True)
@@ -44,130 +74,362 @@ def index():
     
     return render_template('analysis/index.html', 
                            classes=classes,
-                           sessions_by_class=sessions_by_class)
+                           sessions_by_class=sessions_by_class,
+                           whole_school=WHOLE_SCHOOL_CLASS_NAME)
+def _get_analysis_session(session_id):
+    """Возвращает сессию анализа из базы данных или None"""
+    db_session = get_session()
+    analysis_session = db_session.get(AnalysisSession, session_id)
+    db_session.close()
+    return analysis_session
+
+def _is_current_session(session_id):
+    """Проверяет, что сессия анализа открыта в текущей сессии пользователя"""
+    return session.get('analysis_session_id') == str(session_id)
+
+def _ensure_results_saved(analysis_session):
+    """Анализирует файлы сессий, созданных до хранения результатов в базе данных"""
+    if analysis_session.results_count is None:
+        analysis = analyze_report_files(list_report_sources(analysis_session.folder_path),
+                                        analysis_session.class_name)
+        save_analysis_results(analysis_session.id, analysis['problems'], analysis['files'])
+
 @analysis_bp.route('/session/<int:session_id>')
 def view_session(session_id):
     """View existing analysis session"""
-    db_session = get_session()
-    analysis_session = db_session.query(AnalysisSession).get(session_id)
+    analysis_session = _get_analysis_session(session_id)
     
     if not analysis_session:
         flash('Analysis session not found', 'danger')
         return redirect(url_for('analysis.index'))
     
-    # Set session variables for compatibility with existing code
+    # Результаты уже сохранены в базе данных, повторный анализ не нужен
+    _ensure_results_saved(analysis_session)
     session['analysis_session_id'] = str(analysis_session.id)
-    session['analysis_class_name'] = analysis_session.class_name
     
-    # Rerun analysis or load cached results
-    results = analyze_excel_files(analysis_session.folder_path, analysis_session.class_name)
-    session['analysis_results'] = json.dumps(results)
+    return redirect(url_for('analysis.analyze', session_id=analysis_session.id))
+
+def _is_archive(filename):
+    """Загруженный файл - ZIP-архив с отчетами"""
+    return filename.lower().endswith('.zip')
+
+def _check_upload_size(with_archive):
+    """
+    Проверяет размер загрузки: MAX_ARCHIVE_CONTENT_LENGTH для загрузки с архивом,
+    MAX_CONTENT_LENGTH - для отдельных файлов. Возвращает сообщение об ошибке или None.
+    """
+    config = get_config()
+    limit = config['MAX_ARCHIVE_CONTENT_LENGTH'] if with_archive else config['MAX_CONTENT_LENGTH']
+    if request.content_length and request.content_length > limit:
+        return _size_limit_message(limit)
+    return None
+
+def _size_limit_message(limit):
+    return f'Размер загрузки превышает {limit // (1024 * 1024)} МБ'
+
+def _unique_upload_path(folder_path, filename):
+    """Безопасное имя загруженного файла и путь к нему в папке сессии с уникальным суффиксом"""
+    original_filename = secure_filename(filename)
+    
+    # Добавляем уникальный идентификатор к имени файла
+    file_uuid = uuid.uuid4().hex[:8]  # 8 символов будет достаточно
+    base, ext = os.path.splitext(original_filename)
+    return original_filename, os.path.join(folder_path, f"{base}_{file_uuid}{ext}")
+
+def _check_archive(file_path, original_filename):
+    """Удаляет загруженный файл .zip, который не является ZIP-архивом, и выбрасывает ValueError"""
+    if not zipfile.is_zipfile(file_path):
+        os.remove(file_path)
+        raise ValueError(f'Файл {original_filename} не является ZIP-архивом')
+
+def _save_uploaded_files(files, folder_path):
+    """
+    Сохраняет загруженные файлы в папку сессии с уникальными именами.
+    ZIP-архив сохраняется целиком: отчеты читаются из него при разборе, без распаковки.
+    """
+    file_paths = []
+    logger.info("Загрузка %d файлов в папку %s", len(files), folder_path)
     
-    db_session.close()
+    for index, file in enumerate(files, 1):
+        if file.filename == '':
+            continue
+        
+        original_filename, file_path = _unique_upload_path(folder_path, file.filename)
+        file.save(file_path)
+        if _is_archive(file.filename):
+            _check_archive(file_path, original_filename)
+        file_paths.append(file_path)
+        
+        logger.info("Сохранение файла %d/%d: %s → %s", index, len(files), original_filename, os.path.basename(file_path))
     
-    return redirect(url_for('analysis.analyze', session_id=str(analysis_session.id)))
+    return file_paths
+
+def _remove_session_files(folder_path, file_names):
+    """
+    Удаляет файлы из папки сессии, чтобы повторный анализ папки их не учитывал.
+    Отчеты внутри ZIP-архивов остаются в архиве.
+    """
+    for file_name in file_names:
+        try:
+            os.remove(os.path.join(folder_path, file_name))
+        except FileNotFoundError:
+            pass
+
+def _discard_upload(folder_path, reports, message):
+    """Прерывает задачу анализа загрузки и удаляет папку сессии с уже принятыми файлами"""
+    if reports is not None:
+        reports.abort(message)
+    shutil.rmtree(folder_path, ignore_errors=True)
+
+def _iter_upload_parts(folder_path, plain_limit):
+    """
+    Читает тело multipart-запроса блоками по мере поступления и сохраняет файлы в папку сессии.
+    
+    Выдает (имя поля, значение, None) для полей формы и (имя поля, исходное имя файла, путь)
+    для файлов сразу после приема каждой части, не дожидаясь конца запроса.
+    Пока в запросе не встретился ZIP-архив, принятый объем ограничен plain_limit:
+    при превышении выбрасывается RequestEntityTooLarge, не дочитывая запрос.
+    """
+    boundary = request.mimetype_params.get('boundary', '').encode('latin-1')
+    decoder = MultipartDecoder(boundary)
+    part, value, output, file_path = None, bytearray(), None, None
+    received, has_archive = 0, False
+    
+    try:
+        while True:
+            try:
+                event = decoder.next_event()
+            except ValueError:
+                raise ValueError('Запрос загрузки поврежден или оборван')
+            
+            if event is NEED_DATA:
+                try:
+                    chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+                except RequestEntityTooLarge:
+                    # Тело без Content-Length превысило общий предел запроса
+                    raise RequestEntityTooLarge(_size_limit_message(request.max_content_length))
+                received += len(chunk)
+                if not has_archive and received > plain_limit:
+                    raise RequestEntityTooLarge(_size_limit_message(plain_limit))
+                decoder.receive_data(chunk or None)
+            elif isinstance(event, Epilogue):
+                return
+            elif isinstance(event, (Field, File)):
+                part, value = event, bytearray()
+                if isinstance(event, File) and event.filename:
+                    has_archive = has_archive or _is_archive(event.filename)
+                    original_filename, file_path = _unique_upload_path(folder_path, event.filename)
+                    output = open(file_path, 'wb')
+            elif isinstance(event, Data):
+                if output is not None:
+                    output.write(event.data)
+                elif isinstance(part, Field):
+                    value += event.data
+                if event.more_data:
+                    continue
+                
+                if isinstance(part, Field):
+                    yield part.name, value.decode('utf-8'), None
+                elif output is not None:
+                    output.close()
+                    output = None
+                    if _is_archive(part.filename):
+                        _check_archive(file_path, original_filename)
+                    logger.info("Сохранение файла: %s → %s", original_filename, os.path.basename(file_path))
+                    yield part.name, original_filename, file_path
+    finally:
+        if output is not None:
+            output.close()
 
 @analysis_bp.route('/upload', methods=['POST'])
 def upload_files():
-    """Загрузка Excel-файлов для анализа"""
-    if 'files[]' not in request.files:
+    """
+    Загрузка Excel-файлов для анализа.
+    
+    Тело запроса читается потоково: каждый принятый файл сразу передается задаче анализа
+    через очередь, и отчеты разбираются, пока остальные файлы еще загружаются.
+    """
+    if request.mimetype != 'multipart/form-data':
         return jsonify({'success': False, 'message': 'Не выбраны файлы'})
     
-    files = request.files.getlist('files[]')
-    class_name = request.form.get('class_name', '')
+    size_error = _check_upload_size(with_archive=True)
+    if size_error:
+        return jsonify({'success': False, 'message': size_error}), 413
     
     # Создаем уникальную папку для этой сессии
-    import uuid
-    session_id = str(uuid.uuid4())
-    session['analysis_session_id'] = session_id
-    
-    folder_path = os.path.join('uploads', 'excel_files', session_id)
+    folder_path = os.path.join('uploads', 'excel_files', str(uuid.uuid4()))
     os.makedirs(folder_path, exist_ok=True)
     
-    # Сохраняем все файлы с уникальными именами
+    # Класс обычно приходит полем формы перед файлами; до его получения отчеты копятся в pending
+    class_name = request.args.get('class_name')
+    reports, pending = None, []
+    job_id = None
     file_paths = []
-    print(f"Загрузка {len(files)} файлов в папку {folder_path}")
     
-    for index, file in enumerate(files, 1):
-        if file.filename == '':
-            continue
-        
-        # Получаем безопасное имя файла
-        original_filename = secure_filename(file.filename)
-        
-        # Добавляем уникальный идентификатор к имени файла
-        file_uuid = uuid.uuid4().hex[:8]  # 8 символов будет достаточно
-        base, ext = os.path.splitext(original_filename)
-        unique_filename = f"{base}_{file_uuid}{ext}"
-        
-        file_path = os.path.join(folder_path, unique_filename)
-        file.save(file_path)
-        file_paths.append(file_path)
-        
-        print(f"Сохранение файла {index}/{len(files)}: {original_filename} → {unique_filename}")
+    try:
+        # Отдельные файлы ограничены MAX_CONTENT_LENGTH, загрузка с архивом - MAX_ARCHIVE_CONTENT_LENGTH
+        for name, value, file_path in _iter_upload_parts(folder_path, get_config()['MAX_CONTENT_LENGTH']):
+            if file_path is None:
+                if name == 'class_name':
+                    class_name = value
+                continue
+            if name != 'files[]':
+                continue
+            
+            file_paths.append(file_path)
+            if _is_archive(value):
+                pending.extend(list_archive_reports(file_path))
+            else:
+                pending.append(file_path)
+            
+            if class_name is not None:
+                if reports is None:
+                    # Анализ начинается с первого принятого файла
+                    reports = ReportQueue()
+                    job_id = submit_analysis_job(class_name, folder_path, reports)
+                for source in pending:
+                    reports.put(source)
+                pending = []
+    except RequestEntityTooLarge as e:
+        _discard_upload(folder_path, reports, e.description)
+        return jsonify({'success': False, 'message': e.description}), 413
+    except ValueError as e:
+        _discard_upload(folder_path, reports, str(e))
+        return jsonify({'success': False, 'message': str(e)})
+    except Exception:
+        _discard_upload(folder_path, reports, 'Загрузка файлов прервана')
+        raise
     
     if not file_paths:
+        _discard_upload(folder_path, reports, 'Не загружено ни одного файла')
         return jsonify({'success': False, 'message': 'Не загружено ни одного файла'})
     
-    # Сохраняем класс в сессии для дальнейшего использования
-    session['analysis_class_name'] = class_name
-    
-    # Выполняем анализ сразу здесь для ускорения процесса
-    results = analyze_excel_files(folder_path, class_name)
-    earliest_date, latest_date = extract_file_dates(folder_path)
-    
-    # Store analysis session in database
-    session_db = get_session()
-    analysis_session = AnalysisSession(
-        class_name=class_name,
-        folder_path=folder_path,
-        earliest_date=earliest_date,
-        latest_date=latest_date
-    )
-    session_db.add(analysis_session)
-    session_db.commit()
-    session_db.close()
-    # Сохраняем результаты в сессии
-    session['analysis_results'] = json.dumps(results)
+    if reports is None:
+        reports = ReportQueue()
+        job_id = submit_analysis_job(class_name or '', folder_path, reports)
+    for source in pending:
+        reports.put(source)
+    reports.close()
+    
+    # Анализ выполняется в фоне, ход выполнения страница получает через analysis.job_status
+    session['analysis_job_id'] = str(job_id)
     
     return jsonify({
         'success': True, 
-        'message': f'Загружено {len(file_paths)} файлов', 
+        'message': f'Загружено {len(file_paths)} файлов, выполняется анализ',
+        'job_id': job_id,
+        'status_url': url_for('analysis.job_status', job_id=job_id)
+    })
+
+@analysis_bp.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    """Состояние фоновой задачи анализа (опрашивается страницей загрузки)"""
+    job = get_analysis_job(job_id) if session.get('analysis_job_id') == str(job_id) else None
+    if not job:
+        return jsonify({'success': False, 'message': 'Задача анализа не найдена'})
+    
+    response = {
+        'success': True,
+        'status': job['status'],
+        'total_files': job['total_files'],
+        'processed_files': job['processed_files'],
+        'message': job['message'],
+        'errors': job['errors']
+    }
+    if job['status'] == 'done':
+        # Результаты готовы - открываем сессию анализа для пользователя
+        session['analysis_session_id'] = str(job['session_id'])
+        response['session_id'] = job['session_id']
+        response['redirect'] = url_for('analysis.analyze', session_id=job['session_id'])
+    
+    return jsonify(response)
+
+@analysis_bp.route('/session/<int:session_id>/append', methods=['POST'])
+def append_files(session_id):
+    """Добавление файлов в существующую сессию анализа без повторного разбора старых файлов"""
+    analysis_session = _get_analysis_session(session_id) if _is_current_session(session_id) else None
+    if not analysis_session:
+        return jsonify({'success': False, 'message': 'Сессия анализа не найдена или истекла'})
+    
+    if 'files[]' not in request.files:
+        return jsonify({'success': False, 'message': 'Не выбраны файлы'})
+    
+    files = request.files.getlist('files[]')
+    size_error = _check_upload_size(any(_is_archive(file.filename) for file in files))
+    if size_error:
+        return jsonify({'success': False, 'message': size_error}), 413
+    
+    _ensure_results_saved(analysis_session)
+    
+    try:
+        file_paths = _save_uploaded_files(files, analysis_session.folder_path)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    if not file_paths:
+        return jsonify({'success': False, 'message': 'Не загружено ни одного файла'})
+    
+    # Разбираем только новые файлы, отчеты из архивов - без распаковки
+    sources = [source for file_path in file_paths
+               for source in (list_archive_reports(file_path) if _is_archive(file_path) else [file_path])]
+    analysis = analyze_report_files(sources, analysis_session.class_name)
+    
+    # Ученик с более новым файлом получает результаты нового файла,
+    # файлы старше уже сохраненных в сессию не попадают
+    accepted, superseded = split_appended_files(get_analysis_files(session_id), analysis['files'])
+    accepted_students = {file['student_name'] for file in accepted}
+    problems = [problem for problem in analysis['problems'] if problem['ФИО ученика'] in accepted_students]
+    
+    replaced = replace_student_analysis_results(session_id, problems, accepted) if accepted else []
+    _remove_session_files(analysis_session.folder_path,
+                          replaced + [file['file'] for file in superseded])
+    
+    message = f'Добавлено {len(accepted)} файлов из {len(sources)}'
+    if superseded:
+        message += f", устарели: {', '.join(file['file'] for file in superseded)}"
+    if analysis['errors']:
+        message += f", не удалось разобрать: {', '.join(error['file'] for error in analysis['errors'])}"
+    
+    return jsonify({
+        'success': True,
+        'message': message,
+        'errors': analysis['errors'],
+        'replaced': replaced,
+        'superseded': [file['file'] for file in superseded],
         'session_id': session_id,
         'redirect': url_for('analysis.analyze', session_id=session_id)
     })
 
-@analysis_bp.route('/analyze/<session_id>')
+@analysis_bp.route('/analyze/<int:session_id>')
 def analyze(session_id):
     """Анализ загруженных файлов"""
-    if 'analysis_session_id' not in session or session['analysis_session_id'] != session_id:
+    analysis_session = _get_analysis_session(session_id) if _is_current_session(session_id) else None
+    if not analysis_session:
         flash('Сессия анализа не найдена или истекла', 'danger')
         return redirect(url_for('analysis.index'))
     
-    # Получаем класс из сессии
-    class_name = session.get('analysis_class_name', '')
-    
-    # Путь к папке с файлами
-    folder_path = os.path.join('uploads', 'excel_files', session_id)
-    
-    if not os.path.exists(folder_path):
-        flash('Файлы не найдены', 'danger')
-        return redirect(url_for('analysis.index'))
+    class_name = analysis_session.class_name
     
-    # Анализируем файлы или получаем результаты из сессии
     try:
-        if 'analysis_results' in session:
-            results = json.loads(session['analysis_results'])
-        else:
-            results = analyze_excel_files(folder_path, class_name)
-            session['analysis_results'] = json.dumps(results)
+        _ensure_results_saved(analysis_session)
+        results = get_analysis_results(session_id)
         
         if not results:
             flash('Не найдено проблем с успеваемостью в загруженных файлах', 'info')
             return render_template('analysis/no_results.html')
         
-        # Получаем полный список учеников этого класса
-        all_students = get_students_by_class_sorted(class_name) if class_name else []
+        if class_name == WHOLE_SCHOOL_CLASS_NAME:
+            # Для всей школы в таблице только ученики с проблемами, по классам
+            all_students = [{'full_name': name} for name in dict.fromkeys(
+                item['ФИО ученика'] for item in sorted(results, key=lambda item: class_sort_key(item['Класс']))
+            )]
+        else:
+            # Получаем полный список учеников этого класса
+            all_students = get_students_by_class_sorted(class_name) if class_name else []
+        
+        # Сводка по классам показывается, если в сессии отчеты нескольких классов
+        files = get_analysis_files(session_id)
+        class_breakdown = summarize_by_class(results, files)
+        slow_files = slowest_files(files, get_config()['ANALYSIS_SLOWEST_FILES'])
         
         # Группируем результаты по ученикам для удобного отображения
         students = {}
@@ -191,26 +453,27 @@ def analyze(session_id):
         return render_template('analysis/results.html', 
                               students=students, 
                               all_students=all_students,
+                              class_name=class_name,
+                              class_breakdown=class_breakdown if len(class_breakdown) > 1 else [],
+                              slow_files=slow_files,
                               session_id=session_id)
     
     except Exception as e:
         flash(f'Ошибка при анализе файлов: {str(e)}', 'danger')
         return redirect(url_for('analysis.index'))
     
-@analysis_bp.route('/download/<session_id>')
+@analysis_bp.route('/download/<int:session_id>')
 def download_results(session_id):
     """Скачивание результатов анализа в CSV"""
-    if 'analysis_session_id' not in session or session['analysis_session_id'] != session_id:
+    if not _is_current_session(session_id):
         flash('Сессия анализа не найдена или истекла', 'danger')
         return redirect(url_for('analysis.index'))
     
-    if 'analysis_results' not in session:
+    results = get_analysis_results(session_id)
+    if not results:
         flash('Результаты анализа не найдены', 'danger')
         return redirect(url_for('analysis.index'))
     
-    # Извлекаем результаты из сессии
-    results = json.loads(session['analysis_results'])
-    
     # Путь для сохранения CSV
     output_path = os.path.join('temp', f'results_{session_id}.csv')
     
@@ -219,72 +482,59 @@ def download_results(session_id):
     
     return send_file(output_path, as_attachment=True, download_name='students_with_problems.csv')
 
-@analysis_bp.route('/get_student_data/<student_name>/<session_id>')
+def _student_prefill(session_id, student_names):
+    """
+    Данные для предзаполнения формы уведомления по сводкам учеников сессии.
+    Ученики, которых нет в базе, добавляются; ФИО без результатов в словарь не попадают.
+    """
+    students = get_analysis_students(session_id, student_names)
+    student_ids = get_or_create_student_ids({
+        name: student['student_class'] for name, student in students.items()
+    }) if students else {}
+    
+    for name, student in students.items():
+        student['student_id'] = student_ids[name]
+    return students
+
+@analysis_bp.route('/get_student_data/<student_name>/<int:session_id>')
 def get_student_data(student_name, session_id):
     """Получение данных ученика для предзаполнения формы уведомления"""
-    if 'analysis_session_id' not in session or session['analysis_session_id'] != session_id:
+    if not _is_current_session(session_id):
         return jsonify({'success': False, 'message': 'Сессия анализа не найдена или истекла'})
     
-    if 'analysis_results' not in session:
-        return jsonify({'success': False, 'message': 'Результаты анализа не найдены'})
-    
-    # Получаем данные из сессии
-    results = json.loads(session['analysis_results'])
+    # Сводка ученика сохранена вместе с результатами анализа
+    student = _student_prefill(session_id, [student_name]).get(student_name)
     
-    # Фильтруем результаты для указанного ученика
-    student_results = [r for r in results if r['ФИО ученика'] == student_name]
-    
-    if not student_results:
+    if not student:
         return jsonify({'success': False, 'message': 'Не найдено результатов для указанного ученика'})
     
-    # Получаем класс ученика из результатов
-    student_class = student_results[0].get('Класс', '')
-    
-    # Получаем ученика из базы данных или создаем нового
-    db_session = get_session()
-    student = get_student_by_name(student_name)
+    return jsonify({'success': True, **student})
+
+@analysis_bp.route('/student_data/<int:session_id>', methods=['POST'])
+def get_students_data(session_id):
+    """Данные нескольких учеников для предзаполнения форм уведомлений одним запросом"""
+    if not _is_current_session(session_id):
+        return jsonify({'success': False, 'message': 'Сессия анализа не найдена или истекла'})
     
-    if not student:
-        # Если ученика нет, добавляем его
-        student_id = add_student(student_name, student_class)
-    else:
-        student_id = student.id
-    
-    # Получаем списки предметов с проблемами
-    failed_subjects = []
-    satisfactory_subjects = []
-    
-    for result in student_results:
-        subject_name = result['Предмет']
-        problem_type = result['Тип проблемы']
-        
-        if 'Задолженность' in problem_type:
-            if subject_name not in failed_subjects:
-                failed_subjects.append(subject_name)
-        elif problem_type == 'Тройка':
-            if subject_name not in satisfactory_subjects:
-                satisfactory_subjects.append(subject_name)
+    data = request.get_json(silent=True) or {}
+    student_names = data.get('student_names')
+    if not isinstance(student_names, list) or not all(isinstance(name, str) for name in student_names):
+        return jsonify({'success': False, 'message': 'Ожидается список ФИО учеников в поле student_names'})
     
-    db_session.close()
+    students = _student_prefill(session_id, student_names)
     
     return jsonify({
         'success': True,
-        'student_id': student_id,
-        'student_name': student_name,
-        'student_class': student_class,
-        'failed_subjects': failed_subjects,
-        'satisfactory_subjects': satisfactory_subjects
+        'students': students,
+        'missing': [name for name in dict.fromkeys(student_names) if name not in students]
     })
 
-@analysis_bp.route('/create_notification/<session_id>', methods=['POST'])
+@analysis_bp.route('/create_notification/<int:session_id>', methods=['POST'])
 def create_notification_from_analysis(session_id):
     """Создание уведомления на основе результатов анализа"""
-    if 'analysis_session_id' not in session or session['analysis_session_id'] != session_id:
+    if not _is_current_session(session_id):
         return jsonify({'success': False, 'message': 'Сессия анализа не найдена или истекла'})
     
-    if 'analysis_results' not in session:
-        return jsonify({'success': False, 'message': 'Результаты анализа не найдены'})
-    
     student_name = request.form.get('student_name')
     template_type_id = request.form.get('template_type_id', '1')  # По умолчанию 1
     period = request.form.get('period', '1')  # По умолчанию 1
@@ -292,49 +542,26 @@ def create_notification_from_analysis(session_id):
     if not student_name:
         return jsonify({'success': False, 'message': 'Не указано имя ученика'})
     
-    # Извлекаем результаты из сессии
-    results = json.loads(session['analysis_results'])
-    
-    # Фильтруем результаты для указанного ученика
-    student_results = [r for r in results if r['ФИО ученика'] == student_name]
+    # Сводка ученика: ID, предметы с задолженностями и тройками
+    student = _student_prefill(session_id, [student_name]).get(student_name)
     
-    if not student_results:
+    if not student:
         return jsonify({'success': False, 'message': 'Не найдено результатов для указанного ученика'})
     
-    # Получаем класс ученика из результатов
-    student_class = student_results[0].get('Класс', '')
+    student_id = student['student_id']
+    failed_subjects = student['failed_subjects']
+    satisfactory_subjects = student['satisfactory_subjects']
     
-    # Проверяем, есть ли ученик в базе, если нет - добавляем
-    db_session = get_session()
-    student = get_student_by_name(student_name)
-    
-    if not student:
-        # Если ученика нет, добавляем его
-        student_id = add_student(student_name, student_class)
-    else:
-        student_id = student.id
-    
-    # Собираем предметы и их типы (задолженность или тройка)
-    failed_subjects = []
-    satisfactory_subjects = []
-    
-    for result in student_results:
-        subject_name = result['Предмет']
-        problem_type = result['Тип проблемы']
-        
-        if problem_type == 'Задолженность':
-            failed_subjects.append(subject_name)
-        elif problem_type == 'Тройка':
-            satisfactory_subjects.append(subject_name)
-    
-    # Получаем ID предметов
-    failed_subject_ids = [get_subject_by_name(name) for name in failed_subjects]
-    satisfactory_subject_ids = [get_subject_by_name(name) for name in satisfactory_subjects]
+    # Получаем ID всех предметов одним обращением к кэшу предметов
+    subject_ids = resolve_subjects(failed_subjects + satisfactory_subjects)
+    failed_subject_ids = [subject_ids[name] for name in failed_subjects]
+    satisfactory_subject_ids = [subject_ids[name] for name in satisfactory_subjects]
     
     # Все предметы для уведомления
     all_subject_ids = failed_subject_ids + satisfactory_subject_ids
     
     # Создаем уведомление
+    db_session = get_session()
     try:
         notification_id = create_notification(
             student_id=student_id,
@@ -392,4 +619,7 @@ def create_notification_from_analysis(session_id):
         })
 
 def init_analysis(app):
+    # Пул задач анализа живет в процессе приложения - задачи завершившихся процессов не продолжатся
+    fail_unfinished_analysis_jobs()
+    app.request_class = AnalysisUploadRequest
     app.register_blueprint(analysis_bp)
\ No newline at end of file
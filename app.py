@@ -1,15 +1,26 @@
 # app.py
 from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file, session, flash
+import logging
 import os
 from werkzeug.utils import secure_filename
-from database.db import init_db
+from database.db import init_db, init_db_session
+from config import get_config
 from flask_session import Session
 from flask_login import current_user, login_required
 from datetime import timedelta  # Добавьте эту строку импорта
 
 app = Flask(__name__)
+
+# Журнал модулей utils (анализ отчетов); уровень задает ANALYSIS_LOG_LEVEL.
+# Записи не передаются корневому журналу, чтобы при его настройке не выводиться дважды
+utils_log_handler = logging.StreamHandler()
+utils_log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+logging.getLogger('utils').addHandler(utils_log_handler)
+logging.getLogger('utils').propagate = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 МБ максимальный размер файла
+# Предел размера запроса; загрузка отчетов с ZIP-архивом допускает MAX_ARCHIVE_CONTENT_LENGTH
+# (только для маршрутов загрузки, см. AnalysisUploadRequest в analysis/routes.py)
+app.config['MAX_CONTENT_LENGTH'] = get_config()['MAX_CONTENT_LENGTH']
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Для Flask-Login и сессий
 
 # Настройка сессий на основе файловой системы для хранения больших данных анализа
@@ -26,6 +37,7 @@ os.makedirs('flask_session', exist_ok=True)
 
 # Инициализируем базу данных
 init_db()
+init_db_session(app)
 
 # Инициализируем аутентификацию
 from auth.routes import init_auth
@@ -96,10 +108,11 @@ def submit_notification():
         if not failed_subjects and not satisfactory_subjects:
             return jsonify({'success': False, 'message': 'Выберите хотя бы один предмет с задолженностью или тройкой'})
 
-        # Получаем ID предметов
-        from database.db import get_subject_by_name
-        failed_subject_ids = [get_subject_by_name(subject) for subject in failed_subjects]
-        satisfactory_subject_ids = [get_subject_by_name(subject) for subject in satisfactory_subjects]
+        # Получаем ID всех предметов одним обращением к кэшу предметов
+        from database.db import resolve_subjects
+        subject_ids = resolve_subjects(failed_subjects + satisfactory_subjects)
+        failed_subject_ids = [subject_ids[subject] for subject in failed_subjects]
+        satisfactory_subject_ids = [subject_ids[subject] for subject in satisfactory_subjects]
 
         # Все предметы для уведомления
         all_subject_ids = failed_subject_ids + satisfactory_subject_ids
@@ -178,10 +191,9 @@ def submit_notification():
                                 time = lesson_info['start']
                                 
                                 # Сохраняем консультацию
-                                subject_id = get_subject_by_name(subject)
                                 consultation = NotificationConsultation(
                                     notification_id=notification_id,
-                                    subject_id=subject_id,
+                                    subject_id=subject_ids[subject],
                                     topic_name=topic_name,
                                     date=date,
                                     time=time,
@@ -234,11 +246,70 @@ def download_document(filename):
 
 @app.route('/api/get_students')
 def api_get_students():
-    """API для получения списка учеников"""
-    from database.db import get_all_students
-    students = get_all_students()
+    """
+    API для получения списка учеников.
+    
+    Без параметров возвращает всех учеников (для совместимости). С параметрами
+    limit/cursor возвращает одну страницу, курсор следующей - в заголовке X-Next-Cursor.
+    """
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        from database.db import get_all_students
+        students = get_all_students()
+        result = [{'id': s.id, 'full_name': s.full_name, 'class_name': s.class_name} for s in students]
+        return jsonify(result)
+    
+    page = _get_students_page_from_request()
+    if page is None:
+        return jsonify({'success': False, 'message': 'Некорректные параметры постраничной загрузки'}), 400
+    
+    students, next_cursor = page
+    response = jsonify(students)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/api/students')
+def api_students():
+    """API для постраничной загрузки учеников с фильтрами по классу и параллели"""
+    page = _get_students_page_from_request()
+    if page is None:
+        return jsonify({'success': False, 'message': 'Некорректные параметры постраничной загрузки'}), 400
+    
+    students, next_cursor = page
+    return jsonify({'students': students, 'next_cursor': next_cursor})
+
+def _get_students_page_from_request():
+    """Загружает страницу учеников по параметрам запроса; None - если параметры некорректны"""
+    from database.db import get_students_page
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+        grade = request.args.get('grade')
+        grade = int(grade) if grade else None
+        students, next_cursor = get_students_page(
+            limit=limit,
+            cursor=request.args.get('cursor') or None,
+            class_name=request.args.get('class_name') or None,
+            grade=grade
+        )
+    except ValueError:
+        return None
+    
     result = [{'id': s.id, 'full_name': s.full_name, 'class_name': s.class_name} for s in students]
-    return jsonify(result)
+    return result, next_cursor
+
+@app.route('/api/search_students')
+def api_search_students():
+    """API поиска учеников по части ФИО (для поля с автодополнением)"""
+    from database.db import search_students
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Некорректное значение limit'}), 400
+    
+    students = search_students(request.args.get('q', ''), limit=limit)
+    return jsonify([{'id': s.id, 'full_name': s.full_name, 'class_name': s.class_name} for s in students])
 
 @app.route('/api/get_unique_classes')
 def api_get_unique_classes():
@@ -293,6 +364,49 @@ def import_debts_route():
         flash('Доступ запрещен. Требуются права администратора.', 'danger')
         return redirect(url_for('create_notification'))
 
+@app.route('/import_debts_csv', methods=['POST'])
+@login_required
+def import_debts_csv():
+    """Импорт задолженностей из CSV-файла и пакетное создание уведомлений"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Доступ запрещен. Требуются права администратора.'})
+    
+    file = request.files.get('file')
+    template_type_id = request.form.get('template_type_id')
+    period = request.form.get('period')
+    dry_run = request.form.get('dry_run') == 'on'
+    
+    if not file or file.filename == '':
+        return jsonify({'success': False, 'message': 'Файл не выбран'})
+    
+    if not template_type_id or not period:
+        return jsonify({'success': False, 'message': 'Заполните все обязательные поля'})
+    
+    # Сохраняем файл во временную директорию
+    file_path = os.path.join('temp', secure_filename(file.filename))
+    file.save(file_path)
+    
+    from utils.import_export import import_debts_from_csv
+    import_result = import_debts_from_csv(file_path)
+    
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+    
+    if not import_result['success']:
+        return jsonify(import_result)
+    
+    from database.db import create_notifications_from_csv_data
+    details = create_notifications_from_csv_data(import_result['data'], template_type_id, period, dry_run=dry_run)
+    
+    if dry_run:
+        message = f'Проверка завершена: можно создать {details["success"]} уведомлений, ошибок: {details["failed"]}'
+    else:
+        message = f'Создано уведомлений: {details["success"]}, ошибок: {details["failed"]}'
+    
+    return jsonify({'success': True, 'message': message, 'details': details})
+
 # Добавьте этот метод в app.py в раздел с API-методами
 
 @app.route('/api/get_student/<int:student_id>')
@@ -1,3 +1,5 @@
+import os
+
 def get_config():
     """
     Возвращает конфигурацию приложения.
@@ -6,8 +8,34 @@ def get_config():
         'DATABASE_URL': 'sqlite:///notification_system.db',
         'UPLOAD_FOLDER': 'uploads',
         'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16 МБ максимальный размер файла
+        'MAX_ARCHIVE_CONTENT_LENGTH': 256 * 1024 * 1024,  # Максимальный размер загрузки с ZIP-архивом отчетов
         'SECRET_KEY': 'your-secret-key-here',    # Для Flask-Login и сессий
         'SESSION_TYPE': 'filesystem',
-        'SESSION_FILE_DIR': 'flask_session'
+        'SESSION_FILE_DIR': 'flask_session',
+        # Пул соединений с базой данных (один движок на процесс)
+        'DB_POOL_SIZE': 10,          # Постоянных соединений в пуле
+        'DB_MAX_OVERFLOW': 20,       # Дополнительных соединений при пиковой нагрузке
+        'DB_POOL_TIMEOUT': 30,       # Секунд ожидания свободного соединения
+        'DB_POOL_RECYCLE': 3600,     # Пересоздавать соединения старше часа
+        'DB_POOL_PRE_PING': False,   # Проверять соединение перед выдачей из пула
+        # Настройки SQLite, применяемые к каждому новому соединению
+        'SQLITE_PRAGMAS': {
+            'journal_mode': 'WAL',          # Читатели не блокируются писателем
+            'synchronous': 'NORMAL',        # В режиме WAL безопасно и быстрее FULL
+            'mmap_size': 256 * 1024 * 1024, # Отображение файла БД в память, байт
+            'cache_size': -64000,           # Кэш страниц, отрицательное значение - в КиБ
+            'busy_timeout': 5000,           # Ожидание блокировки записи, мс
+            'foreign_keys': 'ON'
+        },
+        # Анализ Excel-отчетов
+        'ANALYSIS_WORKERS': 0,       # Процессов для разбора файлов: 0 - по числу ядер, 1 - последовательно
+        'ANALYSIS_ENGINE': 'pandas', # Чтение отчетов: 'pandas' или 'openpyxl' (потоково, меньше памяти)
+        'ANALYSIS_CACHE_DIR': os.path.join('cache', 'analysis'),  # Кэш разбора файлов; None - отключен
+        'ANALYSIS_CACHE_MAX_BYTES': 256 * 1024 * 1024,           # Предельный размер кэша разбора
+        'ANALYSIS_JOB_WORKERS': 1,   # Одновременно выполняемых фоновых задач анализа; процессы разбора делятся между ними
+        'ANALYSIS_JOB_STALE_SECONDS': 600,  # Задача другого сервера без обновлений дольше - считается прерванной
+        'ANALYSIS_MAX_INFLIGHT': 16, # Отчетов, одновременно прочитанных в память и ожидающих разбора
+        'ANALYSIS_LOG_LEVEL': 'WARNING',  # Уровень журнала анализа; 'DEBUG' - время разбора каждого файла
+        'ANALYSIS_SLOWEST_FILES': 10  # Самых медленных файлов на странице результатов; 0 - не показывать
     }
-    return config
\ No newline at end of file
+    return config
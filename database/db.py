@@ -1,15 +1,105 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from .models import Base, Student, Subject, TemplateType, Notification, NotificationSubject, DeadlineDate
+from sqlalchemy import and_, create_engine, event, func, insert, select, text, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, scoped_session, joinedload, selectinload
+from .models import (Base, Student, Subject, TemplateType, Notification, NotificationSubject, DeadlineDate,
+                     NotificationConsultation, AnalysisSession, AnalysisResult, AnalysisStudent, AnalysisFile,
+                     AnalysisJob, DataVersion, class_sort_key)
+from .dto import NotificationDetails, StudentInfo, SubjectInfo, TemplateTypeInfo, DeadlineInfo, ConsultationInfo
 from config import get_config
+import base64
+import datetime
+import json
 import os
+import re
+import socket
+import threading
 
 config = get_config()
 DATABASE_URL = config['DATABASE_URL']
 
+# Один движок на процесс: создается лениво при первом обращении
+_engine = None
+_engine_lock = threading.Lock()
+
+# Сессии привязаны к потоку (и, соответственно, к запросу в многопоточном WSGI-сервере).
+# expire_on_commit=False позволяет использовать возвращаемые объекты после commit/close.
+_session_factory = sessionmaker(expire_on_commit=False)
+db_session = scoped_session(_session_factory)
+
+def _engine_options(database_url):
+    """Параметры пула соединений для create_engine"""
+    url = make_url(database_url)
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    
+    if url.get_backend_name() == 'sqlite':
+        # Соединения из пула используются разными потоками
+        options['connect_args'] = {'check_same_thread': False}
+        if url.database in (None, '', ':memory:'):
+            # Для базы в памяти SQLAlchemy использует собственный пул без настроек размера
+            return options
+    
+    options.update({
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    })
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Применяет настройки производительности SQLite к новому соединению"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in config['SQLITE_PRAGMAS'].items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def configure_engine(database_url=None):
+    """Создает (или пересоздает) движок процесса для указанного URL базы данных"""
+    global _engine, DATABASE_URL
+    
+    with _engine_lock:
+        if database_url:
+            DATABASE_URL = database_url
+        
+        if _engine is not None:
+            db_session.remove()
+            _engine.dispose()
+        
+        _engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+        if _engine.dialect.name == 'sqlite':
+            event.listen(_engine, 'connect', _set_sqlite_pragmas)
+        _session_factory.configure(bind=_engine)
+        subject_registry.invalidate()
+        _reset_class_cache()
+        return _engine
+
 def get_engine():
-    """Создаем подключение к базе данных"""
-    return create_engine(DATABASE_URL)
+    """Возвращает общий для процесса движок базы данных"""
+    if _engine is None:
+        return configure_engine()
+    return _engine
+
+def dispose_engine():
+    """Закрывает все соединения пула и сбрасывает движок"""
+    global _engine
+    
+    with _engine_lock:
+        db_session.remove()
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+def remove_session(exception=None):
+    """Закрывает сессию текущего потока (вызывается по окончании запроса)"""
+    db_session.remove()
+
+def init_db_session(app):
+    """Регистрирует закрытие сессии БД по окончании каждого запроса"""
+    app.teardown_appcontext(remove_session)
 
 def init_db():
     """Инициализируем базу данных"""
@@ -19,9 +109,11 @@ def init_db():
     engine = get_engine()
     Base.metadata.create_all(engine)
     
-    # Rest of the function remains the same
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    # Добавляем в существующую базу недостающие индексы
+    from .migrations import run_migrations
+    run_migrations(engine)
+    
+    session = get_session()
 
     # Добавляем стандартные предметы, если их еще нет
     standard_subjects = ["Математика", "Русский язык", "Литература", "Физика", 
@@ -52,14 +144,20 @@ def init_db():
         if not session.query(TemplateType).filter_by(name=template["name"]).first():
             session.add(TemplateType(**template))
     
+    # Версии состава учеников и предметов для кэшей списка классов и предметов
+    for name in (STUDENTS_VERSION, SUBJECTS_VERSION):
+        if not session.get(DataVersion, name):
+            session.add(DataVersion(name=name, version=0))
+    
     session.commit()
     session.close()
+    
+    subject_registry.invalidate()
 
 def get_session():
-    """Возвращает сессию для работы с БД"""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Возвращает сессию текущего потока для работы с БД"""
+    get_engine()
+    return db_session()
 
 def get_all_students():
     """Получаем список всех учеников"""
@@ -83,6 +181,7 @@ def add_student(full_name, class_name):
     session.commit()
     student_id = student.id
     session.close()
+    invalidate_class_cache()
     return student_id
 
 def get_all_subjects():
@@ -138,213 +237,841 @@ def create_notification(student_id, template_type_id, period, subjects_ids, dead
     
     return notification_id
 
-def get_notification_with_details(notification_id):
-    """Получаем уведомление со всеми связанными данными"""
-    session = get_session()
+def get_notifications_with_details(notification_ids):
+    """
+    Загружает уведомления со всеми связанными данными за фиксированное число запросов.
     
-    notification = session.query(Notification).filter_by(id=notification_id).first()
+    Ученик и тип шаблона подгружаются JOIN-ом, предметы, сроки, метаданные и
+    консультации - отдельными запросами IN (...) сразу для всех уведомлений.
     
-    if notification:
-        # Получаем информацию о студенте
-        student = notification.student
-        
-        # Получаем предметы
-        subjects = []
-        for ns in notification.subjects:
-            subject = ns.subject
-            subjects.append(subject)
-        
-        # Получаем даты ликвидации
-        deadlines = []
-        for dd in notification.deadlines:
-            subject = dd.subject
-            deadlines.append({
-                'subject': subject,
-                'date': dd.date,
-                'time': dd.time,
-                'topic': dd.topic
-            })
-        
-        # Сохраняем всё в словарь
-        result = {
-            'id': notification.id,
-            'student': student,
-            'template_type': notification.template_type,
-            'period': notification.period,
-            'subjects': subjects,
-            'deadlines': deadlines,
-            'created_at': notification.created_at
-        }
-    else:
-        result = None
+    Returns:
+        словарь {ID уведомления: NotificationDetails}; отсутствующие ID пропускаются
+    """
+    notification_ids = list(notification_ids)
+    if not notification_ids:
+        return {}
     
+    session = get_session()
+    notifications = session.query(Notification).options(
+        joinedload(Notification.student),
+        joinedload(Notification.template_type),
+        selectinload(Notification.subjects).joinedload(NotificationSubject.subject),
+        selectinload(Notification.deadlines).joinedload(DeadlineDate.subject),
+        selectinload(Notification.meta),
+        selectinload(Notification.consultations).joinedload(NotificationConsultation.subject)
+    ).filter(Notification.id.in_(notification_ids)).all()
+    
+    result = {notification.id: _notification_details(notification) for notification in notifications}
     session.close()
     return result
 
+def get_notification_with_details(notification_id):
+    """Получаем уведомление со всеми связанными данными (NotificationDetails или None)"""
+    return get_notifications_with_details([notification_id]).get(int(notification_id))
+
+def _subject_info(subject):
+    return SubjectInfo(id=subject.id, name=subject.name)
+
+def _notification_details(notification):
+    """Переносит данные загруженного уведомления в объект, не зависящий от сессии"""
+    student = notification.student
+    template_type = notification.template_type
+    
+    return NotificationDetails(
+        id=notification.id,
+        student=StudentInfo(id=student.id, full_name=student.full_name, class_name=student.class_name),
+        template_type=TemplateTypeInfo(
+            id=template_type.id,
+            name=template_type.name,
+            description=template_type.description,
+            file_path=template_type.file_path
+        ),
+        period=notification.period,
+        subjects=[_subject_info(ns.subject) for ns in notification.subjects],
+        deadlines=[
+            DeadlineInfo(subject=_subject_info(dd.subject), date=dd.date, time=dd.time, topic=dd.topic)
+            for dd in notification.deadlines
+        ],
+        meta={item.key: item.value for item in notification.meta},
+        consultations=[
+            ConsultationInfo(
+                subject_name=consultation.subject.name,
+                topic_name=consultation.topic_name,
+                date=consultation.date,
+                time=consultation.time,
+                topic_type=consultation.topic_type
+            )
+            for consultation in notification.consultations
+        ],
+        created_at=notification.created_at
+    )
+
+def _clean_import_value(value):
+    """Приводит значение из импортируемой таблицы к строке, пустые значения - к None"""
+    if value is None or value != value:  # None или NaN из pandas
+        return None
+    value = str(value).strip()
+    if not value or value.lower() == 'nan':
+        return None
+    return value
+
 def import_students_from_list(students_data):
-    """Импортирует список учеников из списка словарей"""
-    session = get_session()
+    """
+    Импортирует список учеников из списка словарей.
     
-    added_count = 0
+    Существующие пары (ФИО, класс) загружаются одним запросом, новые ученики
+    добавляются одной пакетной вставкой.
+    
+    Returns:
+        словарь со счетчиками: added - добавлено, skipped - уже были в базе
+        или повторяются в списке, invalid - строки без ФИО или класса
+    """
+    counts = {'added': 0, 'skipped': 0, 'invalid': 0}
+    
+    # Отбрасываем некорректные строки и повторы внутри самого списка
+    incoming = {}
     for student_data in students_data:
-        # Проверяем, существует ли уже ученик с таким именем и классом
-        existing_student = session.query(Student).filter_by(
-            full_name=student_data['full_name'],
-            class_name=student_data['class_name']
-        ).first()
+        full_name = _clean_import_value(student_data.get('full_name'))
+        class_name = _clean_import_value(student_data.get('class_name'))
         
-        if not existing_student:
-            student = Student(
-                full_name=student_data['full_name'],
-                class_name=student_data['class_name']
-            )
-            session.add(student)
-            added_count += 1
+        if not full_name or not class_name:
+            counts['invalid'] += 1
+        elif (full_name, class_name) in incoming:
+            counts['skipped'] += 1
+        else:
+            incoming[(full_name, class_name)] = {'full_name': full_name, 'class_name': class_name}
     
-    session.commit()
-    session.close()
+    if not incoming:
+        return counts
     
-    return added_count
+    with get_engine().begin() as connection:
+        class_names = {class_name for _, class_name in incoming}
+        existing = {tuple(row) for row in connection.execute(
+            select(Student.full_name, Student.class_name).where(Student.class_name.in_(class_names))
+        )}
+        
+        new_rows = [row for key, row in incoming.items() if key not in existing]
+        if new_rows:
+            # Пакетная вставка минует ORM, поэтому ключ сортировки класса вычисляем здесь
+            for row in new_rows:
+                row['grade'], row['letter'] = class_sort_key(row['class_name'])
+            connection.execute(insert(Student), new_rows)
+    
+    if new_rows:
+        invalidate_class_cache()
+    
+    counts['added'] = len(new_rows)
+    counts['skipped'] += len(incoming) - len(new_rows)
+    return counts
 
-def get_subject_by_name(subject_name):
-    """Получает предмет по названию или создает новый"""
-    session = get_session()
-    subject = session.query(Subject).filter_by(name=subject_name).first()
+# Кэши справочников в памяти процесса хранятся вместе с версией данных (таблица data_versions):
+# при изменении данных версия увеличивается, и кэши сбрасываются во всех процессах.
+STUDENTS_VERSION = 'students'
+SUBJECTS_VERSION = 'subjects'
+
+def _data_version(connection, name):
+    """Текущая версия набора данных (один запрос по ключу)"""
+    return connection.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar() or 0
+
+def _bump_data_version(name):
+    """Увеличивает версию набора данных, добавляя запись при ее отсутствии"""
+    with get_engine().begin() as connection:
+        updated = connection.execute(
+            update(DataVersion).where(DataVersion.name == name).values(version=DataVersion.version + 1)
+        ).rowcount
+        if not updated:
+            connection.execute(insert(DataVersion).values(name=name, version=1))
+
+class SubjectRegistry:
+    """
+    Кэш соответствия "название предмета -> ID" в памяти процесса.
     
-    if not subject:
-        subject = Subject(name=subject_name)
-        session.add(subject)
-        session.commit()
+    Таблица предметов небольшая, поэтому загружается целиком при первом обращении.
+    Перед использованием кэша проверяется версия предметов: после переименования или
+    удаления предмета в любом процессе таблица перечитывается.
+    Работает через собственные соединения движка и не затрагивает сессию вызывающего кода.
+    """
     
-    subject_id = subject.id
-    session.close()
-    return subject_id
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids_by_name = None
+        self._version = None
+    
+    def resolve(self, names):
+        """Возвращает словарь {название: ID}, создавая отсутствующие предметы"""
+        names = list(dict.fromkeys(names))
+        
+        with self._lock:
+            with get_engine().connect() as connection:
+                version = _data_version(connection, SUBJECTS_VERSION)
+                if self._ids_by_name is None or self._version != version:
+                    self._load(connection, version)
+            
+            missing = [name for name in names if name not in self._ids_by_name]
+            if missing:
+                self._create(missing)
+            
+            return {name: self._ids_by_name[name] for name in names}
+    
+    def invalidate(self):
+        """Сбрасывает кэш текущего процесса"""
+        with self._lock:
+            self._ids_by_name = None
+    
+    def _load(self, connection, version):
+        rows = connection.execute(select(Subject.name, Subject.id))
+        self._ids_by_name = {name: subject_id for name, subject_id in rows}
+        self._version = version
+    
+    def _create(self, names):
+        """
+        Добавляет предметы и перечитывает таблицу. Предметы, уже добавленные другим
+        процессом, пропускаются, не отменяя добавление остальных.
+        """
+        rows = [{'name': name} for name in names]
+        engine = get_engine()
+        if engine.dialect.name == 'sqlite':
+            with engine.begin() as connection:
+                connection.execute(sqlite_insert(Subject).on_conflict_do_nothing(index_elements=['name']), rows)
+        else:
+            for row in rows:
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(insert(Subject), row)
+                except IntegrityError:
+                    pass  # Предмет уже добавлен другим процессом
+        with engine.connect() as connection:
+            self._load(connection, _data_version(connection, SUBJECTS_VERSION))
+
+subject_registry = SubjectRegistry()
+
+def resolve_subjects(subject_names):
+    """Получает ID предметов по названиям одним обращением, создавая новые при необходимости"""
+    return subject_registry.resolve(subject_names)
+
+def invalidate_subject_cache():
+    """Сбрасывает кэш предметов во всех процессах (вызывается после изменения таблицы subjects)"""
+    _bump_data_version(SUBJECTS_VERSION)
+    subject_registry.invalidate()
+
+def get_subject_by_name(subject_name):
+    """Получает ID предмета по названию или создает новый"""
+    return resolve_subjects([subject_name])[subject_name]
 
-def create_notifications_from_csv_data(debts_by_student, template_type_id, period):
-    """Создает уведомления на основе данных из CSV"""
+def create_notifications_from_csv_data(debts_by_student, template_type_id, period, dry_run=False, chunk_size=200):
+    """
+    Создает уведомления на основе данных из CSV.
+    
+    Ученики и предметы загружаются заранее двумя запросами, уведомления вместе
+    с предметами и сроками ликвидации вставляются пакетами по chunk_size учеников,
+    по одной транзакции на пакет. Если пакет не удалось сохранить, его ученики
+    сохраняются по одному, чтобы в отчет попали только проблемные.
+    
+    Args:
+        debts_by_student: словарь {ФИО ученика: список задолженностей}
+        template_type_id: ID типа шаблона уведомления
+        period: период (модуль или триместр)
+        dry_run: только проверить данные, ничего не записывая в базу
+        chunk_size: число учеников в одной транзакции
+    """
     results = {
         'success': 0,
         'failed': 0,
-        'failed_students': []
+        'failed_students': [],
+        'dry_run': dry_run
     }
     
+    session = get_session()
+    
+    # Все упомянутые ученики одним запросом (при совпадении ФИО берем первого, как и раньше)
+    student_ids = {}
+    student_rows = session.query(Student.full_name, Student.id).filter(
+        Student.full_name.in_(list(debts_by_student))
+    ).order_by(Student.id)
+    for full_name, student_id in student_rows:
+        student_ids.setdefault(full_name, student_id)
+    
+    pending = []
     for student_name, debts in debts_by_student.items():
-        # Поиск ученика по имени
-        session = get_session()
-        student = session.query(Student).filter_by(full_name=student_name).first()
-        session.close()
-        
-        if not student:
+        if student_name not in student_ids:
             results['failed'] += 1
             results['failed_students'].append({
                 'name': student_name,
                 'reason': 'Ученик не найден в базе данных'
             })
             continue
-        
-        # Получаем предметы и формируем сроки ликвидации
-        subject_ids = []
-        deadlines = []
-        
+        pending.append((student_name, student_ids[student_name], debts))
+    
+    if dry_run:
+        session.close()
+        results['success'] = len(pending)
+        return results
+    
+    # Все упомянутые предметы одним обращением к кэшу предметов
+    subject_ids = resolve_subjects([debt['subject'] for _, _, debts in pending for debt in debts])
+    
+    def build_notification(student_id, debts):
+        notification = Notification(
+            student_id=student_id,
+            template_type_id=template_type_id,
+            period=period
+        )
         for debt in debts:
-            subject_id = get_subject_by_name(debt['subject'])
-            subject_ids.append(subject_id)
+            subject_id = subject_ids[debt['subject']]
+            notification.subjects.append(NotificationSubject(subject_id=subject_id))
             
             # Если указана дата, добавляем в график ликвидации
-            if debt['date']:
-                deadlines.append({
-                    'subject_id': subject_id,
-                    'date': debt['date'],
-                    'time': '',
-                    'topic': debt['period']
-                })
-        
-        # Создаем уведомление
+            date = _clean_import_value(debt['date'])
+            if date:
+                notification.deadlines.append(DeadlineDate(
+                    subject_id=subject_id,
+                    date=date,
+                    time='',
+                    topic=_clean_import_value(debt['period']) or ''
+                ))
+        return notification
+    
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
         try:
-            notification_id = create_notification(
-                student.id, 
-                template_type_id,
-                period,
-                subject_ids,
-                deadlines
-            )
-            
-            results['success'] += 1
-        except Exception as e:
-            results['failed'] += 1
-            results['failed_students'].append({
-                'name': student_name,
-                'reason': str(e)
-            })
+            session.add_all([build_notification(student_id, debts) for _, student_id, debts in chunk])
+            session.commit()
+            results['success'] += len(chunk)
+        except Exception:
+            session.rollback()
+            for student_name, student_id, debts in chunk:
+                try:
+                    session.add(build_notification(student_id, debts))
+                    session.commit()
+                    results['success'] += 1
+                except Exception as e:
+                    session.rollback()
+                    results['failed'] += 1
+                    results['failed_students'].append({
+                        'name': student_name,
+                        'reason': str(e)
+                    })
     
+    session.close()
     return results
 
+# Список классов меняется только вместе с составом учеников, поэтому кэшируется
+# в памяти процесса вместе с версией состава учеников.
+_class_list_cache = None  # (версия состава учеников, список классов)
+_class_list_lock = threading.Lock()
+
+def _reset_class_cache():
+    """Сбрасывает кэш списка классов текущего процесса"""
+    global _class_list_cache
+    with _class_list_lock:
+        _class_list_cache = None
+
+def invalidate_class_cache():
+    """Сбрасывает кэш списка классов во всех процессах (вызывается после изменения состава учеников)"""
+    _bump_data_version(STUDENTS_VERSION)
+    _reset_class_cache()
+
 def get_unique_classes_sorted():
-    """Получает список всех классов, отсортированных по параллели и букве"""
+    """
+    Получает список всех классов, отсортированных по параллели и букве.
+    Пока версия состава учеников не изменилась, список берется из кэша (один запрос по ключу).
+    """
+    global _class_list_cache
+    
+    with _class_list_lock, get_engine().connect() as connection:
+        version = _data_version(connection, STUDENTS_VERSION)
+        
+        if _class_list_cache is None or _class_list_cache[0] != version:
+            query = select(Student.grade, Student.letter, Student.class_name).distinct().order_by(
+                Student.grade, Student.letter, Student.class_name
+            )
+            _class_list_cache = (version, [class_name for _, _, class_name in connection.execute(query)])
+        
+        return list(_class_list_cache[1])
+
+def get_students_by_class_sorted(class_name):
+    """Получает список учеников определенного класса, отсортированных по ФИО"""
     session = get_session()
-    students = session.query(Student).all()
+    students = session.query(Student).filter_by(class_name=class_name).order_by(Student.full_name).all()
     session.close()
+    return students
+
+def get_all_students_sorted():
+    """Получаем список всех учеников, отсортированных по классу и ФИО"""
+    session = get_session()
+    students = session.query(Student).order_by(
+        Student.grade, Student.letter, Student.class_name, Student.full_name
+    ).all()
+    session.close()
+    return students
+
+# Порядок постраничной выдачи учеников: параллель -> буква -> класс -> ФИО -> ID
+STUDENT_PAGE_ORDER = (Student.grade, Student.letter, Student.class_name, Student.full_name, Student.id)
+
+def _encode_cursor(values):
+    """Кодирует ключ последней записи страницы в непрозрачную строку"""
+    return base64.urlsafe_b64encode(json.dumps(values, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Декодирует курсор страницы; при некорректном значении выбрасывает ValueError"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Некорректный курсор') from e
     
-    # Собираем уникальные названия классов
-    class_names = set(s.class_name for s in students)
-    
-    # Функция для извлечения номера параллели и буквы класса
-    def extract_class_components(class_name):
-        # Разделяем номер и букву
-        import re
-        match = re.match(r'(\d+)\s*([А-Яа-яA-Za-z]*)', class_name.strip())
-        if match:
-            try:
-                number = int(match.group(1))  # Номер параллели
-                letter = match.group(2) or ""  # Буква класса (может отсутствовать)
-                return (number, letter)
-            except ValueError:
-                # Если не удалось преобразовать в число, возвращаем большое число для сортировки в конец
-                return (999, class_name)
-        else:
-            # Если формат не соответствует ожидаемому, возвращаем для сортировки в конец
-            return (999, class_name)
+    if not isinstance(values, list) or len(values) != len(STUDENT_PAGE_ORDER):
+        raise ValueError('Некорректный курсор')
+    # Ключ сортировки состоит из чисел, строк и NULL; другие значения до запроса не допускаем
+    if not all(value is None or (isinstance(value, (str, int)) and not isinstance(value, bool)) for value in values):
+        raise ValueError('Некорректный курсор')
+    return values
+
+def get_students_page(limit=100, cursor=None, class_name=None, grade=None):
+    """
+    Возвращает страницу учеников с keyset-пагинацией.
     
-    # Сортируем классы по параллели и букве
-    sorted_classes = sorted(class_names, key=extract_class_components)
+    Следующая страница выбирается условием "ключ сортировки больше ключа последней
+    записи", поэтому стоимость запроса не зависит от номера страницы.
     
-    return sorted_classes
+    Args:
+        limit: количество учеников на странице
+        cursor: курсор, полученный с предыдущей страницей (None - первая страница)
+        class_name: фильтр по классу
+        grade: фильтр по параллели
     
+    Returns:
+        (список учеников, курсор следующей страницы или None, если страница последняя)
+    """
+    session = get_session()
+    query = session.query(Student)
+    
+    if class_name:
+        query = query.filter(Student.class_name == class_name)
+    if grade is not None:
+        query = query.filter(Student.grade == grade)
+    if cursor:
+        query = query.filter(tuple_(*STUDENT_PAGE_ORDER) > tuple_(*_decode_cursor(cursor)))
+    
+    # Берем на одну запись больше, чтобы узнать, есть ли следующая страница
+    students = query.order_by(*STUDENT_PAGE_ORDER).limit(limit + 1).all()
+    session.close()
+    
+    next_cursor = None
+    if len(students) > limit:
+        students = students[:limit]
+        last = students[-1]
+        next_cursor = _encode_cursor([last.grade, last.letter, last.class_name, last.full_name, last.id])
+    
+    return students, next_cursor
+
+SEARCH_TOKEN_PATTERN = re.compile(r'\w+')
+
+def _search_tokens(query):
+    """Разбивает поисковую строку на слова в нижнем регистре с заменой "ё" на "е" """
+    return SEARCH_TOKEN_PATTERN.findall(query.lower().replace('ё', 'е'))
+
+def search_students(query, limit=20):
+    """
+    Ищет учеников по началу слов ФИО для поиска с автодополнением.
+    
+    Каждое слово запроса ищется как префикс любого слова ФИО, порядок слов не важен,
+    регистр и различие "ё"/"е" не учитываются. В SQLite используется индекс students_fts,
+    который поддерживается триггерами (см. database/migrations.py).
+    
+    Returns:
+        список StudentInfo (не более limit), упорядоченный по ФИО
+    """
+    tokens = _search_tokens(query or '')
+    if not tokens:
+        return []
     
-def get_students_by_class_sorted(class_name):
-    """Получает список учеников определенного класса, отсортированных по ФИО"""
     session = get_session()
-    students = session.query(Student).filter_by(class_name=class_name).all()
+    if session.get_bind().dialect.name == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # Совпадения сортируются до LIMIT, чтобы при большом числе совпадений вернуть первые по ФИО
+        rows = session.execute(text(
+            "SELECT students.id, students.full_name, students.class_name "
+            "FROM students_fts JOIN students ON students.id = students_fts.rowid "
+            "WHERE students_fts MATCH :match "
+            "ORDER BY students.full_name, students.class_name LIMIT :limit"
+        ), {'match': match, 'limit': limit}).all()
+    else:
+        conditions = [Student.full_name.ilike(f'%{token}%') for token in tokens]
+        rows = session.execute(
+            select(Student.id, Student.full_name, Student.class_name)
+            .where(and_(*conditions)).order_by(Student.full_name, Student.class_name).limit(limit)
+        ).all()
     session.close()
     
-    # Сортируем учеников по ФИО
-    sorted_students = sorted(students, key=lambda s: s.full_name)
+    return [StudentInfo(id=row.id, full_name=row.full_name, class_name=row.class_name) for row in rows]
+
+def _analysis_value(value):
+    """Приводит значение из результата анализа к строке для хранения"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # Оценка 3.0 хранится как "3"
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%d.%m.%Y')
+    return str(value)
+
+def _analysis_record(result):
+    """Результат анализа в формате записей анализатора (utils/excel_analyzer.py)"""
+    return {
+        'ФИО ученика': result.student_name,
+        'Класс': result.class_name,
+        'Предмет': result.subject,
+        'Период промежуточной аттестации': result.period,
+        'Дата промежуточной аттестации': result.date,
+        'Итоговая отметка': result.grade,
+        'Тип проблемы': result.problem_type
+    }
+
+def summarize_analysis_students(rows):
+    """
+    Группирует результаты анализа по ученикам.
+    
+    Задолженности любого вида дают список failed_subjects, тройки - satisfactory_subjects;
+    предметы не повторяются и идут в порядке появления в результатах.
     
-    return sorted_students
-def get_all_students_sorted():
-    """Получаем список всех учеников, отсортированных по классу и ФИО"""
+    Args:
+        rows: строки результатов (ключи student_name, class_name, subject, problem_type)
+    
+    Returns:
+        словарь ФИО -> {'class_name', 'failed_subjects', 'satisfactory_subjects'}
+    """
+    students = {}
+    for row in rows:
+        summary = students.setdefault(row['student_name'], {
+            'class_name': row['class_name'], 'failed_subjects': {}, 'satisfactory_subjects': {}
+        })
+        if 'Задолженность' in row['problem_type']:
+            summary['failed_subjects'][row['subject']] = None
+        elif row['problem_type'] == 'Тройка':
+            summary['satisfactory_subjects'][row['subject']] = None
+    
+    # Словари использовались как упорядоченные множества
+    for summary in students.values():
+        summary['failed_subjects'] = list(summary['failed_subjects'])
+        summary['satisfactory_subjects'] = list(summary['satisfactory_subjects'])
+    return students
+
+def _analysis_result_rows(session_id, problems):
+    """Строки таблицы analysis_results из записей анализатора"""
+    return [{
+        'session_id': session_id,
+        'student_name': str(problem['ФИО ученика']),
+        'class_name': _analysis_value(problem.get('Класс')),
+        'subject': str(problem['Предмет']),
+        'period': _analysis_value(problem.get('Период промежуточной аттестации')),
+        'date': _analysis_value(problem.get('Дата промежуточной аттестации')),
+        'grade': _analysis_value(problem.get('Итоговая отметка')),
+        'problem_type': problem['Тип проблемы']
+    } for problem in problems]
+
+def _analysis_student_rows(session_id, rows):
+    """Строки таблицы analysis_students по строкам результатов"""
+    return [{
+        'session_id': session_id,
+        'student_name': student_name,
+        'class_name': summary['class_name'],
+        'failed_subjects': json.dumps(summary['failed_subjects'], ensure_ascii=False),
+        'satisfactory_subjects': json.dumps(summary['satisfactory_subjects'], ensure_ascii=False)
+    } for student_name, summary in summarize_analysis_students(rows).items()]
+
+def _analysis_file_rows(session_id, files):
+    """Строки таблицы analysis_files из сведений о разобранных файлах (analyze_report_files)"""
+    return [{
+        'session_id': session_id,
+        'file_name': file['file'],
+        'student_name': str(file['student_name']),
+        'class_name': _analysis_value(file.get('class_name')),
+        'actuality_date': file.get('actuality_date'),
+        'timings': json.dumps(file['timings']) if file.get('timings') else None
+    } for file in files]
+
+def _insert_analysis_rows(session, session_id, problems, files):
+    """Добавляет результаты, сводки учеников и сведения о файлах сессии"""
+    rows = _analysis_result_rows(session_id, problems)
+    if rows:
+        session.execute(insert(AnalysisResult), rows)
+        session.execute(insert(AnalysisStudent), _analysis_student_rows(session_id, rows))
+    if files:
+        session.execute(insert(AnalysisFile), _analysis_file_rows(session_id, files))
+
+def _update_analysis_totals(session, session_id, dates=True):
+    """Пересчитывает число результатов и, если dates, диапазон дат сессии по сохраненным файлам"""
+    values = {'results_count': session.query(func.count(AnalysisResult.id)).filter(
+        AnalysisResult.session_id == session_id
+    ).scalar()}
+    if dates:
+        values['earliest_date'], values['latest_date'] = session.query(
+            func.min(AnalysisFile.actuality_date), func.max(AnalysisFile.actuality_date)
+        ).filter(AnalysisFile.session_id == session_id).one()
+    session.query(AnalysisSession).filter_by(id=session_id).update(values)
+
+def save_analysis_results(session_id, problems, files=None):
+    """
+    Сохраняет результаты анализа сессии, заменяя ранее сохраненные, вместе
+    со сводкой по каждому ученику (см. summarize_analysis_students).
+    
+    Args:
+        session_id: ID сессии анализа (AnalysisSession)
+        problems: список записей анализатора в порядке вывода
+        files: сведения о разобранных файлах (analyze_report_files); если указаны,
+               заменяют сохраненные, а диапазон дат сессии пересчитывается по ним
+    """
     session = get_session()
-    students = session.query(Student).all()
+    try:
+        session.query(AnalysisResult).filter_by(session_id=session_id).delete()
+        session.query(AnalysisStudent).filter_by(session_id=session_id).delete()
+        if files is not None:
+            session.query(AnalysisFile).filter_by(session_id=session_id).delete()
+        _insert_analysis_rows(session, session_id, problems, files)
+        _update_analysis_totals(session, session_id, dates=files is not None)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def replace_student_analysis_results(session_id, problems, files):
+    """
+    Заменяет результаты учеников, для которых разобраны новые файлы отчетов.
+    
+    Результаты, сводки и сведения о файлах этих учеников удаляются и сохраняются заново,
+    остальные ученики сессии не затрагиваются. Число результатов и диапазон дат
+    сессии пересчитываются по сохраненным данным.
+    
+    Args:
+        session_id: ID сессии анализа
+        problems: записи анализатора для учеников из files
+        files: сведения о новых файлах (analyze_report_files)
+    
+    Returns:
+        имена замененных файлов сессии (их можно удалить из папки сессии)
+    """
+    student_names = {str(file['student_name']) for file in files}
+    
+    session = get_session()
+    try:
+        replaced_files = [row.file_name for row in session.query(AnalysisFile.file_name).filter(
+            AnalysisFile.session_id == session_id, AnalysisFile.student_name.in_(student_names)
+        )]
+        for model in (AnalysisResult, AnalysisStudent, AnalysisFile):
+            session.query(model).filter(
+                model.session_id == session_id, model.student_name.in_(student_names)
+            ).delete(synchronize_session=False)
+        _insert_analysis_rows(session, session_id, problems, files)
+        _update_analysis_totals(session, session_id)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return replaced_files
+
+def get_analysis_files(session_id):
+    """Возвращает сведения о разобранных файлах сессии в формате analyze_report_files"""
+    session = get_session()
+    files = [{
+        'file': row.file_name,
+        'student_name': row.student_name,
+        'class_name': row.class_name,
+        'actuality_date': row.actuality_date,
+        'timings': json.loads(row.timings) if row.timings else None
+    } for row in session.query(AnalysisFile).filter_by(session_id=session_id).order_by(AnalysisFile.id)]
     session.close()
+    return files
+
+def get_analysis_results(session_id, student_name=None, problem_type=None):
+    """
+    Возвращает сохраненные результаты анализа сессии в порядке сохранения.
     
-    # Функция для извлечения номера параллели и буквы класса
-    def extract_class_components(class_name):
-        parts = class_name.strip().split()
-        if len(parts) == 2:
-            try:
-                number = int(parts[0])  # Номер параллели
-                letter = parts[1]       # Буква класса
-                return (number, letter)
-            except ValueError:
-                return (999, class_name)
-        else:
-            return (999, class_name)
+    Args:
+        session_id: ID сессии анализа
+        student_name: только результаты этого ученика
+        problem_type: только проблемы этого типа
+    
+    Returns:
+        список записей в формате анализатора
+    """
+    session = get_session()
+    query = session.query(AnalysisResult).filter(AnalysisResult.session_id == session_id)
+    if student_name is not None:
+        query = query.filter(AnalysisResult.student_name == student_name)
+    if problem_type is not None:
+        query = query.filter(AnalysisResult.problem_type == problem_type)
+    
+    results = [_analysis_record(result) for result in query.order_by(AnalysisResult.id)]
+    session.close()
+    return results
+
+def create_analysis_session(class_name, folder_path):
+    """Создает сессию анализа и возвращает ее ID"""
+    session = get_session()
+    analysis_session = AnalysisSession(class_name=class_name, folder_path=folder_path)
+    session.add(analysis_session)
+    session.commit()
+    session_id = analysis_session.id
+    session.close()
+    return session_id
+
+def _job_owner():
+    """Владелец задач анализа, поставленных в очередь этим процессом"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _process_alive(pid):
+    """Существует ли процесс на этом компьютере; None - проверить нельзя (Windows)"""
+    if os.name == 'nt':
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def create_analysis_job(class_name, folder_path, total_files):
+    """Создает задачу анализа в состоянии queued, принадлежащую этому процессу, и возвращает ее ID"""
+    session = get_session()
+    job = AnalysisJob(status='queued', class_name=class_name, folder_path=folder_path,
+                      total_files=total_files, processed_files=0,
+                      owner=_job_owner(), heartbeat_at=datetime.datetime.utcnow())
+    session.add(job)
+    session.commit()
+    job_id = job.id
+    session.close()
+    return job_id
+
+def update_analysis_job(job_id, **values):
+    """
+    Обновляет поля задачи анализа; errors передается списком и сохраняется в JSON.
+    Каждое обновление отмечает, что процесс задачи жив (heartbeat_at).
+    """
+    values.setdefault('heartbeat_at', datetime.datetime.utcnow())
+    if 'errors' in values:
+        values['errors'] = json.dumps(values['errors'], ensure_ascii=False)
+    session = get_session()
+    session.query(AnalysisJob).filter_by(id=job_id).update(values)
+    session.commit()
+    session.close()
+
+def get_analysis_job(job_id):
+    """Возвращает состояние задачи анализа словарем или None"""
+    session = get_session()
+    job = session.get(AnalysisJob, job_id)
+    session.close()
+    if job is None:
+        return None
+    
+    return {
+        'id': job.id,
+        'status': job.status,
+        'class_name': job.class_name,
+        'folder_path': job.folder_path,
+        'total_files': job.total_files,
+        'processed_files': job.processed_files,
+        'session_id': job.session_id,
+        'message': job.message,
+        'errors': json.loads(job.errors) if job.errors else []
+    }
+
+def _job_abandoned(job, hostname, stale_before):
+    """Прервана ли незавершенная задача: ее процесс завершился или давно не обновлял ее"""
+    owner_host, _, owner_pid = (job.owner or '').rpartition(':')
+    if owner_host == hostname and owner_pid.isdigit():
+        pid = int(owner_pid)
+        # Задачи с PID этого процесса остались от прошлого запуска (PID мог достаться повторно)
+        alive = pid != os.getpid() and _process_alive(pid)
+        if alive is not None:
+            return not alive
+    # Процесс на другом компьютере (или проверить его нельзя) - судим по времени обновления
+    return job.heartbeat_at is None or job.heartbeat_at < stale_before
+
+def fail_unfinished_analysis_jobs():
+    """
+    Завершает с ошибкой задачи, прерванные перезапуском приложения.
+    
+    Задачи живых процессов (другие рабочие процессы сервера) не затрагиваются: задача
+    считается прерванной, если процесс-владелец на этом компьютере завершился, а для
+    других компьютеров - если она не обновлялась дольше ANALYSIS_JOB_STALE_SECONDS.
+    """
+    hostname = socket.gethostname()
+    stale_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=config['ANALYSIS_JOB_STALE_SECONDS'])
+    session = get_session()
+    jobs = session.query(AnalysisJob).filter(AnalysisJob.status.in_(['queued', 'running'])).all()
+    abandoned_ids = [job.id for job in jobs if _job_abandoned(job, hostname, stale_before)]
+    if abandoned_ids:
+        session.query(AnalysisJob).filter(
+            AnalysisJob.id.in_(abandoned_ids),
+            AnalysisJob.status.in_(['queued', 'running'])
+        ).update({
+            'status': 'failed',
+            'message': 'Анализ прерван перезапуском приложения',
+            'finished_at': datetime.datetime.utcnow()
+        }, synchronize_session=False)
+        session.commit()
+    session.close()
+
+def get_analysis_students(session_id, student_names):
+    """
+    Возвращает сводки результатов анализа по ученикам одним запросом по индексу.
+    
+    Returns:
+        словарь ФИО -> {'student_name', 'student_class', 'failed_subjects', 'satisfactory_subjects'};
+        ученики без результатов в словарь не попадают
+    """
+    session = get_session()
+    rows = session.query(AnalysisStudent).filter(
+        AnalysisStudent.session_id == session_id,
+        AnalysisStudent.student_name.in_(list(student_names))
+    ).all()
+    session.close()
+    
+    return {row.student_name: {
+        'student_name': row.student_name,
+        'student_class': row.class_name or '',
+        'failed_subjects': json.loads(row.failed_subjects),
+        'satisfactory_subjects': json.loads(row.satisfactory_subjects)
+    } for row in rows}
+
+def get_analysis_student(session_id, student_name):
+    """Возвращает сводку результатов анализа по ученику или None"""
+    return get_analysis_students(session_id, [student_name]).get(student_name)
+
+def get_or_create_student_ids(students):
+    """
+    Возвращает ID учеников по ФИО, добавляя отсутствующих в базу.
     
-    # Сортируем учеников сначала по классу, потом по ФИО
-    sorted_students = sorted(students, 
-                            key=lambda s: (extract_class_components(s.class_name), s.full_name))
+    Args:
+        students: словарь ФИО -> класс (класс используется только для новых учеников)
     
-    return sorted_students
+    Returns:
+        словарь ФИО -> ID ученика
+    """
+    def load_ids():
+        session = get_session()
+        rows = session.query(Student.full_name, Student.id).filter(
+            Student.full_name.in_(list(students))
+        ).order_by(Student.id.desc()).all()
+        session.close()
+        # При совпадении ФИО берется ученик с меньшим ID, как в get_student_by_name
+        return dict(rows)
+    
+    student_ids = load_ids()
+    missing = [name for name in students if name not in student_ids]
+    if missing:
+        import_students_from_list([{'full_name': name, 'class_name': students[name]} for name in missing])
+        student_ids = load_ids()
+        # Строки, которые импорт отбросил (например, без класса), добавляем по одной
+        for name in missing:
+            if name not in student_ids:
+                student_ids[name] = add_student(name, students[name] or '')
+    return student_ids
 
 def get_schedule_times():
     """Получает расписание звонков"""
@@ -391,24 +1118,9 @@ def get_subjects_by_grade():
                "Практикум ЕГЭ", "Русский язык", "Физика", "Физическая культура", "Химия"]
     }
 
-def get_subject_by_name(subject_name):
-    """Получает ID предмета по имени или создает новый"""
-    session = get_session()
-    subject = session.query(Subject).filter_by(name=subject_name).first()
-    
-    if not subject:
-        subject = Subject(name=subject_name)
-        session.add(subject)
-        session.flush()
-        
-    subject_id = subject.id
-    session.commit()
-    session.close()
-    
-    return subject_id
 def get_student_by_name(student_name):
     """Получает ученика по ФИО"""
     session = get_session()
     student = session.query(Student).filter_by(full_name=student_name).first()
     session.close()
-    return student
\ No newline at end of file
+    return student
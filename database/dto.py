@@ -0,0 +1,41 @@
+# database/dto.py
+#
+# Простые объекты данных, не привязанные к сессии SQLAlchemy.
+# Их можно безопасно передавать между слоями после закрытия сессии.
+
+class DataObject:
+    """Базовый класс объекта данных с фиксированным набором полей (__slots__)"""
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"<{type(self).__name__}({fields})>"
+
+class StudentInfo(DataObject):
+    __slots__ = ('id', 'full_name', 'class_name')
+
+class SubjectInfo(DataObject):
+    __slots__ = ('id', 'name')
+
+class TemplateTypeInfo(DataObject):
+    __slots__ = ('id', 'name', 'description', 'file_path')
+
+class DeadlineInfo(DataObject):
+    __slots__ = ('subject', 'date', 'time', 'topic')
+
+class ConsultationInfo(DataObject):
+    __slots__ = ('subject_name', 'topic_name', 'date', 'time', 'topic_type')
+
+class NotificationDetails(DataObject):
+    """Уведомление со всеми связанными данными, необходимыми для генерации документа"""
+    __slots__ = ('id', 'student', 'template_type', 'period', 'subjects', 'deadlines',
+                 'meta', 'consultations', 'created_at')
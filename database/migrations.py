@@ -0,0 +1,124 @@
+# database/migrations.py
+
+import logging
+
+from sqlalchemy import inspect, text
+from .models import Base, class_sort_key
+
+logger = logging.getLogger(__name__)
+
+def run_migrations(engine):
+    """
+    Приводит существующую базу данных к текущей схеме моделей.
+
+    create_all() создает только отсутствующие таблицы, поэтому колонки и индексы,
+    добавленные в уже существующие таблицы, создаются здесь. Все шаги
+    идемпотентны и выполняются при каждом запуске приложения.
+    """
+    with engine.begin() as connection:
+        _add_missing_columns(connection)
+        _fill_student_sort_keys(connection)
+        _merge_duplicate_students(connection)
+        _create_missing_indexes(connection)
+        _reset_sessions_without_student_summaries(connection)
+        _reset_sessions_without_files(connection)
+        if connection.dialect.name == 'sqlite':
+            _create_student_search_index(connection)
+
+def _add_missing_columns(connection):
+    """Добавляет в существующие таблицы колонки, появившиеся в моделях"""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+def _fill_student_sort_keys(connection):
+    """Вычисляет ключ сортировки класса для учеников, у которых его еще нет"""
+    rows = connection.execute(text("SELECT id, class_name FROM students WHERE grade IS NULL")).fetchall()
+    if not rows:
+        return
+
+    updates = []
+    for student_id, class_name in rows:
+        grade, letter = class_sort_key(class_name)
+        updates.append({'id': student_id, 'grade': grade, 'letter': letter})
+    connection.execute(text("UPDATE students SET grade = :grade, letter = :letter WHERE id = :id"), updates)
+
+def _merge_duplicate_students(connection):
+    """Объединяет дубликаты учеников перед созданием уникального индекса"""
+    existing_indexes = {index['name'] for index in inspect(connection).get_indexes('students')}
+    if 'uq_students_full_name_class_name' in existing_indexes:
+        return
+
+    duplicates = connection.execute(text(
+        "SELECT full_name, class_name, MIN(id) FROM students "
+        "GROUP BY full_name, class_name HAVING COUNT(*) > 1"
+    )).fetchall()
+
+    for full_name, class_name, keep_id in duplicates:
+        params = {'full_name': full_name, 'class_name': class_name, 'keep_id': keep_id}
+        duplicate_ids = (
+            "SELECT id FROM students WHERE full_name = :full_name "
+            "AND class_name = :class_name AND id != :keep_id"
+        )
+        # Уведомления дубликатов переносим на оставшуюся запись
+        connection.execute(text(
+            f"UPDATE notifications SET student_id = :keep_id WHERE student_id IN ({duplicate_ids})"
+        ), params)
+        connection.execute(text(f"DELETE FROM students WHERE id IN ({duplicate_ids})"), params)
+        logger.warning("Объединены дубликаты ученика: %s (%s)", full_name, class_name)
+
+def _create_missing_indexes(connection):
+    """Создает индексы моделей, которых еще нет в базе данных"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+def _reset_sessions_without_student_summaries(connection):
+    """Помечает для повторного анализа сессии, сохраненные до появления сводок по ученикам"""
+    connection.execute(text(
+        "UPDATE analysis_sessions SET results_count = NULL WHERE results_count > 0 "
+        "AND id NOT IN (SELECT session_id FROM analysis_students)"
+    ))
+
+def _reset_sessions_without_files(connection):
+    """Помечает для повторного анализа сессии, сохраненные без сведений о разобранных файлах"""
+    connection.execute(text(
+        "UPDATE analysis_sessions SET results_count = NULL WHERE results_count IS NOT NULL "
+        "AND id NOT IN (SELECT session_id FROM analysis_files)"
+    ))
+
+# Полнотекстовый индекс ФИО учеников для поиска с автодополнением.
+# ФИО хранится с заменой "ё" на "е"; регистр приводит токенизатор unicode61,
+# prefix='2 3' ускоряет поиск по началу слова из 2-3 букв.
+STUDENT_SEARCH_NORMALIZED_NAME = "replace(replace({row}.full_name, 'ё', 'е'), 'Ё', 'Е')"
+
+STUDENT_SEARCH_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts "
+    "USING fts5(full_name, tokenize='unicode61', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students BEGIN "
+    "INSERT INTO students_fts (rowid, full_name) VALUES (new.id, {new}); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students BEGIN "
+    "DELETE FROM students_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_update AFTER UPDATE OF id, full_name ON students BEGIN "
+    "DELETE FROM students_fts WHERE rowid = old.id; "
+    "INSERT INTO students_fts (rowid, full_name) VALUES (new.id, {new}); END",
+]
+
+def _create_student_search_index(connection):
+    """Создает индекс поиска учеников с триггерами синхронизации и заполняет его при расхождении"""
+    new_name = STUDENT_SEARCH_NORMALIZED_NAME.format(row='new')
+    for statement in STUDENT_SEARCH_SCHEMA:
+        connection.execute(text(statement.format(new=new_name)))
+
+    students_count = connection.execute(text("SELECT COUNT(*) FROM students")).scalar()
+    indexed_count = connection.execute(text("SELECT COUNT(*) FROM students_fts")).scalar()
+    if students_count != indexed_count:
+        connection.execute(text("DELETE FROM students_fts"))
+        connection.execute(text(
+            "INSERT INTO students_fts (rowid, full_name) SELECT id, "
+            f"{STUDENT_SEARCH_NORMALIZED_NAME.format(row='students')} FROM students"
+        ))
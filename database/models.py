@@ -1,22 +1,60 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, create_engine
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 import datetime
+import re
 
 Base = declarative_base()
 
+# Название класса: номер параллели и необязательная буква ("10 А", "7Б", "11")
+CLASS_NAME_PATTERN = re.compile(r'(\d+)\s*([А-Яа-яЁёA-Za-z]*)')
+
+def class_sort_key(class_name):
+    """Возвращает ключ сортировки класса (параллель, буква); нераспознанные классы идут в конец"""
+    match = CLASS_NAME_PATTERN.match(class_name.strip()) if class_name else None
+    if not match:
+        return 999, class_name or ''
+    return int(match.group(1)), match.group(2).upper()
+
 class Student(Base):
     __tablename__ = 'students'
     
     id = Column(Integer, primary_key=True)
     full_name = Column(String, nullable=False)
     class_name = Column(String, nullable=False)
+    # Ключ сортировки класса, вычисляется из class_name
+    grade = Column(Integer)
+    letter = Column(String)
     
     notifications = relationship("Notification", back_populates="student")
     
+    __table_args__ = (
+        # Один ученик с таким ФИО в классе; индекс также обслуживает поиск по ФИО
+        Index('uq_students_full_name_class_name', 'full_name', 'class_name', unique=True),
+        # Выборка учеников класса, отсортированных по ФИО
+        Index('ix_students_class_name_full_name', 'class_name', 'full_name'),
+        # Список классов и учеников в порядке параллель -> буква -> ФИО
+        Index('ix_students_sort_key', 'grade', 'letter', 'class_name', 'full_name'),
+    )
+    
+    @validates('class_name')
+    def _update_class_sort_key(self, key, class_name):
+        self.grade, self.letter = class_sort_key(class_name)
+        return class_name
+    
     def __repr__(self):
         return f"<Student(full_name='{self.full_name}', class_name='{self.class_name}')>"
 
+class DataVersion(Base):
+    """Версия набора данных; увеличивается при изменении, чтобы все процессы сбросили свои кэши"""
+    __tablename__ = 'data_versions'
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<DataVersion(name='{self.name}', version={self.version})>"
+
 class Subject(Base):
     __tablename__ = 'subjects'
     
@@ -50,8 +88,15 @@ class Notification(Base):
     
     student = relationship("Student", back_populates="notifications")
     template_type = relationship("TemplateType", back_populates="notifications")
-    subjects = relationship("NotificationSubject", back_populates="notification")
-    deadlines = relationship("DeadlineDate", back_populates="notification")
+    subjects = relationship("NotificationSubject", back_populates="notification", order_by="NotificationSubject.id")
+    deadlines = relationship("DeadlineDate", back_populates="notification", order_by="DeadlineDate.id")
+    meta = relationship("NotificationMeta", back_populates="notification", order_by="NotificationMeta.id")
+    consultations = relationship("NotificationConsultation", back_populates="notification",
+                                 order_by="NotificationConsultation.id")
+    
+    __table_args__ = (
+        Index('ix_notifications_student_id', 'student_id'),
+    )
     
     def __repr__(self):
         return f"<Notification(student_id={self.student_id}, period='{self.period}')>"
@@ -66,6 +111,12 @@ class NotificationSubject(Base):
     notification = relationship("Notification", back_populates="subjects")
     subject = relationship("Subject")
     
+    __table_args__ = (
+        Index('ix_notification_subjects_notification_id_subject_id', 'notification_id', 'subject_id'),
+        # Поиск по предмету, в том числе проверка внешнего ключа при удалении предмета
+        Index('ix_notification_subjects_subject_id', 'subject_id'),
+    )
+    
     def __repr__(self):
         return f"<NotificationSubject(notification_id={self.notification_id}, subject_id={self.subject_id})>"
 
@@ -82,6 +133,12 @@ class DeadlineDate(Base):
     notification = relationship("Notification", back_populates="deadlines")
     subject = relationship("Subject")
     
+    __table_args__ = (
+        Index('ix_deadline_dates_notification_id_subject_id', 'notification_id', 'subject_id'),
+        # Поиск по предмету, в том числе проверка внешнего ключа при удалении предмета
+        Index('ix_deadline_dates_subject_id', 'subject_id'),
+    )
+    
     def __repr__(self):
         return f"<DeadlineDate(notification_id={self.notification_id}, subject_id={self.subject_id}, date='{self.date}')>"
     
@@ -97,7 +154,11 @@ class NotificationMeta(Base):
     key = Column(String, nullable=False)
     value = Column(String)
     
-    notification = relationship("Notification")
+    notification = relationship("Notification", back_populates="meta")
+    
+    __table_args__ = (
+        Index('ix_notification_meta_notification_id_key', 'notification_id', 'key'),
+    )
     
     def __repr__(self):
         return f"<NotificationMeta(notification_id={self.notification_id}, key='{self.key}')>"
@@ -113,9 +174,15 @@ class NotificationConsultation(Base):
     time = Column(String)
     topic_type = Column(String, default='failed')  # 'failed' или 'satisfactory'
     
-    notification = relationship("Notification")
+    notification = relationship("Notification", back_populates="consultations")
     subject = relationship("Subject")
     
+    __table_args__ = (
+        Index('ix_notification_consultations_notification_id_subject_id', 'notification_id', 'subject_id'),
+        # Поиск по предмету, в том числе проверка внешнего ключа при удалении предмета
+        Index('ix_notification_consultations_subject_id', 'subject_id'),
+    )
+    
     def __repr__(self):
         return f"<NotificationConsultation(notification_id={self.notification_id}, subject_id={self.subject_id}, date='{self.date}')>"
     
@@ -128,6 +195,12 @@ class ClassProfile(Base):
     
     subject = relationship("Subject")
     
+    __table_args__ = (
+        Index('ix_class_profiles_class_name_subject_id', 'class_name', 'subject_id'),
+        # Поиск по предмету, в том числе проверка внешнего ключа при удалении предмета
+        Index('ix_class_profiles_subject_id', 'subject_id'),
+    )
+    
     def __repr__(self):
         return f"<ClassProfile(class_name='{self.class_name}', subject_id={self.subject_id})>"
     
@@ -140,6 +213,114 @@ class AnalysisSession(Base):
     earliest_date = Column(DateTime)
     latest_date = Column(DateTime)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Число сохраненных результатов; NULL - результаты еще не сохранялись (старые сессии)
+    results_count = Column(Integer)
+    
+    results = relationship("AnalysisResult", back_populates="session", order_by="AnalysisResult.id",
+                           cascade="all, delete-orphan")
+    students = relationship("AnalysisStudent", back_populates="session", order_by="AnalysisStudent.id",
+                            cascade="all, delete-orphan")
+    files = relationship("AnalysisFile", back_populates="session", order_by="AnalysisFile.id",
+                         cascade="all, delete-orphan")
+    
+    def __repr__(self):
+        return f"<AnalysisSession(class_name='{self.class_name}', earliest_date='{self.earliest_date}', latest_date='{self.latest_date}')>"
+
+class AnalysisResult(Base):
+    """Проблема с успеваемостью, найденная при анализе отчетов сессии"""
+    __tablename__ = 'analysis_results'
+    
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey('analysis_sessions.id', ondelete='CASCADE'), nullable=False)
+    student_name = Column(String, nullable=False)
+    class_name = Column(String)
+    subject = Column(String, nullable=False)
+    period = Column(String)
+    date = Column(String)
+    grade = Column(String)
+    problem_type = Column(String, nullable=False)
+    
+    session = relationship("AnalysisSession", back_populates="results")
+    
+    __table_args__ = (
+        # Результаты ученика в сессии
+        Index('ix_analysis_results_session_id_student_name', 'session_id', 'student_name'),
+        # Результаты сессии по типу проблемы
+        Index('ix_analysis_results_session_id_problem_type', 'session_id', 'problem_type'),
+    )
+    
+    def __repr__(self):
+        return f"<AnalysisResult(student_name='{self.student_name}', subject='{self.subject}', problem_type='{self.problem_type}')>"
+
+
+class AnalysisStudent(Base):
+    """Сводка результатов анализа по ученику: предметы для предзаполнения уведомления"""
+    __tablename__ = 'analysis_students'
+    
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey('analysis_sessions.id', ondelete='CASCADE'), nullable=False)
+    student_name = Column(String, nullable=False)
+    class_name = Column(String)
+    # Списки предметов в формате JSON, в порядке появления в результатах
+    failed_subjects = Column(String, nullable=False)
+    satisfactory_subjects = Column(String, nullable=False)
+    
+    session = relationship("AnalysisSession", back_populates="students")
+    
+    __table_args__ = (
+        # Одна сводка на ученика в сессии; поиск сводки по ФИО
+        Index('uq_analysis_students_session_id_student_name', 'session_id', 'student_name', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<AnalysisStudent(student_name='{self.student_name}', session_id={self.session_id})>"
+
+
+class AnalysisFile(Base):
+    """Разобранный файл отчета сессии анализа"""
+    __tablename__ = 'analysis_files'
+    
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey('analysis_sessions.id', ondelete='CASCADE'), nullable=False)
+    file_name = Column(String, nullable=False)  # Имя файла в папке сессии
+    student_name = Column(String, nullable=False)
+    class_name = Column(String)
+    actuality_date = Column(DateTime)
+    timings = Column(String)  # Время этапов разбора файла, JSON; NULL - результат взят из кэша
+    
+    session = relationship("AnalysisSession", back_populates="files")
+    
+    __table_args__ = (
+        # Файлы ученика в сессии
+        Index('ix_analysis_files_session_id_student_name', 'session_id', 'student_name'),
+    )
+    
+    def __repr__(self):
+        return f"<AnalysisFile(file_name='{self.file_name}', student_name='{self.student_name}')>"
+
+
+class AnalysisJob(Base):
+    """Фоновая задача анализа загруженных отчетов (utils/analysis_jobs.py)"""
+    __tablename__ = 'analysis_jobs'
+    
+    id = Column(Integer, primary_key=True)
+    # queued - в очереди, running - выполняется, done - готово, failed - ошибка
+    status = Column(String, nullable=False, default='queued')
+    class_name = Column(String, nullable=False)
+    folder_path = Column(String, nullable=False)
+    total_files = Column(Integer, nullable=False, default=0)
+    processed_files = Column(Integer, nullable=False, default=0)
+    # Сессия анализа, созданная по завершении задачи
+    session_id = Column(Integer, ForeignKey('analysis_sessions.id', ondelete='SET NULL'))
+    message = Column(String)
+    errors = Column(String)  # Файлы, которые не удалось разобрать, в формате JSON
+    # Процесс, в пуле которого выполняется задача: "имя компьютера:PID"
+    owner = Column(String)
+    # Время последнего обновления задачи ее процессом
+    heartbeat_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
     
     def __repr__(self):
-        return f"<AnalysisSession(class_name='{self.class_name}', earliest_date='{self.earliest_date}', latest_date='{self.latest_date}')>"
\ No newline at end of file
+        return f"<AnalysisJob(id={self.id}, status='{self.status}', processed_files={self.processed_files})>"
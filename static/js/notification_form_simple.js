@@ -30,6 +30,12 @@ document.addEventListener('DOMContentLoaded', function() {
     const deadlineSection = document.getElementById('deadlineSection');
     const deadlineCheckboxContainer = document.getElementById('deadlineCheckboxContainer');
     const consultationsScheduleSection = document.getElementById('consultationsScheduleSection');
+    const studentSearch = document.getElementById('studentSearch');
+    const studentSearchResults = document.getElementById('studentSearchResults');
+    
+    // Промис загрузки учеников выбранного класса
+    let studentsLoading = Promise.resolve();
+    let searchTimer = null;
     
     // Загружаем список классов
     loadClasses().then(() => {
@@ -147,7 +153,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Включаем список и загружаем учеников данного класса
         studentSelect.disabled = false;
-        loadStudentsByClass(className);
+        studentsLoading = loadStudentsByClass(className);
         
         // Определяем, является ли класс "A" классом
         const isClassA = className.includes('А') || className.includes('A');
@@ -162,6 +168,24 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // Поиск ученика по части ФИО с задержкой, чтобы не отправлять запрос на каждое нажатие
+    studentSearch.addEventListener('input', function() {
+        clearTimeout(searchTimer);
+        const query = this.value.trim();
+        
+        if (query.length < 2) {
+            hideSearchResults();
+            return;
+        }
+        
+        searchTimer = setTimeout(() => searchStudents(query), 200);
+    });
+    
+    studentSearch.addEventListener('blur', function() {
+        // Даем время обработать клик по результату
+        setTimeout(hideSearchResults, 200);
+    });
+    
     // Обработчик изменения выбора ученика - загружаем предметы
     studentSelect.addEventListener('change', function() {
         if (this.value) {
@@ -275,9 +299,63 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
     
+    // Функция поиска учеников по части ФИО
+    function searchStudents(query) {
+        fetch(`/api/search_students?q=${encodeURIComponent(query)}`)
+            .then(response => response.json())
+            .then(students => {
+                // Пока шел запрос, строка поиска могла измениться
+                if (studentSearch.value.trim() !== query) {
+                    return;
+                }
+                
+                studentSearchResults.innerHTML = '';
+                
+                if (students.length === 0) {
+                    const item = document.createElement('div');
+                    item.className = 'list-group-item text-muted';
+                    item.textContent = 'Ученики не найдены';
+                    studentSearchResults.appendChild(item);
+                }
+                
+                students.forEach(student => {
+                    const item = document.createElement('button');
+                    item.type = 'button';
+                    item.className = 'list-group-item list-group-item-action';
+                    item.textContent = `${student.full_name} (${student.class_name})`;
+                    item.addEventListener('mousedown', () => selectFoundStudent(student));
+                    studentSearchResults.appendChild(item);
+                });
+                
+                studentSearchResults.classList.remove('d-none');
+            })
+            .catch(error => {
+                debug('Ошибка при поиске учеников:', error);
+            });
+    }
+    
+    // Выбирает найденного ученика в списках класса и ученика
+    function selectFoundStudent(student) {
+        hideSearchResults();
+        studentSearch.value = student.full_name;
+        
+        classSelect.value = student.class_name;
+        classSelect.dispatchEvent(new Event('change'));
+        
+        studentsLoading.then(() => {
+            studentSelect.value = student.id;
+            studentSelect.dispatchEvent(new Event('change'));
+        });
+    }
+    
+    function hideSearchResults() {
+        studentSearchResults.classList.add('d-none');
+        studentSearchResults.innerHTML = '';
+    }
+    
     // Функция загрузки учеников по классу
     function loadStudentsByClass(className) {
-        fetch(`/api/get_students_by_class/${encodeURIComponent(className)}`)
+        return fetch(`/api/get_students_by_class/${encodeURIComponent(className)}`)
             .then(response => response.json())
             .then(students => {
                 studentSelect.innerHTML = '';
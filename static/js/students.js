@@ -129,8 +129,81 @@ document.addEventListener('DOMContentLoaded', function() {
     if (typeof makeSortable === 'function') {
         makeSortable('studentsTable');
     }
+    
+    // Постраничная загрузка списка учеников
+    const loadMoreStudents = document.getElementById('loadMoreStudents');
+    if (loadMoreStudents) {
+        loadMoreStudents.addEventListener('click', function() {
+            loadStudentsPage(false);
+        });
+        
+        const classFilter = document.getElementById('classFilter');
+        if (classFilter) {
+            classFilter.addEventListener('change', function() {
+                if (listViewBtn && !listViewBtn.classList.contains('active')) {
+                    listViewBtn.click();
+                } else {
+                    loadStudentsPage(true);
+                }
+            });
+        }
+        
+        loadStudentsPage(true);
+    }
 });
 
+// Размер страницы и курсор следующей страницы списка учеников
+const STUDENTS_PAGE_SIZE = 100;
+let studentsNextCursor = null;
+
+// Функция для загрузки очередной страницы учеников в таблицу
+function loadStudentsPage(reset) {
+    const tbody = document.getElementById('studentsTable');
+    const loadMoreBtn = document.getElementById('loadMoreStudents');
+    if (!tbody) {
+        return;
+    }
+    
+    if (reset) {
+        tbody.innerHTML = '';
+        studentsNextCursor = null;
+    }
+    
+    const params = new URLSearchParams({ limit: STUDENTS_PAGE_SIZE });
+    if (studentsNextCursor) {
+        params.set('cursor', studentsNextCursor);
+    }
+    
+    const classFilter = document.getElementById('classFilter');
+    if (classFilter && classFilter.value) {
+        params.set('class_name', classFilter.value);
+    }
+    
+    if (loadMoreBtn) {
+        loadMoreBtn.disabled = true;
+    }
+    
+    fetch(`/api/students?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            data.students.forEach(student => {
+                tbody.appendChild(createStudentRow(student));
+            });
+            
+            studentsNextCursor = data.next_cursor;
+            if (loadMoreBtn) {
+                loadMoreBtn.disabled = false;
+                loadMoreBtn.classList.toggle('d-none', !studentsNextCursor);
+            }
+        })
+        .catch(error => {
+            if (loadMoreBtn) {
+                loadMoreBtn.disabled = false;
+            }
+            showToast('Ошибка', 'Ошибка при загрузке списка учеников', 'error');
+        });
+}
+
 // Функция для редактирования ученика
 function editStudent(studentId) {
     fetch(`/admin/get_student/${studentId}`)
@@ -156,14 +229,20 @@ function editStudent(studentId) {
 }
 
 // Функция для удаления ученика
-function deleteStudent(studentId) {
-    if (confirm('Вы уверены, что хотите удалить этого ученика?')) {
-        fetch(`/admin/delete_student/${studentId}`, {
+function deleteStudent(studentId, withNotifications = false) {
+    if (withNotifications || confirm('Вы уверены, что хотите удалить этого ученика?')) {
+        const query = withNotifications ? '?with_notifications=1' : '';
+        fetch(`/admin/delete_student/${studentId}${query}`, {
             method: 'POST'
         })
         .then(response => response.json())
         .then(data => {
-            if (data.success) {
+            if (data.requires_confirmation) {
+                // У ученика есть уведомления - удаляем только после отдельного подтверждения
+                if (confirm(`${data.message}\nУдалить ученика вместе с уведомлениями?`)) {
+                    deleteStudent(studentId, true);
+                }
+            } else if (data.success) {
                 showToast('Успешно', data.message, 'success');
                 
                 // Удаляем строку из таблицы
@@ -220,15 +299,8 @@ function showListView() {
         </table>
     `;
     
-    // Загружаем всех учеников
-    fetch('/api/get_students')
-        .then(response => response.json())
-        .then(students => {
-            const tbody = document.getElementById('studentsTable');
-            students.forEach(student => {
-                tbody.appendChild(createStudentRow(student));
-            });
-        });
+    // Загружаем учеников постранично
+    loadStudentsPage(true);
 }
 
 // Функция для отображения учеников по группам
@@ -236,6 +308,12 @@ function showGroupView() {
     const tableContainer = document.querySelector('.table-responsive');
     tableContainer.innerHTML = '<div id="classGroups"></div>';
     
+    // В режиме "По классам" ученики загружаются по каждому классу отдельно
+    const loadMoreBtn = document.getElementById('loadMoreStudents');
+    if (loadMoreBtn) {
+        loadMoreBtn.classList.add('d-none');
+    }
+    
     // Загружаем классы
     fetch('/api/get_unique_classes')
         .then(response => response.json())
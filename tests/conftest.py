@@ -1,32 +1,46 @@
-import pytest
-from app import create_app
-from config import config
-from database.db import init_db
 import os
-import tempfile
+
+import pytest
+
+from database import db
+
+
+def pytest_addoption(parser):
+    parser.addoption('--benchmark', action='store_true',
+                     help='запускать замеры производительности (тесты с меткой benchmark)')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: замер времени выполнения; запускается с --benchmark')
+
+def pytest_collection_modifyitems(config, items):
+    """Замеры времени зависят от загрузки машины, поэтому по умолчанию не выполняются"""
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='замер производительности, запускается с --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+@pytest.fixture
+def database(tmp_path):
+    """Отдельная файловая база данных для теста"""
+    db.configure_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    db.init_db()
+    yield db
+    db.dispose_engine()
 
 @pytest.fixture
-def app():
-    """Create and configure a Flask app for testing"""
-    # Создаем временный файл базы данных
-    db_fd, db_path = tempfile.mkstemp()
-    
-    # Создаем тестовую конфигурацию
-    test_config = config['testing']
-    test_config.DATABASE_URI = f'sqlite:///{db_path}'
-    
-    app = create_app(test_config)
-    
-    # Создаем контекст приложения для выполнения тестов
-    with app.app_context():
-        # Инициализируем тестовую базу данных
-        init_db()
-        
+def app(database, tmp_path, monkeypatch):
+    """
+    Приложение Flask, работающее с базой данных теста. Рабочая папка - временная,
+    поэтому сессии и загруженные файлы не попадают в папку проекта.
+    """
+    monkeypatch.chdir(tmp_path)
+    for folder in ('flask_session', 'uploads/excel_files', 'generated_documents', 'temp'):
+        os.makedirs(folder, exist_ok=True)
+    from app import app
+    app.config['TESTING'] = True
     yield app
-    
-    # Удаляем временный файл базы данных
-    os.close(db_fd)
-    os.unlink(db_path)
 
 @pytest.fixture
 def client(app):
@@ -36,4 +50,18 @@ def client(app):
 @pytest.fixture
 def runner(app):
     """A test CLI runner for the app"""
-    return app.test_cli_runner()
\ No newline at end of file
+    return app.test_cli_runner()
+
+@pytest.fixture
+def admin_client(client, database):
+    """Клиент, вошедший как администратор"""
+    from auth.models import User
+    session = database.get_session()
+    if not session.query(User).filter_by(username='admin').first():
+        admin = User(username='admin', is_admin=True)
+        admin.set_password('password')
+        session.add(admin)
+        session.commit()
+    database.remove_session()
+    client.post('/login', data={'username': 'admin', 'password': 'password'})
+    return client
@@ -0,0 +1,30 @@
+# Построение Excel-отчетов об успеваемости для тестов анализатора
+
+from openpyxl import Workbook
+
+def write_report(path, student_name, rows, actuality_date='20.05.2025', class_name='10А',
+                 title='Отчёт об успеваемости'):
+    """
+    Создает отчет в формате выгрузки электронного журнала.
+    
+    rows - список (предмет, период, дата аттестации, итоговая отметка);
+    предмет указывается только в первой строке своего блока, как в выгрузке.
+    """
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append([title, class_name, None, student_name])  # ФИО в D1
+    sheet.append([f'Данные актуальны на {actuality_date}'])
+    sheet.append([])
+    sheet.append(['Предмет', 'Период', 'Дата', 'Отметки', 'Средневзвешенный балл', 'Итоговая отметка'])
+    previous_subject = None
+    for subject, period, date, grade in rows:
+        sheet.append([subject if subject != previous_subject else None, period, date, '5 4', 4.5, grade])
+        previous_subject = subject
+    workbook.save(path)
+    return path
+
+def without_timings(result):
+    """Результат разбора (или список сведений о файлах) без времени этапов, которое меняется от запуска к запуску"""
+    if isinstance(result, list):
+        return [without_timings(item) for item in result]
+    return {key: value for key, value in result.items() if key != 'timings'}
@@ -0,0 +1,144 @@
+import datetime
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from tests.excel_reports import write_report
+from utils import analysis_jobs
+from utils.excel_analyzer import analyze_report_files, list_report_files
+
+
+@pytest.fixture
+def reports(tmp_path):
+    folder = tmp_path / 'reports'
+    folder.mkdir()
+    for i in range(3):
+        write_report(folder / f'report_{i}.xlsx', f'Ученик {i}', [('Физика', 'Модуль 1', '01.10.2024', 3)])
+    (folder / 'broken.xlsx').write_bytes(b'not an excel file')
+    return folder
+
+def dead_pid():
+    """PID завершившегося процесса"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def wait_for_job(database, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = database.get_analysis_job(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'Задача {job_id} не завершилась: {job}')
+
+def test_progress_reported_per_file(reports):
+    calls = []
+    analyze_report_files(list_report_files(reports), workers=1, cache=False,
+                         progress=lambda processed, total: calls.append((processed, total)))
+    assert calls == [(0, 4), (1, 4), (2, 4), (3, 4), (4, 4)]
+
+@pytest.mark.parametrize('analysis_workers, job_workers, expected', [
+    (0, 1, 7),   # все ядра, кроме одного
+    (0, 3, 2),   # ядра делятся между задачами
+    (0, 16, 1),
+    (4, 2, 2),   # явно заданное число процессов тоже делится
+])
+def test_job_parse_workers_bounded(monkeypatch, analysis_workers, job_workers, expected):
+    config = {**analysis_jobs.get_config(), 'ANALYSIS_WORKERS': analysis_workers, 'ANALYSIS_JOB_WORKERS': job_workers}
+    monkeypatch.setattr(analysis_jobs, 'get_config', lambda: config)
+    monkeypatch.setattr(analysis_jobs.os, 'cpu_count', lambda: 8)
+
+    assert analysis_jobs.job_parse_workers() == expected
+
+def test_job_runs_in_background(database, reports, monkeypatch):
+    monkeypatch.setattr(analysis_jobs, 'analyze_report_files',
+                        lambda *args, **kwargs: analyze_report_files(*args, **{**kwargs, 'workers': 1, 'cache': False}))
+
+    job_id = analysis_jobs.submit_analysis_job('10 А', str(reports))
+    job = wait_for_job(database, job_id)
+
+    assert job['status'] == 'done', job
+    assert (job['processed_files'], job['total_files']) == (4, 4)
+    assert [error['file'] for error in job['errors']] == ['broken.xlsx']
+    assert len(database.get_analysis_results(job['session_id'])) == 3
+    assert len(database.get_analysis_files(job['session_id'])) == 3
+    # Время этапов разбора сохраняется вместе со сведениями о файлах
+    assert all(file['timings']['open'] >= 0 for file in database.get_analysis_files(job['session_id']))
+
+def test_failed_and_interrupted_jobs(database, tmp_path):
+    failed_id = database.create_analysis_job('10 А', str(tmp_path / 'missing'), 0)
+    analysis_jobs.run_analysis_job(failed_id)
+    assert database.get_analysis_job(failed_id)['status'] == 'failed'
+
+    # Задача осталась от прошлого запуска процесса с тем же PID
+    queued_id = database.create_analysis_job('10 А', str(tmp_path), 0)
+    database.fail_unfinished_analysis_jobs()
+    job = database.get_analysis_job(queued_id)
+    assert job['status'] == 'failed'
+    assert 'перезапуском' in job['message']
+
+@pytest.mark.skipif(os.name == 'nt', reason='На Windows процессы владельцев не проверяются')
+def test_jobs_of_live_processes_not_failed(database, tmp_path):
+    """При запуске процесса задачи других живых процессов продолжают выполняться"""
+    hostname = socket.gethostname()
+    long_ago = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+    jobs = {
+        'live_local': (f'{hostname}:{os.getppid()}', long_ago),
+        'dead_local': (f'{hostname}:{dead_pid()}', datetime.datetime.utcnow()),
+        'fresh_remote': ('other-host:1234', datetime.datetime.utcnow()),
+        'stale_remote': ('other-host:1234', long_ago),
+        'unknown_owner': (None, None),
+    }
+    job_ids = {}
+    for name, (owner, heartbeat_at) in jobs.items():
+        job_ids[name] = database.create_analysis_job('10 А', str(tmp_path), 0)
+        database.update_analysis_job(job_ids[name], owner=owner, heartbeat_at=heartbeat_at)
+
+    database.fail_unfinished_analysis_jobs()
+
+    statuses = {name: database.get_analysis_job(job_id)['status'] for name, job_id in job_ids.items()}
+    assert statuses == {
+        'live_local': 'queued',
+        'dead_local': 'failed',
+        'fresh_remote': 'queued',
+        'stale_remote': 'failed',
+        'unknown_owner': 'failed',
+    }
+
+def test_queued_reports_parsed_while_upload_continues(database, reports, monkeypatch):
+    """Первый файл разбирается до того, как загрузка остальных файлов завершена"""
+    monkeypatch.setattr(analysis_jobs, 'analyze_report_files',
+                        lambda *args, **kwargs: analyze_report_files(*args, **{**kwargs, 'workers': 1, 'cache': False}))
+    paths = [str(path) for path in list_report_files(reports)]
+    queue = analysis_jobs.ReportQueue()
+
+    job_id = analysis_jobs.submit_analysis_job('10 А', str(reports), queue)
+    queue.put(paths[0])
+    deadline = time.monotonic() + 30
+    while database.get_analysis_job(job_id)['processed_files'] < 1:
+        assert time.monotonic() < deadline, 'Первый файл не разобран до конца загрузки'
+        time.sleep(0.05)
+    assert database.get_analysis_job(job_id)['status'] == 'running'
+
+    for path in paths[1:]:
+        queue.put(path)
+    queue.close()
+    job = wait_for_job(database, job_id)
+
+    assert job['status'] == 'done', job
+    assert (job['processed_files'], job['total_files']) == (4, 4)
+    assert len(database.get_analysis_results(job['session_id'])) == 3
+
+def test_aborted_upload_fails_job(database, reports):
+    queue = analysis_jobs.ReportQueue()
+    job_id = analysis_jobs.submit_analysis_job('10 А', str(reports), queue)
+    queue.abort('Загрузка файлов прервана')
+
+    job = wait_for_job(database, job_id)
+    assert job['status'] == 'failed'
+    assert 'прервана' in job['message']
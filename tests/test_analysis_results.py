@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, text
+
+from database.models import AnalysisSession, AnalysisResult
+
+
+def create_analysis_session(database):
+    session = database.get_session()
+    analysis_session = AnalysisSession(class_name='10 А', folder_path='uploads/excel_files/test')
+    session.add(analysis_session)
+    session.commit()
+    database.remove_session()
+    return analysis_session.id
+
+def problem(student, subject, grade, problem_type, date='01.10.2024'):
+    return {'ФИО ученика': student, 'Класс': '10А', 'Предмет': subject,
+            'Период промежуточной аттестации': 'Модуль 1', 'Дата промежуточной аттестации': date,
+            'Итоговая отметка': grade, 'Тип проблемы': problem_type}
+
+PROBLEMS = [
+    problem('Иванов Иван', 'Алгебра', 3.0, 'Тройка'),
+    problem('Петров Петр', 'Физика', 3.0, 'Тройка', date=datetime(2024, 12, 1)),
+    problem('Иванов Иван', 'Физика', 2.0, 'Задолженность'),
+    problem('Петров Петр', 'Алгебра', 'Н/А', 'Задолженность (не выставлена оценка)', date=None),
+]
+
+def test_results_saved_and_filtered(database):
+    session_id = create_analysis_session(database)
+    database.save_analysis_results(session_id, PROBLEMS)
+
+    results = database.get_analysis_results(session_id)
+    assert [(r['ФИО ученика'], r['Предмет'], r['Итоговая отметка']) for r in results] == [
+        ('Иванов Иван', 'Алгебра', '3'), ('Петров Петр', 'Физика', '3'),
+        ('Иванов Иван', 'Физика', '2'), ('Петров Петр', 'Алгебра', 'Н/А'),
+    ]
+    assert results[1]['Дата промежуточной аттестации'] == '01.12.2024'
+    assert results[3]['Дата промежуточной аттестации'] is None
+
+    ivanov = database.get_analysis_results(session_id, student_name='Иванов Иван')
+    assert [r['Предмет'] for r in ivanov] == ['Алгебра', 'Физика']
+    threes = database.get_analysis_results(session_id, problem_type='Тройка')
+    assert [r['ФИО ученика'] for r in threes] == ['Иванов Иван', 'Петров Петр']
+
+def test_results_replaced_and_counted(database):
+    session_id = create_analysis_session(database)
+    database.save_analysis_results(session_id, PROBLEMS)
+    database.save_analysis_results(session_id, PROBLEMS[:1])
+
+    assert len(database.get_analysis_results(session_id)) == 1
+    session = database.get_session()
+    assert session.get(AnalysisSession, session_id).results_count == 1
+
+    # Результаты удаляются вместе с сессией анализа
+    session.delete(session.get(AnalysisSession, session_id))
+    session.commit()
+    assert session.execute(select(AnalysisResult)).all() == []
+
+@pytest.mark.parametrize('condition, index_name', [
+    ("student_name = 'Иванов Иван'", 'ix_analysis_results_session_id_student_name'),
+    ("problem_type = 'Тройка'", 'ix_analysis_results_session_id_problem_type'),
+])
+def test_result_queries_use_indexes(database, condition, index_name):
+    with database.get_engine().connect() as connection:
+        plan = ' | '.join(row[-1] for row in connection.execute(text(
+            f"EXPLAIN QUERY PLAN SELECT * FROM analysis_results WHERE session_id = 1 AND {condition} ORDER BY id"
+        )))
+    assert index_name in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan
@@ -0,0 +1,71 @@
+from sqlalchemy import select, text
+
+from database.models import AnalysisSession, AnalysisStudent
+
+
+def create_analysis_session(database):
+    session = database.get_session()
+    analysis_session = AnalysisSession(class_name='10 А', folder_path='uploads/excel_files/test')
+    session.add(analysis_session)
+    session.commit()
+    database.remove_session()
+    return analysis_session.id
+
+def problem(student, subject, problem_type, period='Модуль 1'):
+    return {'ФИО ученика': student, 'Класс': '10 А', 'Предмет': subject,
+            'Период промежуточной аттестации': period, 'Дата промежуточной аттестации': '01.10.2024',
+            'Итоговая отметка': 3.0 if problem_type == 'Тройка' else 2.0, 'Тип проблемы': problem_type}
+
+PROBLEMS = [
+    problem('Иванов Иван', 'Алгебра', 'Тройка'),
+    problem('Иванов Иван', 'Физика', 'Задолженность'),
+    problem('Иванов Иван', 'Алгебра', 'Тройка', period='Модуль 2'),
+    problem('Иванов Иван', 'Химия', 'Задолженность (не выставлена оценка)'),
+    problem('Петров Петр', 'Физика', 'Тройка'),
+]
+
+def test_student_summaries_saved_with_results(database):
+    """Сводки учеников содержат предметы без повторов в порядке появления"""
+    session_id = create_analysis_session(database)
+    database.save_analysis_results(session_id, PROBLEMS)
+
+    students = database.get_analysis_students(session_id, ['Иванов Иван', 'Петров Петр', 'Сидоров Сидор'])
+    assert students['Иванов Иван'] == {
+        'student_name': 'Иванов Иван', 'student_class': '10 А',
+        'failed_subjects': ['Физика', 'Химия'], 'satisfactory_subjects': ['Алгебра'],
+    }
+    assert students['Петров Петр']['failed_subjects'] == []
+    assert 'Сидоров Сидор' not in students
+
+    # Повторное сохранение заменяет сводки
+    database.save_analysis_results(session_id, PROBLEMS[4:])
+    assert database.get_analysis_student(session_id, 'Иванов Иван') is None
+
+def test_students_created_in_batch(database):
+    database.add_student('Иванов Иван', '10 А')
+    student_ids = database.get_or_create_student_ids({'Иванов Иван': '10 А', 'Петров Петр': '10 А',
+                                                      'Сидоров Сидор': None})
+
+    students = {s.full_name: s for s in database.get_all_students()}
+    assert student_ids == {name: students[name].id for name in students}
+    assert students['Петров Петр'].class_name == '10 А'
+
+def test_migration_resets_sessions_without_summaries(database):
+    """Сессии, сохраненные без сводок учеников, будут проанализированы повторно"""
+    session_id = create_analysis_session(database)
+    database.save_analysis_results(session_id, PROBLEMS)
+    with database.get_engine().begin() as connection:
+        connection.execute(text('DELETE FROM analysis_students'))
+
+    database.init_db()
+
+    session = database.get_session()
+    assert session.get(AnalysisSession, session_id).results_count is None
+
+def test_summary_lookup_uses_index(database):
+    statement = select(AnalysisStudent).where(AnalysisStudent.session_id == 1,
+                                              AnalysisStudent.student_name.in_(['Иванов Иван', 'Петров Петр']))
+    sql = str(statement.compile(database.get_engine(), compile_kwargs={'literal_binds': True}))
+    with database.get_engine().connect() as connection:
+        plan = ' | '.join(row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+    assert 'uq_analysis_students_session_id_student_name' in plan, plan
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from database.models import AnalysisSession
+from tests.excel_reports import write_report
+from utils.excel_analyzer import analyze_report_files, split_appended_files
+
+
+def create_analysis_session(database, folder_path):
+    session = database.get_session()
+    analysis_session = AnalysisSession(class_name='10 А', folder_path=str(folder_path))
+    session.add(analysis_session)
+    session.commit()
+    database.remove_session()
+    return analysis_session.id
+
+def get_analysis_session(database, session_id):
+    session = database.get_session()
+    analysis_session = session.get(AnalysisSession, session_id)
+    database.remove_session()
+    return analysis_session
+
+def append(database, session_id, file_paths):
+    """Добавляет файлы в сессию так же, как маршрут добавления файлов"""
+    analysis = analyze_report_files(file_paths, workers=1, cache=False)
+    accepted, superseded = split_appended_files(database.get_analysis_files(session_id), analysis['files'])
+    students = {file['student_name'] for file in accepted}
+    problems = [p for p in analysis['problems'] if p['ФИО ученика'] in students]
+    return database.replace_student_analysis_results(session_id, problems, accepted), superseded
+
+def file_info(student_name, day):
+    return {'file': f'{student_name}_{day}.xlsx', 'student_name': student_name,
+            'actuality_date': datetime(2025, 5, day) if day else None}
+
+def test_split_appended_files():
+    stored = [file_info('Иванов Иван', 10), file_info('Петров Петр', 20)]
+    new = [file_info('Иванов Иван', 15), file_info('Петров Петр', 15),
+           file_info('Сидоров Сидор', None), file_info('Иванов Иван', None)]
+
+    accepted, superseded = split_appended_files(stored, new)
+
+    assert [f['file'] for f in accepted] == ['Иванов Иван_15.xlsx', 'Сидоров Сидор_None.xlsx',
+                                             'Иванов Иван_None.xlsx']
+    assert [f['file'] for f in superseded] == ['Петров Петр_15.xlsx']
+
+def test_append_replaces_superseded_student(database, tmp_path):
+    """Новые ученики добавляются, ученик с более новым отчетом получает его результаты"""
+    ivanov = write_report(tmp_path / 'ivanov.xlsx', 'Иванов Иван',
+                          [('Алгебра', 'Модуль 1', '01.10.2024', 3)], actuality_date='10.05.2025')
+    petrov = write_report(tmp_path / 'petrov.xlsx', 'Петров Петр',
+                          [('Физика', 'Модуль 1', '01.10.2024', 2)], actuality_date='12.05.2025')
+    session_id = create_analysis_session(database, tmp_path)
+    analysis = analyze_report_files([ivanov, petrov], workers=1, cache=False)
+    database.save_analysis_results(session_id, analysis['problems'], analysis['files'])
+
+    ivanov_new = write_report(tmp_path / 'ivanov_new.xlsx', 'Иванов Иван',
+                              [('Алгебра', 'Модуль 1', '01.10.2024', 2)], actuality_date='25.05.2025')
+    petrov_old = write_report(tmp_path / 'petrov_old.xlsx', 'Петров Петр',
+                              [('Физика', 'Модуль 1', '01.10.2024', 3)], actuality_date='01.05.2025')
+    sidorov = write_report(tmp_path / 'sidorov.xlsx', 'Сидоров Сидор',
+                           [('Физика', 'Модуль 1', '01.10.2024', 3)], actuality_date='15.05.2025')
+    replaced, superseded = append(database, session_id, [ivanov_new, petrov_old, sidorov])
+
+    assert replaced == ['ivanov.xlsx']
+    assert [f['file'] for f in superseded] == ['petrov_old.xlsx']
+    results = {(r['ФИО ученика'], r['Предмет'], r['Тип проблемы']) for r in database.get_analysis_results(session_id)}
+    assert results == {('Иванов Иван', 'Алгебра', 'Задолженность'), ('Петров Петр', 'Физика', 'Задолженность'),
+                       ('Сидоров Сидор', 'Физика', 'Тройка')}
+    assert database.get_analysis_student(session_id, 'Иванов Иван')['failed_subjects'] == ['Алгебра']
+
+    analysis_session = get_analysis_session(database, session_id)
+    assert analysis_session.results_count == 3
+    assert (analysis_session.earliest_date, analysis_session.latest_date) == (
+        datetime(2025, 5, 12), datetime(2025, 5, 25))
+    assert sorted(f['file'] for f in database.get_analysis_files(session_id)) == [
+        'ivanov_new.xlsx', 'petrov.xlsx', 'sidorov.xlsx']
+
+def test_migration_resets_sessions_without_files(database, tmp_path):
+    session_id = create_analysis_session(database, tmp_path)
+    database.save_analysis_results(session_id, [])
+    database.init_db()
+    assert get_analysis_session(database, session_id).results_count is None
+
+    database.save_analysis_results(session_id, [], [file_info('Иванов Иван', 10)])
+    database.init_db()
+    assert get_analysis_session(database, session_id).results_count == 0
@@ -0,0 +1,81 @@
+import os
+import zipfile
+
+import pytest
+
+from config import get_config
+from utils import excel_analyzer
+from utils.excel_analyzer import analyze_report_files, list_report_files, list_report_sources
+from utils.parse_cache import ParseCache
+from tests.excel_reports import write_report
+
+
+@pytest.fixture
+def reports(tmp_path):
+    """Отчеты в отдельной папке и ZIP-архив с теми же отчетами в папке загрузки"""
+    plain = tmp_path / 'plain'
+    plain.mkdir()
+    for i in range(5):
+        write_report(plain / f'Ученик {i} 10А.xlsx', f'Ученик {i}', [
+            ('Алгебра', 'Модуль 1', '01.10.2024', 3),
+            ('Физика', 'Модуль 1', '01.10.2024', 2 + i % 3),
+        ])
+
+    upload = tmp_path / 'upload'
+    upload.mkdir()
+    with zipfile.ZipFile(upload / 'export.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+        for file_path in list_report_files(plain):
+            archive.write(file_path, f'Отчеты/{os.path.basename(file_path)}')
+        archive.writestr('Отчеты/readme.txt', 'не отчет')
+    return plain, upload
+
+def with_config(monkeypatch, **values):
+    config = {**get_config(), **values}
+    monkeypatch.setattr(excel_analyzer, 'get_config', lambda: config)
+
+def test_archive_reports_match_extracted_files(reports):
+    plain, upload = reports
+
+    sources = list_report_sources(upload)
+    from_archive = analyze_report_files(sources, workers=1, cache=False)
+    from_files = analyze_report_files(list_report_files(plain), workers=1, cache=False)
+
+    assert [os.path.basename(source.path) for source in sources] == sorted(os.listdir(plain))
+    assert from_archive['problems'] == from_files['problems']
+    assert [f['file'] for f in from_archive['files']] == [f['file'] for f in from_files['files']]
+
+def test_inflight_reports_bounded(reports, monkeypatch):
+    """Из архива в память читается не больше ANALYSIS_MAX_INFLIGHT отчетов сверх уже выданных"""
+    _, upload = reports
+    with_config(monkeypatch, ANALYSIS_MAX_INFLIGHT=2)
+    loaded = []
+    load = excel_analyzer._ReportLoader.load
+    monkeypatch.setattr(excel_analyzer._ReportLoader, 'load',
+                        lambda self, source: loaded.append(source) or load(self, source))
+
+    sources = list_report_sources(upload)
+    results = excel_analyzer._read_files(sources, ['Физика'], 2, 'pandas')
+    for consumed in range(1, len(sources) + 1):
+        assert 'error' not in next(results)
+        assert len(loaded) <= consumed + 2
+    assert len(loaded) == len(sources)
+
+def test_oversized_entry_reported_as_error(reports, monkeypatch):
+    _, upload = reports
+    with_config(monkeypatch, MAX_CONTENT_LENGTH=100)
+
+    analysis = analyze_report_files(list_report_sources(upload), workers=1, cache=False)
+
+    assert analysis['problems'] == []
+    assert len(analysis['errors']) == 5
+    assert 'больше' in analysis['errors'][0]['message']
+
+def test_archive_reports_cached(reports, tmp_path, monkeypatch):
+    _, upload = reports
+    cache = ParseCache(str(tmp_path / 'cache'), max_bytes=10 * 1024 * 1024)
+    first = analyze_report_files(list_report_sources(upload), workers=1, cache=cache)
+
+    monkeypatch.setattr(excel_analyzer, '_read_files',
+                        lambda sources, *args: [pytest.fail('повторный разбор') for _ in sources])
+    second = analyze_report_files(list_report_sources(upload), workers=1, cache=cache)
+    assert second['problems'] == first['problems']
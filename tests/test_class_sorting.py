@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import event, text
+
+from database.models import Student, class_sort_key
+
+
+@pytest.mark.parametrize('class_name, expected', [
+    ('10 А', (10, 'А')),
+    ('7б', (7, 'Б')),
+    ('11', (11, '')),
+    ('Выпуск', (999, 'Выпуск')),
+])
+def test_class_sort_key(class_name, expected):
+    assert class_sort_key(class_name) == expected
+
+def test_classes_sorted_by_grade_and_letter(database):
+    """Классы упорядочены по параллели, затем по букве"""
+    database.import_students_from_list([
+        {'full_name': 'Ученик 1', 'class_name': '11 А'},
+        {'full_name': 'Ученик 2', 'class_name': '5 Б'},
+        {'full_name': 'Ученик 3', 'class_name': 'Выпуск'},
+        {'full_name': 'Ученик 4', 'class_name': '5 А'},
+    ])
+    database.add_student('Ученик 5', '10Б')
+    database.add_student('Ученик 6', '5 А')
+
+    assert database.get_unique_classes_sorted() == ['5 А', '5 Б', '10Б', '11 А', 'Выпуск']
+    assert [s.full_name for s in database.get_all_students_sorted()] == [
+        'Ученик 4', 'Ученик 6', 'Ученик 2', 'Ученик 5', 'Ученик 1', 'Ученик 3'
+    ]
+
+def test_class_list_cached_until_roster_changes(database):
+    """Список классов берется из кэша, пока состав учеников не изменится"""
+    database.add_student('Иванов Иван', '9 А')
+    assert database.get_unique_classes_sorted() == ['9 А']
+
+    statements = []
+    event.listen(database.get_engine(), 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    database.get_unique_classes_sorted()
+    # Из базы читается только версия состава учеников
+    assert len(statements) == 1 and 'data_versions' in statements[0]
+
+    database.add_student('Петров Петр', '8 В')
+    assert database.get_unique_classes_sorted() == ['8 В', '9 А']
+
+def test_class_list_refreshed_after_change_in_another_process(database):
+    """Изменение состава учеников другим процессом сбрасывает кэш по версии в базе"""
+    database.add_student('Иванов Иван', '9 А')
+    assert database.get_unique_classes_sorted() == ['9 А']
+
+    # Другой процесс добавляет ученика и увеличивает версию, не трогая кэш этого процесса
+    with database.get_engine().begin() as connection:
+        connection.execute(text("INSERT INTO students (full_name, class_name, grade, letter) "
+                                "VALUES ('Петров Петр', '8 В', 8, 'В')"))
+        connection.execute(text("UPDATE data_versions SET version = version + 1 WHERE name = 'students'"))
+
+    assert database.get_unique_classes_sorted() == ['8 В', '9 А']
+
+def test_sort_key_follows_class_name_update(database):
+    """Ключ сортировки пересчитывается при переводе ученика в другой класс"""
+    student_id = database.add_student('Иванов Иван', '9 А')
+
+    session = database.get_session()
+    student = session.get(Student, student_id)
+    student.class_name = '10 В'
+    session.commit()
+
+    with database.get_engine().connect() as connection:
+        row = connection.execute(text('SELECT grade, letter FROM students WHERE id = :id'), {'id': student_id}).one()
+    assert tuple(row) == (10, 'В')
@@ -0,0 +1,60 @@
+from sqlalchemy import event, text
+
+
+def count_rows(database, table):
+    with database.get_engine().connect() as connection:
+        return connection.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+
+def make_debts(count):
+    return {
+        f'Ученик {i}': [
+            {'subject': 'Математика', 'period': 'Модуль 1', 'date': '20.05.2025', 'grade': 2},
+            {'subject': 'Черчение', 'period': 'Модуль 1', 'date': float('nan'), 'grade': 2},
+        ]
+        for i in range(count)
+    }
+
+def test_creates_notifications_in_batches(database):
+    """Уведомления, предметы и сроки создаются для всех найденных учеников"""
+    debts = make_debts(50)
+    database.import_students_from_list([{'full_name': name, 'class_name': '10 А'} for name in debts])
+    debts['Неизвестный ученик'] = debts['Ученик 0']
+    template_type_id = database.get_all_template_types()[0].id
+
+    commits = []
+    event.listen(database.get_engine(), 'commit', lambda conn: commits.append(conn))
+    results = database.create_notifications_from_csv_data(debts, template_type_id, 'Модуль 1', chunk_size=20)
+
+    assert results['success'] == 50
+    assert results['failed_students'] == [{'name': 'Неизвестный ученик', 'reason': 'Ученик не найден в базе данных'}]
+    assert count_rows(database, 'notifications') == 50
+    assert count_rows(database, 'notification_subjects') == 100
+    assert count_rows(database, 'deadline_dates') == 50  # Пустая дата не попадает в график
+    # Новый предмет создается один раз, уведомления сохраняются тремя пакетами
+    assert len(commits) == 4
+
+def test_failed_batch_reports_each_student(database):
+    """Ошибка в пакете не мешает сохранить остальных учеников"""
+    debts = make_debts(3)
+    database.import_students_from_list([{'full_name': name, 'class_name': '10 А'} for name in debts])
+
+    results = database.create_notifications_from_csv_data(debts, 999, 'Модуль 1')
+
+    # Несуществующий тип шаблона нарушает внешний ключ для каждого ученика
+    assert results['success'] == 0
+    assert [item['name'] for item in results['failed_students']] == list(debts)
+    assert count_rows(database, 'notifications') == 0
+
+def test_dry_run_writes_nothing(database):
+    """В режиме проверки база данных не изменяется"""
+    debts = make_debts(5)
+    database.import_students_from_list([{'full_name': name, 'class_name': '10 А'} for name in list(debts)[:4]])
+    subjects_before = count_rows(database, 'subjects')
+
+    results = database.create_notifications_from_csv_data(debts, 1, 'Модуль 1', dry_run=True)
+
+    assert results['dry_run'] is True
+    assert results['success'] == 4
+    assert results['failed'] == 1
+    assert count_rows(database, 'notifications') == 0
+    assert count_rows(database, 'subjects') == subjects_before
@@ -0,0 +1,45 @@
+import threading
+
+from sqlalchemy import text
+
+
+def test_sqlite_pragmas_applied(database):
+    """Настройки SQLite применяются к каждому соединению пула"""
+    with database.get_engine().connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA foreign_keys')).scalar() == 1
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+def test_concurrent_writers_do_not_fail(database):
+    """Одновременные записи из нескольких потоков не получают 'database is locked'"""
+    threads_count = 8
+    writes_per_thread = 25
+    errors = []
+    start = threading.Barrier(threads_count)
+    template_type_id = database.get_all_template_types()[0].id
+    subject_id = database.get_all_subjects()[0].id
+
+    def writer(index):
+        try:
+            start.wait()
+            for i in range(writes_per_thread):
+                student_id = database.add_student(f'Ученик {index}-{i}', f'{index + 5} А')
+                database.create_notification(student_id, template_type_id, 'Модуль 1', [subject_id])
+                # Читатели работают параллельно с писателями
+                database.get_student_by_id(student_id)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            database.remove_session()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    with database.get_engine().connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM students')).scalar() == threads_count * writes_per_thread
+        assert connection.execute(text('SELECT COUNT(*) FROM notifications')).scalar() == threads_count * writes_per_thread
@@ -0,0 +1,52 @@
+import threading
+
+
+def test_engine_is_shared(database):
+    """Движок создается один раз на процесс"""
+    assert database.get_engine() is database.get_engine()
+    assert database.get_session().get_bind() is database.get_engine()
+
+def test_session_is_scoped_to_thread(database):
+    """Каждый поток получает собственную сессию, внутри потока она одна"""
+    main_session = database.get_session()
+    assert database.get_session() is main_session
+
+    other_sessions = []
+
+    def worker():
+        other_sessions.append(database.get_session())
+        database.remove_session()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert other_sessions[0] is not main_session
+
+def test_remove_session_starts_new_session(database):
+    """После завершения запроса поток получает новую сессию"""
+    first = database.get_session()
+    database.remove_session()
+    assert database.get_session() is not first
+
+def test_helpers_work_from_several_threads(database):
+    """Хелперы можно вызывать одновременно из нескольких потоков"""
+    errors = []
+
+    def worker(index):
+        try:
+            student_id = database.add_student(f'Ученик {index}', '10 А')
+            assert database.get_student_by_id(student_id).full_name == f'Ученик {index}'
+        except Exception as e:
+            errors.append(e)
+        finally:
+            database.remove_session()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(database.get_all_students()) == 8
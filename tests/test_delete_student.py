@@ -0,0 +1,33 @@
+from database.models import Notification
+
+
+def create_student_with_notification(database):
+    student_id = database.add_student('Иванов Иван', '10 А')
+    subject_ids = database.resolve_subjects(['Физика'])
+    database.create_notification(student_id, database.get_all_template_types()[0].id, 'Модуль 2',
+                                 list(subject_ids.values()), [])
+    return student_id
+
+def test_student_without_notifications_deleted(admin_client, database):
+    student_id = database.add_student('Петров Петр', '10 А')
+
+    response = admin_client.post(f'/admin/delete_student/{student_id}')
+
+    assert response.get_json()['success']
+    assert database.get_student_by_id(student_id) is None
+
+def test_student_with_notifications_requires_confirmation(admin_client, database):
+    """Уведомления ученика не удаляются без явного подтверждения"""
+    student_id = create_student_with_notification(database)
+
+    refused = admin_client.post(f'/admin/delete_student/{student_id}').get_json()
+
+    assert not refused['success']
+    assert refused['requires_confirmation'] and refused['notifications_count'] == 1
+    assert database.get_student_by_id(student_id) is not None
+    assert database.get_session().query(Notification).filter_by(student_id=student_id).count() == 1
+
+    confirmed = admin_client.post(f'/admin/delete_student/{student_id}?with_notifications=1').get_json()
+
+    assert confirmed['success']
+    assert database.get_student_by_id(student_id) is None
@@ -0,0 +1,128 @@
+import pytest
+
+from utils import excel_analyzer
+from utils.excel_analyzer import analyze_report_files, list_report_files, parse_report_file
+from tests.excel_reports import write_report
+
+
+@pytest.fixture
+def reports(tmp_path):
+    """Папка с отчетами нескольких учеников и одним поврежденным файлом"""
+    write_report(tmp_path / 'b.xlsx', 'Петров Петр', [
+        ('Алгебра', 'Модуль 1', '01.10.2024', 3),
+        ('Алгебра', 'Модуль 2', '01.12.2024', 5),   # тройка исправлена
+        ('Физика', 'Модуль 1', '01.10.2024', 2),
+        ('Физика', 'Модуль 2', '01.12.2024', 3),
+    ])
+    write_report(tmp_path / 'a.xlsx', 'Иванов Иван', [
+        ('Геометрия', 'Модуль 1', '01.10.2024', 3),
+        ('Информатика', 'Модуль 1', '01.10.2024', None),  # оценка не выставлена
+        ('Информатика', 'Модуль 3', '01.06.2025', None),  # модуль еще не завершен
+        ('История', 'Модуль 1', '01.10.2024', 2),         # не профильный предмет
+    ])
+    (tmp_path / 'broken.xlsx').write_bytes(b'not an excel file')
+    return tmp_path
+
+def summary(problems):
+    return [(p['ФИО ученика'], p['Предмет'], p['Период промежуточной аттестации'], p['Тип проблемы'])
+            for p in problems]
+
+def test_parse_report_file_is_self_contained(reports):
+    result = parse_report_file(str(reports / 'b.xlsx'), excel_analyzer.DEFAULT_SUBJECTS_OF_INTEREST)
+
+    assert result['student_name'] == 'Петров Петр'
+    assert result['class_name'] == '10А'
+    assert result['actuality_date'].strftime('%d.%m.%Y') == '20.05.2025'
+    assert [kind for kind, _ in result['events']] == ['problem', 'improved', 'problem', 'problem']
+
+def test_problems_detected_in_file_order(reports):
+    """Проблемы идут в порядке файлов: сначала тройки, затем задолженности"""
+    analysis = analyze_report_files(list_report_files(reports), workers=1, cache=False)
+
+    assert summary(analysis['problems']) == [
+        ('Иванов Иван', 'Геометрия', 'Модуль 1', 'Тройка'),
+        ('Петров Петр', 'Физика', 'Модуль 2', 'Тройка'),
+        ('Иванов Иван', 'Информатика', 'Модуль 1', 'Задолженность (не выставлена оценка)'),
+        ('Петров Петр', 'Физика', 'Модуль 1', 'Задолженность'),
+    ]
+    assert analysis['errors'][0]['file'] == 'broken.xlsx'
+    assert len(analysis['errors']) == 1
+
+def test_parallel_parsing_matches_serial(reports):
+    """Разбор в пуле процессов дает тот же результат, что и последовательный"""
+    files = list_report_files(reports)
+
+    serial = analyze_report_files(files, workers=1, cache=False)
+    parallel = analyze_report_files(files, workers=3, cache=False)
+
+    assert summary(parallel['problems']) == summary(serial['problems'])
+    assert parallel['errors'] == serial['errors']
+
+def test_serial_fallback_when_pool_unavailable(reports, monkeypatch):
+    def unavailable_pool(*args, **kwargs):
+        raise OSError('процессы запрещены')
+
+    monkeypatch.setattr(excel_analyzer, 'ProcessPoolExecutor', unavailable_pool)
+    analysis = analyze_report_files(list_report_files(reports), workers=4, cache=False)
+
+    assert len(analysis['problems']) == 4
+
+def test_single_streamed_report_parsed_without_pool(reports, monkeypatch):
+    """Один поступивший отчет разбирается без запуска пула процессов"""
+    def unexpected_pool(*args, **kwargs):
+        raise AssertionError('пул процессов не должен запускаться')
+
+    monkeypatch.setattr(excel_analyzer, 'ProcessPoolExecutor', unexpected_pool)
+    results = list(excel_analyzer._read_files(
+        iter([str(reports / 'b.xlsx')]), excel_analyzer.DEFAULT_SUBJECTS_OF_INTEREST, 4, 'pandas'
+    ))
+
+    assert len(results) == 1
+    assert results[0]['student_name'] == 'Петров Петр'
+
+def test_load_report_matches_separate_reads(reports):
+    """Одно чтение файла дает те же шапку и таблицу, что и отдельные чтения"""
+    import pandas as pd
+    from utils.excel_analyzer import REPORT_COLUMNS, load_report
+
+    path = str(reports / 'b.xlsx')
+    report = load_report(path)
+    header = pd.read_excel(path, sheet_name=0, nrows=5, header=None)
+    grades = pd.read_excel(path, sheet_name=0, skiprows=3)
+    grades.columns = REPORT_COLUMNS
+
+    assert report['header'].iloc[:, :header.shape[1]].equals(header)
+    assert report['grades'].equals(grades)
+    assert report['student_name'] == 'Петров Петр'
+    assert report['class_name'] == '10А'
+
+def test_file_dates_taken_from_parsed_reports(reports):
+    write_report(reports / 'c.xlsx', 'Сидоров Сидор', [], actuality_date='03.02.2025')
+
+    analysis = analyze_report_files(list_report_files(reports), workers=1, cache=False)
+    earliest, latest = excel_analyzer.get_date_range(f['actuality_date'] for f in analysis['files'])
+
+    assert [f['file'] for f in analysis['files']] == ['a.xlsx', 'b.xlsx', 'c.xlsx']
+    assert (earliest.strftime('%d.%m.%Y'), latest.strftime('%d.%m.%Y')) == ('03.02.2025', '20.05.2025')
+    assert excel_analyzer.extract_file_dates(reports) == (earliest, latest)
+
+@pytest.mark.parametrize('engine', ['pandas', 'openpyxl'])
+def test_stage_timings_returned_with_files(reports, engine):
+    analysis = analyze_report_files(list_report_files(reports), workers=1, engine=engine, cache=False)
+
+    for file in analysis['files']:
+        assert list(file['timings']) == list(excel_analyzer.REPORT_STAGES)
+        assert all(seconds >= 0 for seconds in file['timings'].values())
+
+def test_slowest_files_sorted_by_total():
+    files = [
+        {'file': 'a.xlsx', 'student_name': 'А', 'timings': {'open': 0.1, 'header': 0.0, 'body': 0.1, 'classify': 0.1}},
+        {'file': 'b.xlsx', 'student_name': 'Б', 'timings': None},  # из кэша
+        {'file': 'c.xlsx', 'student_name': 'В', 'timings': {'open': 0.5, 'header': 0.0, 'body': 0.2, 'classify': 0.1}},
+    ]
+
+    slowest = excel_analyzer.slowest_files(files, 5)
+
+    assert [file['file'] for file in slowest] == ['c.xlsx', 'a.xlsx']
+    assert slowest[0]['total'] == pytest.approx(0.8)
+    assert excel_analyzer.slowest_files(files, 0) == []
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from utils.excel_analyzer import analyze_report_files, list_report_files, parse_report_file
+from tests.excel_reports import without_timings, write_report
+
+SUBJECTS = ['Алгебра', 'Геометрия', 'Физика', 'Информатика']
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    """Набор отчетов с разными вариантами заполнения"""
+    folder = tmp_path_factory.mktemp('corpus')
+    write_report(folder / 'plain.xlsx', 'Иванов Иван', [
+        ('Алгебра', 'Модуль 1', '01.10.2024', 3),
+        ('Алгебра', 'Модуль 2', '01.12.2024', 4),
+        ('Алгебра', 'Модуль 3', '01.02.2025', 3),
+        ('Физика', 'Модуль 1', '01.10.2024', 2),
+        ('Физика', 'Модуль 2', '01.12.2024', None),
+        ('История', 'Модуль 1', '01.10.2024', 2),
+    ])
+    write_report(folder / 'dates.xlsx', 'Петров Петр', [
+        ('Геометрия', 'Модуль 1', datetime(2024, 10, 1), None),
+        ('Геометрия', 'Модуль 2', '2025-01-15', None),
+        ('Геометрия', 'Модуль 3', 'до 20.03.2025', None),
+        ('Информатика', None, None, 2.5),
+        ('Информатика', 'Модуль 2', '01.06.2025', None),
+    ], actuality_date='10.04.2025')
+    write_report(folder / 'Отчёт об успеваемости. Сидоров Сидор. 2025.xlsx', None, [
+        ('Физика', 'Модуль 1', '01.10.2024', 3),
+        ('Физика', 'Модуль 2', '01.12.2024', 3),
+    ], class_name='9Б', title=None)
+    write_report(folder / 'no_date_11В.xlsx', 'Кузнецов Кузьма', [
+        ('Алгебра', 'Модуль 1', '01.10.2024', 2),
+    ], actuality_date='не указана', class_name=None)
+    write_report(folder / 'text_grade.xlsx', 'Смирнов Семен', [
+        ('Алгебра', 'Модуль 1', '01.10.2024', 'зачет'),
+    ])
+    (folder / 'broken.xlsx').write_bytes(b'not an excel file')
+    return folder
+
+def test_engines_parse_files_identically(corpus):
+    """Потоковый движок openpyxl разбирает каждый файл так же, как pandas"""
+    for file_path in list_report_files(corpus):
+        if 'broken' in file_path or 'text_grade' in file_path:
+            continue
+        by_pandas = parse_report_file(file_path, SUBJECTS, engine='pandas')
+        by_openpyxl = parse_report_file(file_path, SUBJECTS, engine='openpyxl')
+        assert repr(without_timings(by_openpyxl)) == repr(without_timings(by_pandas)), file_path
+        assert set(by_openpyxl['timings']) == set(by_pandas['timings']) == {'open', 'header', 'body', 'classify'}
+
+def test_engines_produce_identical_analysis(corpus):
+    """Результаты анализа папки совпадают побайтно, ошибки - по составу файлов"""
+    by_pandas = analyze_report_files(list_report_files(corpus), workers=1, engine='pandas', cache=False)
+    by_openpyxl = analyze_report_files(list_report_files(corpus), workers=1, engine='openpyxl', cache=False)
+
+    assert by_pandas['problems']
+    assert repr(by_openpyxl['problems']) == repr(by_pandas['problems'])
+    assert repr(without_timings(by_openpyxl['files'])) == repr(without_timings(by_pandas['files']))
+    assert [e['file'] for e in by_openpyxl['errors']] == [e['file'] for e in by_pandas['errors']] == [
+        'broken.xlsx', 'text_grade.xlsx'
+    ]
+
+def test_report_details_detected(corpus):
+    result = parse_report_file(str(corpus / 'Отчёт об успеваемости. Сидоров Сидор. 2025.xlsx'),
+                               SUBJECTS, engine='openpyxl')
+    assert (result['student_name'], result['class_name']) == ('Сидоров Сидор', '9Б')
+
+    result = parse_report_file(str(corpus / 'no_date_11В.xlsx'), SUBJECTS, engine='openpyxl')
+    assert (result['class_name'], result['actuality_date']) == ('11В', None)
+
+def test_unknown_engine_rejected(corpus):
+    with pytest.raises(ValueError):
+        parse_report_file(str(corpus / 'plain.xlsx'), SUBJECTS, engine='xlrd')
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from sqlalchemy import event
+
+
+def test_import_counts_added_skipped_and_invalid(database):
+    """Импорт возвращает число добавленных, пропущенных и некорректных строк"""
+    database.add_student('Иванов Иван', '10 А')
+
+    counts = database.import_students_from_list([
+        {'full_name': 'Иванов Иван', 'class_name': '10 А'},     # уже в базе
+        {'full_name': 'Петров Петр', 'class_name': '10 А'},
+        {'full_name': ' Петров Петр ', 'class_name': '10 А'},   # повтор в списке
+        {'full_name': 'Петров Петр', 'class_name': '10 Б'},
+        {'full_name': '', 'class_name': '10 А'},
+        {'full_name': float('nan'), 'class_name': '10 А'},
+        {'full_name': 'Сидоров Сидор', 'class_name': 'nan'},
+    ])
+
+    assert counts == {'added': 2, 'skipped': 2, 'invalid': 3}
+    assert len(database.get_all_students()) == 3
+
+def test_import_uses_constant_number_of_queries(database):
+    """Число запросов не зависит от размера списка"""
+    statements = []
+    event.listen(database.get_engine(), 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    database.import_students_from_list(
+        [{'full_name': f'Ученик {i}', 'class_name': f'{5 + i % 7} А'} for i in range(500)]
+    )
+
+    assert len(statements) <= 3
+
+def test_import_large_roster_in_constant_queries(database):
+    """Список из 10 000 учеников импортируется тем же числом запросов, что и короткий"""
+    roster = [{'full_name': f'Ученик {i}', 'class_name': f'{5 + i % 7} {"АБВГ"[i % 4]}'} for i in range(10000)]
+    statements = []
+    event.listen(database.get_engine(), 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    counts = database.import_students_from_list(roster)
+
+    assert counts['added'] == 10000
+    assert len(statements) <= 3
+
+    # Повторный импорт ничего не добавляет
+    assert database.import_students_from_list(roster)['skipped'] == 10000
+
+@pytest.mark.benchmark
+def test_import_large_roster_is_fast(database):
+    """Список из 10 000 учеников импортируется быстрее секунды"""
+    roster = [{'full_name': f'Ученик {i}', 'class_name': f'{5 + i % 7} {"АБВГ"[i % 4]}'} for i in range(10000)]
+
+    started = time.perf_counter()
+    counts = database.import_students_from_list(roster)
+    elapsed = time.perf_counter() - started
+
+    assert counts['added'] == 10000
+    assert elapsed < 1.0
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import inspect, select, text, tuple_
+
+from database import db
+from database.db import STUDENT_PAGE_ORDER
+from database.models import (Student, Notification, NotificationSubject, DeadlineDate,
+                             NotificationMeta, NotificationConsultation, ClassProfile)
+
+
+def query_plan(statement):
+    """Возвращает план выполнения запроса SQLite одной строкой"""
+    sql = str(statement.compile(db.get_engine(), compile_kwargs={'literal_binds': True}))
+    with db.get_engine().connect() as connection:
+        rows = connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+    return ' | '.join(row[-1] for row in rows)
+
+@pytest.mark.parametrize('statement, index_name', [
+    (select(Student).where(Student.full_name == 'Иванов Иван'),
+     'uq_students_full_name_class_name'),
+    (select(Student).where(Student.full_name == 'Иванов Иван', Student.class_name == '10 А'),
+     'uq_students_full_name_class_name'),
+    (select(Student).where(Student.class_name == '10 А').order_by(Student.full_name),
+     'ix_students_class_name_full_name'),
+    (select(Notification).where(Notification.student_id == 1),
+     'ix_notifications_student_id'),
+    (select(NotificationSubject).where(NotificationSubject.notification_id == 1),
+     'ix_notification_subjects_notification_id_subject_id'),
+    (select(DeadlineDate).where(DeadlineDate.notification_id == 1),
+     'ix_deadline_dates_notification_id_subject_id'),
+    (select(NotificationMeta).where(NotificationMeta.notification_id == 1, NotificationMeta.key == 'failed_subjects'),
+     'ix_notification_meta_notification_id_key'),
+    (select(NotificationConsultation).where(NotificationConsultation.notification_id == 1),
+     'ix_notification_consultations_notification_id_subject_id'),
+    (select(ClassProfile).where(ClassProfile.class_name == '10 А'),
+     'ix_class_profiles_class_name_subject_id'),
+    (select(NotificationSubject).where(NotificationSubject.subject_id == 1),
+     'ix_notification_subjects_subject_id'),
+    (select(DeadlineDate).where(DeadlineDate.subject_id == 1),
+     'ix_deadline_dates_subject_id'),
+    (select(NotificationConsultation).where(NotificationConsultation.subject_id == 1),
+     'ix_notification_consultations_subject_id'),
+    (select(ClassProfile).where(ClassProfile.subject_id == 1),
+     'ix_class_profiles_subject_id'),
+    (select(Student.grade, Student.letter, Student.class_name).distinct()
+     .order_by(Student.grade, Student.letter, Student.class_name),
+     'ix_students_sort_key'),
+    (select(Student).order_by(Student.grade, Student.letter, Student.class_name, Student.full_name),
+     'ix_students_sort_key'),
+    (select(Student).where(tuple_(*STUDENT_PAGE_ORDER) > tuple_(10, 'А', '10 А', 'Иванов Иван', 1))
+     .order_by(*STUDENT_PAGE_ORDER).limit(100),
+     'ix_students_sort_key'),
+])
+def test_hot_queries_use_indexes(database, statement, index_name):
+    """Частые запросы используют индексы, а не полный просмотр таблицы"""
+    plan = query_plan(statement)
+    assert index_name in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan
+
+def test_migration_adds_indexes_to_existing_database(tmp_path):
+    """Миграция добавляет индексы в старую базу и объединяет дубликаты учеников"""
+    db.configure_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    try:
+        with db.get_engine().begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE students (id INTEGER PRIMARY KEY, full_name VARCHAR NOT NULL, class_name VARCHAR NOT NULL)'
+            ))
+            connection.execute(text(
+                "INSERT INTO students (id, full_name, class_name) VALUES "
+                "(1, 'Иванов Иван', '10 А'), (2, 'Иванов Иван', '10 А'), (3, 'Петров Петр', '10 А')"
+            ))
+
+        db.init_db()
+        db.init_db()  # Повторный запуск ничего не ломает
+
+        index_names = {index['name'] for index in inspect(db.get_engine()).get_indexes('students')}
+        assert {'uq_students_full_name_class_name', 'ix_students_class_name_full_name'} <= index_names
+        assert sorted(s.id for s in db.get_all_students()) == [1, 3]
+        # Ключ сортировки класса заполняется для существующих учеников
+        assert {(s.grade, s.letter) for s in db.get_all_students()} == {(10, 'А')}
+    finally:
+        db.dispose_engine()
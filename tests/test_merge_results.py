@@ -0,0 +1,75 @@
+import random
+import time
+
+from utils.excel_analyzer import _merge_file_results
+
+SUBJECTS = ['Алгебра', 'Геометрия', 'Физика', 'Информатика']
+
+
+def three(student, subject):
+    return ('problem', {'ФИО ученика': student, 'Предмет': subject, 'Итоговая отметка': 3.0,
+                        'Тип проблемы': 'Тройка'})
+
+def synthetic_batch(students, seed=0):
+    """Результаты разбора файлов: у каждого ученика тройки, часть из которых исправлена"""
+    rng = random.Random(seed)
+    batch = []
+    for i in range(students):
+        name = f'Ученик {i}'
+        events = []
+        for subject in SUBJECTS:
+            for _ in range(3):
+                events.append(three(name, subject))
+                if rng.random() < 0.3:
+                    events.append(('improved', subject))
+            if rng.random() < 0.2:
+                events.append(('problem', {'ФИО ученика': name, 'Предмет': subject, 'Итоговая отметка': 2.0,
+                                           'Тип проблемы': 'Задолженность'}))
+        batch.append({'student_name': name, 'events': events})
+    return batch
+
+def merge_by_rebuilding(file_results):
+    """Прежняя реализация: пересборка списка троек при каждом исправлении"""
+    threes, failures = [], []
+    for file_result in file_results:
+        for kind, payload in file_result['events']:
+            if kind == 'improved':
+                threes = [e for e in threes if not (
+                    e['ФИО ученика'] == file_result['student_name'] and e['Предмет'] == payload
+                    and e['Итоговая отметка'] == 3)]
+            elif payload['Тип проблемы'] == 'Тройка':
+                threes.append(payload)
+            else:
+                failures.append(payload)
+    return threes + failures
+
+def test_same_result_as_rebuilding():
+    batch = synthetic_batch(200)
+    assert _merge_file_results(batch) == merge_by_rebuilding(batch)
+
+def test_threes_of_same_student_in_several_files():
+    """Исправление в более позднем файле исключает тройки ученика из предыдущих"""
+    batch = [
+        {'student_name': 'Иванов Иван', 'events': [three('Иванов Иван', 'Физика')]},
+        {'student_name': 'Петров Петр', 'events': [three('Петров Петр', 'Физика')]},
+        {'student_name': 'Иванов Иван', 'events': [('improved', 'Физика'), three('Иванов Иван', 'Физика')]},
+    ]
+    merged = _merge_file_results(batch)
+    assert [p['ФИО ученика'] for p in merged] == ['Петров Петр', 'Иванов Иван']
+    assert merged == merge_by_rebuilding(batch)
+
+def measure(merge, batch):
+    started = time.perf_counter()
+    merge(batch)
+    return time.perf_counter() - started
+
+def test_merge_is_linear_on_1000_students():
+    """Время объединения растет линейно: удвоение пакета не дает учетверения времени"""
+    small, large = synthetic_batch(1000), synthetic_batch(2000)
+
+    keyed_small = min(measure(_merge_file_results, small) for _ in range(3))
+    keyed_large = min(measure(_merge_file_results, large) for _ in range(3))
+    rebuilding_small = measure(merge_by_rebuilding, small)
+
+    assert keyed_large / keyed_small < 3
+    assert keyed_small * 20 < rebuilding_small
@@ -0,0 +1,90 @@
+import os
+import shutil
+
+from docx import Document
+from sqlalchemy import event
+
+from database.dto import NotificationDetails
+from database.models import NotificationMeta, NotificationConsultation
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), '..', 'templates', 'notification.docx')
+
+
+def create_full_notification(database, full_name):
+    """Создает уведомление с предметами, сроками, метаданными и консультациями"""
+    student_id = database.add_student(full_name, '10 Б')
+    subject_ids = database.resolve_subjects(['Физика', 'Химия'])
+    notification_id = database.create_notification(
+        student_id, database.get_all_template_types()[0].id, 'Модуль 2',
+        list(subject_ids.values()),
+        [{'subject_id': subject_ids['Физика'], 'date': '2025-05-20', 'time': '8:30', 'topic': 'Оптика'}]
+    )
+
+    session = database.get_session()
+    session.add_all([
+        NotificationMeta(notification_id=notification_id, key='failed_subjects', value='Физика'),
+        NotificationMeta(notification_id=notification_id, key='satisfactory_subjects', value='Химия'),
+        NotificationConsultation(notification_id=notification_id, subject_id=subject_ids['Физика'],
+                                 topic_name='Оптика', date='2025-05-15', time='9:30', topic_type='failed'),
+    ])
+    session.commit()
+    database.remove_session()
+    return notification_id
+
+def count_queries(database, func):
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(database.get_engine(), 'before_cursor_execute', before_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(database.get_engine(), 'before_cursor_execute', before_execute)
+    return result, len(statements)
+
+def test_details_loaded_into_detached_object(database):
+    """Все связанные данные переносятся в объект, не связанный с сессией"""
+    notification_id = create_full_notification(database, 'Иванов Иван')
+
+    details = database.get_notification_with_details(notification_id)
+    database.dispose_engine()  # Объект остается полностью доступным без базы данных
+
+    assert isinstance(details, NotificationDetails)
+    assert not hasattr(details, '__dict__')
+    assert details.student.full_name == 'Иванов Иван'
+    assert details.period == 'Модуль 2'
+    assert [s.name for s in details.subjects] == ['Физика', 'Химия']
+    assert details.deadlines[0].subject.name == 'Физика'
+    assert details.meta == {'failed_subjects': 'Физика', 'satisfactory_subjects': 'Химия'}
+    assert details.consultations[0].subject_name == 'Физика'
+    assert database.get_notification_with_details(12345) is None
+
+def test_batch_loading_uses_fixed_number_of_queries(database):
+    """Число запросов не зависит от количества уведомлений"""
+    ids = [create_full_notification(database, f'Ученик {i}') for i in range(10)]
+
+    single, single_queries = count_queries(database, lambda: database.get_notifications_with_details(ids[:1]))
+    batch, batch_queries = count_queries(database, lambda: database.get_notifications_with_details(ids))
+
+    assert list(single) == ids[:1]
+    assert sorted(batch) == ids
+    assert batch_queries == single_queries <= 5
+
+def test_document_generated_from_details(database, tmp_path, monkeypatch):
+    """Генератор документов работает с загруженным объектом уведомления"""
+    notification_id = create_full_notification(database, 'Иванов Иван')
+    os.makedirs(tmp_path / 'templates')
+    shutil.copy(TEMPLATE_PATH, tmp_path / 'templates' / 'notification.docx')
+    monkeypatch.chdir(tmp_path)
+
+    from utils.document_generator import generate_document
+    details = database.get_notifications_with_details([notification_id])[notification_id]
+    result, queries = count_queries(database, lambda: generate_document(notification_id, details))
+
+    assert result['success'], result
+    assert queries == 0
+    text = '\n'.join(p.text for p in Document(result['file_path']).paragraphs)
+    assert 'Иванов Иван' in text
+    assert 'Физика' in text
@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import pytest
+
+from utils import excel_analyzer
+from utils.excel_analyzer import analyze_report_files, list_report_files
+from utils.parse_cache import ParseCache
+from tests.excel_reports import without_timings, write_report
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ParseCache(str(tmp_path / 'cache'), max_bytes=10 * 1024 * 1024)
+
+@pytest.fixture
+def reports(tmp_path):
+    folder = tmp_path / 'upload1'
+    folder.mkdir()
+    for i in range(3):
+        write_report(folder / f'report_{i}.xlsx', f'Ученик {i}', [
+            ('Алгебра', 'Модуль 1', '01.10.2024', 3),
+            ('Физика', 'Модуль 1', '01.10.2024', 2 + i),
+        ])
+    return folder
+
+@pytest.fixture
+def parsed_files(monkeypatch):
+    """Запоминает файлы, которые действительно разбирались"""
+    parsed = []
+    read_files = excel_analyzer._read_files
+
+    def counting_read_files(file_paths, *args):
+        def counted():
+            for path in file_paths:
+                parsed.append(os.path.basename(path))
+                yield path
+        return read_files(counted(), *args)
+
+    monkeypatch.setattr(excel_analyzer, '_read_files', counting_read_files)
+    return parsed
+
+def test_unchanged_files_taken_from_cache(reports, cache, parsed_files):
+    first = analyze_report_files(list_report_files(reports), workers=1, cache=cache)
+    second = analyze_report_files(list_report_files(reports), workers=1, cache=cache)
+
+    assert parsed_files == ['report_0.xlsx', 'report_1.xlsx', 'report_2.xlsx']
+    assert repr(second['problems']) == repr(first['problems'])
+    assert repr(without_timings(second['files'])) == repr(without_timings(first['files']))
+    # Время разбора есть только у действительно разобранных файлов
+    assert all(file['timings'] for file in first['files'])
+    assert all(file['timings'] is None for file in second['files'])
+
+def test_identical_uploads_share_entries(reports, cache, parsed_files, tmp_path):
+    """Те же файлы под другими именами в другой папке не разбираются повторно"""
+    analyze_report_files(list_report_files(reports), workers=1, cache=cache)
+    second_upload = tmp_path / 'upload2'
+    second_upload.mkdir()
+    for path in list_report_files(reports):
+        shutil.copy(path, second_upload / f'copy_{os.path.basename(path)}')
+
+    analysis = analyze_report_files(list_report_files(second_upload), workers=1, cache=cache)
+
+    assert len(parsed_files) == 3
+    assert len(os.listdir(cache.folder)) == 3
+    assert [f['file'] for f in analysis['files']] == ['copy_report_0.xlsx', 'copy_report_1.xlsx', 'copy_report_2.xlsx']
+    assert [p['ФИО ученика'] for p in analysis['problems']] == [
+        'Ученик 0', 'Ученик 1', 'Ученик 1', 'Ученик 2', 'Ученик 0'
+    ]
+
+def test_changed_content_or_subjects_miss_cache(reports, cache, parsed_files, monkeypatch):
+    analyze_report_files(list_report_files(reports), workers=1, cache=cache)
+    write_report(reports / 'report_1.xlsx', 'Ученик 1', [('Алгебра', 'Модуль 1', '01.10.2024', 2)])
+    analyze_report_files(list_report_files(reports), workers=1, cache=cache)
+    assert parsed_files[3:] == ['report_1.xlsx']
+
+    monkeypatch.setattr(excel_analyzer, 'get_subjects_of_interest', lambda class_name: ['Алгебра'])
+    analyze_report_files(list_report_files(reports), workers=1, cache=cache)
+    assert len(parsed_files) == 7
+
+def test_report_without_actuality_date_not_cached(tmp_path, cache):
+    write_report(tmp_path / 'report.xlsx', 'Ученик', [('Алгебра', 'Модуль 1', '01.10.2024', 3)],
+                 actuality_date='не указана')
+    analyze_report_files([str(tmp_path / 'report.xlsx')], workers=1, cache=cache)
+    assert os.listdir(cache.folder) == []
+
+def test_least_recently_used_entries_evicted(cache):
+    payload = b'x' * 1000
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, payload)
+        os.utime(cache._path(key), ns=(i * 10**9, i * 10**9))
+    cache.get('a')  # Запись 'a' использована последней
+
+    cache.max_bytes = 2 * cache.total_size() // 3
+    cache.evict()
+
+    assert cache.get('b') is None
+    assert cache.get('a') == cache.get('c') == payload
+
+def test_corrupted_entry_is_a_miss(cache):
+    cache.put('a', {'events': []})
+    with open(cache._path('a'), 'wb') as file:
+        file.write(b'broken')
+
+    assert cache.get('a') is None
+    assert not os.path.exists(cache._path('a'))
@@ -0,0 +1,87 @@
+import random
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.excel_analyzer import (REPORT_COLUMNS, _cell_value, _detect_problems, _detect_problems_frame,
+                                  extract_actuality_date, parse_module_date, parse_module_dates)
+
+SUBJECTS = ['Алгебра', 'Физика', 'Информатика']
+ACTUALITY_DATE = datetime(2025, 3, 1)
+
+
+def random_grades(seed, rows=60):
+    """Таблица успеваемости со случайными предметами, оценками и датами"""
+    rng = random.Random(seed)
+    data = []
+    for _ in range(rows):
+        subject = rng.choice(SUBJECTS + ['История', None, None, None])
+        grade = rng.choice([2, 3, 3, 4, 5, np.nan, np.nan, 2.5])
+        date = rng.choice(['01.10.2024', '15.04.2025', '2025-01-20', 'до 01.02.2025', '1/3/2025',
+                           '31.02.2025', 'не указана', np.nan])
+        period = rng.choice(['Модуль 1', 'Модуль 2', np.nan])
+        data.append([subject, period, date, '5 4', 4.5, grade])
+    return pd.DataFrame(data, columns=REPORT_COLUMNS).infer_objects()
+
+def detect_row_by_row(grades):
+    """Исходная построчная реализация правил"""
+    rows = ([_cell_value(value) for value in row] for row in grades.itertuples(index=False, name=None))
+    return _detect_problems(rows, SUBJECTS, ACTUALITY_DATE)
+
+@pytest.mark.parametrize('seed', range(25))
+def test_vectorized_detection_matches_row_by_row(seed):
+    grades = random_grades(seed)
+
+    expected = detect_row_by_row(grades)
+    actual = _detect_problems_frame(grades, SUBJECTS, ACTUALITY_DATE)
+
+    assert repr(actual) == repr(expected)
+
+def test_previous_grade_resets_per_subject_block():
+    """Тройка исправляется только следующей оценкой того же блока предмета"""
+    grades = pd.DataFrame([
+        ['Алгебра', 'Модуль 1', '01.10.2024', None, None, 3],
+        [None, 'Модуль 2', '01.04.2025', None, None, np.nan],  # без оценки - пропускается
+        [None, 'Модуль 3', '01.05.2025', None, None, 5],
+        ['Физика', 'Модуль 1', '01.10.2024', None, None, 3],
+        ['Физика', 'Модуль 2', '01.12.2024', None, None, 5],   # новый блок того же предмета
+    ], columns=REPORT_COLUMNS)
+
+    events = _detect_problems_frame(grades, SUBJECTS, ACTUALITY_DATE)
+
+    assert [(kind, payload if kind == 'improved' else payload['Тип проблемы']) for kind, payload in events] == [
+        ('problem', 'Тройка'), ('improved', 'Алгебра'), ('problem', 'Тройка')
+    ]
+    assert repr(events) == repr(detect_row_by_row(grades))
+
+def test_non_numeric_grade_rejected():
+    grades = pd.DataFrame([['Алгебра', 'Модуль 1', '01.10.2024', None, None, 'зачет']], columns=REPORT_COLUMNS)
+    with pytest.raises(TypeError):
+        _detect_problems_frame(grades, SUBJECTS, ACTUALITY_DATE)
+
+# Значения колонки даты модуля, которые встречаются в выгрузках журнала
+MODULE_DATE_VALUES = [
+    '01.10.2024', '1.10.2024', ' 01.10.2024', '2024-10-01', '2024-1-1', '01/10/2024',
+    'Модуль до 05.11.2024 г.', 'с 01.09.2024 по 20.10.2024', '31.02.2024', '05.13.2024 текст',
+    '10.10.24', 'не указана', '', None, np.nan, 0, 3.0,
+    datetime(2024, 10, 1), pd.Timestamp('2024-10-01'),
+]
+
+def test_column_date_parsing_matches_row_parsing():
+    """Разбор колонки дат дает те же даты, что построчный разбор, включая даты внутри текста"""
+    expected = [parse_module_date(value) for value in MODULE_DATE_VALUES]
+    actual = parse_module_dates(np.array(MODULE_DATE_VALUES, dtype=object))
+
+    assert [None if pd.isna(date) else date.to_pydatetime() for date in actual] == expected
+    assert expected[6] == datetime(2024, 11, 5)
+    assert parse_module_dates(np.array([], dtype=object)).empty
+
+@pytest.mark.parametrize('cells, expected', [
+    (['Данные на 01.03.2025', None], datetime(2025, 3, 1)),
+    ([None, 'актуальны на 15.02.2025 12:00'], datetime(2025, 2, 15)),
+    (['без даты'], None),
+])
+def test_actuality_date_found_in_header_text(cells, expected):
+    assert extract_actuality_date([['Отчёт'], cells]) == expected
@@ -21,4 +21,16 @@ def test_api_get_schedule_times(client):
     assert 'id' in data[0]
     assert 'name' in data[0]
     assert 'start' in data[0]
-    assert 'end' in data[0]
\ No newline at end of file
+    assert 'end' in data[0]
+def test_archive_limit_only_for_report_uploads(app):
+    """Увеличенный предел размера запроса действует только для маршрутов загрузки отчетов"""
+    from flask import request
+    from config import get_config
+
+    config = get_config()
+    assert app.config['MAX_CONTENT_LENGTH'] == config['MAX_CONTENT_LENGTH']
+    for path in ('/analysis/upload', '/analysis/session/1/append'):
+        with app.test_request_context(path, method='POST'):
+            assert request.max_content_length == config['MAX_ARCHIVE_CONTENT_LENGTH']
+    with app.test_request_context('/create_notification', method='POST'):
+        assert request.max_content_length == config['MAX_CONTENT_LENGTH']
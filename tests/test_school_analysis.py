@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import event
+
+from database.models import ClassProfile
+from tests.excel_reports import write_report
+from utils.excel_analyzer import WHOLE_SCHOOL_CLASS_NAME, analyze_report_files
+
+
+@pytest.fixture
+def database(database):
+    """База данных теста с профилями 10 А и 11 Б"""
+    subject_ids = database.resolve_subjects(['Физика', 'Химия'])
+    session = database.get_session()
+    session.add_all([
+        ClassProfile(class_name='10 А', subject_id=subject_ids['Физика']),
+        ClassProfile(class_name='11 Б', subject_id=subject_ids['Химия']),
+    ])
+    session.commit()
+    database.remove_session()
+    return database
+
+@pytest.fixture
+def reports(tmp_path):
+    """Отчеты трех классов в одной папке; у 9В профиль не задан"""
+    rows = [('Физика', 'Модуль 1', '01.10.2024', 3), ('Химия', 'Модуль 1', '01.10.2024', 2),
+            ('Алгебра', 'Модуль 1', '01.10.2024', 3)]
+    return [
+        write_report(tmp_path / 'a.xlsx', 'Иванов Иван', rows, class_name='11Б'),
+        write_report(tmp_path / 'b.xlsx', 'Петров Петр', rows, class_name='10А'),
+        write_report(tmp_path / 'c.xlsx', 'Сидоров Сидор', rows, class_name='9В'),
+        write_report(tmp_path / 'd.xlsx', 'Орлов Олег', rows[:1], class_name='10А'),
+    ]
+
+def problems_summary(problems):
+    return [(p['Класс'], p['ФИО ученика'], p['Предмет'], p['Тип проблемы']) for p in problems]
+
+def test_files_partitioned_by_detected_class(database, reports):
+    analysis = analyze_report_files(reports, WHOLE_SCHOOL_CLASS_NAME, workers=1, cache=False)
+
+    assert problems_summary(analysis['problems']) == [
+        ('9В', 'Сидоров Сидор', 'Физика', 'Тройка'),
+        ('9В', 'Сидоров Сидор', 'Алгебра', 'Тройка'),
+        ('10 А', 'Петров Петр', 'Физика', 'Тройка'),
+        ('10 А', 'Орлов Олег', 'Физика', 'Тройка'),
+        ('11 Б', 'Иванов Иван', 'Химия', 'Задолженность'),
+    ]
+    assert [(c['class_name'], c['files'], c['students'], c['failed'], c['threes']) for c in analysis['classes']] == [
+        ('9В', 1, 1, 0, 2), ('10 А', 2, 2, 0, 2), ('11 Б', 1, 1, 1, 0),
+    ]
+    assert {f['file']: f['class_name'] for f in analysis['files']} == {
+        'a.xlsx': '11 Б', 'b.xlsx': '10 А', 'c.xlsx': '9В', 'd.xlsx': '10 А'}
+
+def test_class_results_match_single_class_analysis(database, reports):
+    """Результат класса совпадает с анализом его файлов с профилем этого класса"""
+    school = analyze_report_files(reports, WHOLE_SCHOOL_CLASS_NAME, workers=1, cache=False)
+    single = analyze_report_files([reports[1], reports[3]], '10 А', workers=1, cache=False)
+
+    assert [p for p in school['problems'] if p['Класс'] == '10 А'] == single['problems']
+
+def test_profiles_loaded_with_one_query(database, reports):
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(database.get_engine(), 'before_cursor_execute', before_execute)
+    try:
+        analyze_report_files(reports, WHOLE_SCHOOL_CLASS_NAME, workers=1, cache=False)
+    finally:
+        event.remove(database.get_engine(), 'before_cursor_execute', before_execute)
+
+    assert len(statements) == 1
+    assert 'class_profiles' in statements[0]
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+from sqlalchemy import event, text
+
+from database.models import Student
+
+
+def names(students):
+    return [s.full_name for s in students]
+
+def test_search_by_partial_name_in_any_order(database):
+    """Поиск по началу слов без учета регистра, порядка слов и различия ё/е"""
+    database.import_students_from_list([
+        {'full_name': 'Семёнов Пётр Алексеевич', 'class_name': '10 А'},
+        {'full_name': 'Иванова Анна Сергеевна', 'class_name': '9 Б'},
+        {'full_name': 'Иванов Иван Петрович', 'class_name': '9 Б'},
+    ])
+
+    assert names(database.search_students('семенов')) == ['Семёнов Пётр Алексеевич']
+    assert names(database.search_students('ПЁТР сем')) == ['Семёнов Пётр Алексеевич']
+    assert sorted(names(database.search_students('иван'))) == ['Иванов Иван Петрович', 'Иванова Анна Сергеевна']
+    assert names(database.search_students('анна иванова')) == ['Иванова Анна Сергеевна']
+    assert database.search_students('сидоров') == []
+    assert database.search_students('  ') == []
+    assert database.search_students('"*') == []
+
+def test_search_returns_first_matches_by_name(database):
+    """При совпадений больше limit возвращаются первые по ФИО"""
+    database.import_students_from_list([
+        {'full_name': f'Иванов {name}', 'class_name': '9 А'}
+        for name in ['Яков', 'Борис', 'Юрий', 'Антон', 'Эдуард', 'Виктор']
+    ])
+
+    assert names(database.search_students('иванов', limit=3)) == ['Иванов Антон', 'Иванов Борис', 'Иванов Виктор']
+
+def test_search_index_follows_students_table(database):
+    """Индекс поиска обновляется при добавлении, изменении и удалении учеников"""
+    student_id = database.add_student('Петров Петр', '8 В')
+    assert names(database.search_students('петр')) == ['Петров Петр']
+
+    session = database.get_session()
+    session.get(Student, student_id).full_name = 'Сидоров Пётр'
+    session.commit()
+    assert database.search_students('петров') == []
+    assert names(database.search_students('сидоров петр')) == ['Сидоров Пётр']
+
+    session.delete(session.get(Student, student_id))
+    session.commit()
+    assert database.search_students('сидоров') == []
+
+def test_search_index_rebuilt_for_existing_students(database):
+    """Ученики, добавленные в обход триггеров, попадают в индекс при запуске"""
+    database.add_student('Иванов Иван', '9 А')
+    with database.get_engine().begin() as connection:
+        connection.execute(text("DELETE FROM students_fts"))
+
+    database.init_db()
+    assert names(database.search_students('иванов')) == ['Иванов Иван']
+
+def test_search_uses_fts_index(database):
+    """Поиск идет по индексу FTS, а ученики выбираются по ключу без полного просмотра"""
+    database.add_student('Иванов Иван', '9 А')
+    statements = []
+    event.listen(database.get_engine(), 'before_cursor_execute',
+                 lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters)))
+    assert names(database.search_students('иван')) == ['Иванов Иван']
+
+    statement, parameters = next((s, p) for s, p in statements if 'students_fts' in s)
+    with database.get_engine().connect() as connection:
+        plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+    assert any(step.startswith('SCAN students_fts VIRTUAL TABLE INDEX') for step in plan), plan
+    assert 'SEARCH students USING INTEGER PRIMARY KEY (rowid=?)' in plan, plan
+    assert not any(step.startswith('SCAN students') and 'students_fts' not in step for step in plan), plan
+
+@pytest.mark.benchmark
+def test_search_latency_with_50k_students(database):
+    """Поиск среди 50 тысяч учеников укладывается в 10 мс"""
+    surnames = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Лебедев', 'Козлов',
+                'Новиков', 'Морозов', 'Соловьёв', 'Волков', 'Зайцев', 'Павлов', 'Семёнов', 'Голубев']
+    first_names = ['Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Артём', 'Илья',
+                   'Кирилл', 'Михаил', 'Никита', 'Матвей', 'Роман', 'Егор', 'Арсений', 'Иван']
+    database.import_students_from_list([
+        {'full_name': f'{surnames[i % 16]} {first_names[i // 16 % 16]} {i}',
+         'class_name': f'{5 + i % 7} {"АБВГД"[i % 5]}'}
+        for i in range(50000)
+    ])
+
+    queries = ['ив', 'иван', 'семенов арт', 'алекс смир', 'морозов кирилл 4', 'пав']
+    for query in queries:
+        assert database.search_students(query)  # прогрев кэша страниц
+
+    timings = []
+    for query in queries * 10:
+        started = time.perf_counter()
+        database.search_students(query)
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    assert timings[len(timings) // 2] < 0.010, timings
+    assert timings[int(len(timings) * 0.95)] < 0.010, timings
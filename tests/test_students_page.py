@@ -0,0 +1,65 @@
+import base64
+import json
+
+import pytest
+
+
+@pytest.fixture
+def database(database):
+    """База данных теста с 250 учениками разных классов"""
+    database.import_students_from_list([
+        {'full_name': f'Ученик {i:03d}', 'class_name': f'{5 + i % 7} {"АБВ"[i % 3]}'}
+        for i in range(250)
+    ])
+    return database
+
+def read_all_pages(database, **filters):
+    students, cursor, pages = [], None, 0
+    while True:
+        page, cursor = database.get_students_page(limit=40, cursor=cursor, **filters)
+        students.extend(page)
+        pages += 1
+        if cursor is None:
+            return students, pages
+
+def test_pages_cover_all_students_in_sort_order(database):
+    """Страницы без пропусков и повторов повторяют порядок полного списка"""
+    students, pages = read_all_pages(database)
+
+    assert pages == 7
+    assert [s.id for s in students] == [s.id for s in database.get_all_students_sorted()]
+
+def test_pages_filtered_by_class_and_grade(database):
+    """Фильтры по классу и параллели применяются ко всем страницам"""
+    by_class, _ = read_all_pages(database, class_name='7 В')
+    by_grade, _ = read_all_pages(database, grade=11)
+
+    assert by_class and {s.class_name for s in by_class} == {'7 В'}
+    assert [s.full_name for s in by_class] == sorted(s.full_name for s in by_class)
+    assert by_grade and {s.grade for s in by_grade} == {11}
+    assert len(by_grade) == len([s for s in database.get_all_students() if s.grade == 11])
+
+def test_last_page_has_no_cursor(database):
+    page, cursor = database.get_students_page(limit=1000)
+    assert len(page) == 250
+    assert cursor is None
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+@pytest.mark.parametrize('cursor', [
+    'не курсор',
+    'WzFd',
+    encode_cursor([[10], 'А', '10 А', 'Иванов', 1]),
+    encode_cursor([10, {'letter': 'А'}, '10 А', 'Иванов', 1]),
+    encode_cursor([10, 'А', '10 А', 'Иванов', 1.5]),
+    encode_cursor([True, 'А', '10 А', 'Иванов', 1]),
+])
+def test_invalid_cursor_rejected(database, cursor):
+    with pytest.raises(ValueError):
+        database.get_students_page(cursor=cursor)
+
+def test_invalid_cursor_returns_bad_request(client):
+    response = client.get('/api/students', query_string={'cursor': encode_cursor([[10], 'А', '10 А', 'Иванов', 1])})
+
+    assert response.status_code == 400
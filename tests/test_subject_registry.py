@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import event, text
+
+
+@pytest.fixture
+def statements(database):
+    """Список SQL-запросов, выполненных движком во время теста"""
+    executed = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(database.get_engine(), 'before_cursor_execute', before_execute)
+    yield executed
+    event.remove(database.get_engine(), 'before_cursor_execute', before_execute)
+
+def test_resolve_existing_and_new_subjects(database):
+    """Существующие предметы находятся, новые создаются одним вызовом"""
+    ids = database.resolve_subjects(['Математика', 'Астрономия', 'Черчение', 'Астрономия'])
+
+    assert list(ids) == ['Математика', 'Астрономия', 'Черчение']
+    names = {s.id: s.name for s in database.get_all_subjects()}
+    assert all(names[subject_id] == name for name, subject_id in ids.items())
+
+def test_cached_lookups_only_check_version(database, statements):
+    """Повторное разрешение известных предметов проверяет только версию предметов"""
+    database.resolve_subjects(['Математика'])
+    statements.clear()
+
+    for _ in range(10):
+        database.get_subject_by_name('Математика')
+        database.resolve_subjects(['Физика', 'Химия'])
+
+    assert len(statements) == 20
+    assert all('FROM data_versions' in statement for statement in statements)
+
+def test_invalidate_rereads_subjects(database):
+    """После сброса кэша изменения таблицы subjects становятся видны"""
+    old_id = database.get_subject_by_name('Математика')
+    with database.get_engine().begin() as connection:
+        connection.execute(text("UPDATE subjects SET name = 'Алгебра' WHERE id = :id"), {'id': old_id})
+
+    database.invalidate_subject_cache()
+
+    assert database.get_subject_by_name('Алгебра') == old_id
+    assert database.get_subject_by_name('Математика') != old_id
+
+def test_subject_added_by_another_writer_does_not_break_batch(database):
+    """Предмет, добавленный другим процессом после загрузки кэша, не мешает создать остальные"""
+    database.resolve_subjects(['Математика'])
+    with database.get_engine().begin() as connection:
+        connection.execute(text("INSERT INTO subjects (name) VALUES ('Астрономия')"))
+
+    ids = database.resolve_subjects(['Астрономия', 'Черчение'])
+
+    names = {s.id: s.name for s in database.get_all_subjects()}
+    assert {names[subject_id] for subject_id in ids.values()} == {'Астрономия', 'Черчение'}
+
+def test_change_in_another_process_rereads_subjects(database):
+    """Переименование и удаление предмета другим процессом видны без сброса кэша этого процесса"""
+    math_id = database.get_subject_by_name('Математика')
+    physics_id = database.get_subject_by_name('Физика')
+    with database.get_engine().begin() as connection:
+        connection.execute(text("UPDATE subjects SET name = 'Алгебра' WHERE id = :id"), {'id': math_id})
+        connection.execute(text("DELETE FROM subjects WHERE id = :id"), {'id': physics_id})
+        connection.execute(text("UPDATE data_versions SET version = version + 1 WHERE name = 'subjects'"))
+
+    assert database.get_subject_by_name('Алгебра') == math_id
+    assert database.get_subject_by_name('Математика') not in (math_id, physics_id)
+    assert database.get_subject_by_name('Физика') != physics_id
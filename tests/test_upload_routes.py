@@ -0,0 +1,95 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from analysis import routes
+from config import get_config
+from tests.excel_reports import write_report
+from tests.test_analysis_jobs import wait_for_job
+from utils import analysis_jobs
+from utils.excel_analyzer import analyze_report_files
+
+BOUNDARY = 'report-upload-boundary'
+
+
+@pytest.fixture(autouse=True)
+def serial_analysis(monkeypatch):
+    monkeypatch.setattr(analysis_jobs, 'analyze_report_files',
+                        lambda *args, **kwargs: analyze_report_files(*args, **{**kwargs, 'workers': 1, 'cache': False}))
+
+def report_bytes(tmp_path, student_name):
+    path = write_report(tmp_path / f'{student_name}.xlsx', student_name, [('Физика', 'Модуль 1', '01.10.2024', 3)])
+    return path.read_bytes()
+
+def multipart(parts):
+    """Тело multipart-запроса из частей (имя поля, имя файла или None, содержимое) в заданном порядке"""
+    body = b''
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n'.encode() + content + b'\r\n'
+    return body + f'--{BOUNDARY}--\r\n'.encode()
+
+def upload(client, body):
+    return client.post('/analysis/upload', data=body, content_type=f'multipart/form-data; boundary={BOUNDARY}')
+
+def upload_folders():
+    return os.listdir(os.path.join('uploads', 'excel_files'))
+
+@pytest.mark.parametrize('class_first', [True, False])
+def test_class_field_before_or_after_files(client, database, tmp_path, class_first):
+    files = [('files[]', f'{name}.xlsx', report_bytes(tmp_path, name)) for name in ('Иванов Иван', 'Петров Петр')]
+    class_field = [('class_name', None, '10 А'.encode())]
+
+    response = upload(client, multipart(class_field + files if class_first else files + class_field))
+    job = wait_for_job(database, response.get_json()['job_id'])
+
+    assert job['status'] == 'done', job
+    assert job['class_name'] == '10 А'
+    assert (job['processed_files'], job['total_files']) == (2, 2)
+
+def test_archive_part(client, database, tmp_path):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for name in ('Иванов Иван', 'Петров Петр', 'Сидоров Сидор'):
+            zf.writestr(f'{name}.xlsx', report_bytes(tmp_path, name))
+
+    response = upload(client, multipart([('class_name', None, b''), ('files[]', 'reports.zip', archive.getvalue())]))
+    job = wait_for_job(database, response.get_json()['job_id'])
+
+    assert job['status'] == 'done', job
+    assert job['processed_files'] == 3
+    assert len(database.get_analysis_results(job['session_id'])) == 3
+
+def test_oversized_plain_upload_rejected(client, monkeypatch):
+    """Превышение предела для отдельных файлов отклоняется, не дочитывая запрос, и папка удаляется"""
+    config = {**get_config(), 'MAX_CONTENT_LENGTH': 100 * 1024}
+    monkeypatch.setattr(routes, 'get_config', lambda: config)
+    files = [('files[]', f'report_{i}.xlsx', os.urandom(64 * 1024)) for i in range(4)]
+
+    response = upload(client, multipart([('class_name', None, b'')] + files))
+
+    assert response.status_code == 413
+    assert response.get_json()['success'] is False
+    assert upload_folders() == []
+
+def test_truncated_upload_fails_job(client, database, tmp_path):
+    body = multipart([
+        ('class_name', None, b''),
+        ('files[]', 'first.xlsx', report_bytes(tmp_path, 'Иванов Иван')),
+        ('files[]', 'second.xlsx', report_bytes(tmp_path, 'Петров Петр')),
+    ])
+    truncated = body[:len(body) - 1000]
+
+    response = upload(client, truncated)
+
+    assert response.get_json()['success'] is False
+    assert 'оборван' in response.get_json()['message']
+    assert upload_folders() == []
+    # Задача была запущена с первым принятым файлом и завершается ошибкой
+    job = wait_for_job(database, 1)
+    assert job['status'] == 'failed'
+    assert 'оборван' in job['message']
@@ -0,0 +1,118 @@
+# utils/analysis_jobs.py
+#
+# Фоновый анализ загруженных отчетов в пуле потоков процесса.
+# Состояние задач хранится в таблице analysis_jobs; страница анализа опрашивает его,
+# а запрос загрузки завершается сразу после сохранения файлов.
+# Файлы загрузки передаются задаче через очередь по мере приема, поэтому разбор
+# начинается, пока остальная часть запроса еще поступает.
+
+import datetime
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import get_config
+from database.db import (create_analysis_job, update_analysis_job, get_analysis_job, create_analysis_session,
+                         save_analysis_results, remove_session)
+from utils.excel_analyzer import analyze_report_files, list_report_sources
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_job_executor():
+    """Пул потоков задач анализа; число потоков ограничено ANALYSIS_JOB_WORKERS"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, get_config()['ANALYSIS_JOB_WORKERS']),
+                                           thread_name_prefix='analysis-job')
+        return _executor
+
+def job_parse_workers():
+    """
+    Число процессов разбора файлов для одной фоновой задачи.
+    
+    Ядра (ANALYSIS_WORKERS, а при 0 - все ядра, кроме одного, оставленного обработке
+    запросов) делятся между ANALYSIS_JOB_WORKERS одновременно выполняемыми задачами.
+    """
+    config = get_config()
+    total = config['ANALYSIS_WORKERS'] or (os.cpu_count() or 1) - 1
+    return max(1, total // max(1, config['ANALYSIS_JOB_WORKERS']))
+
+class ReportQueue:
+    """
+    Очередь отчетов, поступающих по ходу загрузки.
+    
+    Запрос загрузки добавляет сохраненные файлы через put() и вызывает close() после
+    последнего файла; задача анализа читает очередь как итератор. abort() прерывает
+    загрузку: итератор выбрасывает исключение, и задача завершается ошибкой.
+    """
+    _END = object()
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put(self, source):
+        self._queue.put(source)
+
+    def close(self):
+        self._queue.put(self._END)
+
+    def abort(self, message):
+        self._queue.put(RuntimeError(message))
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+def submit_analysis_job(class_name, folder_path, sources=None):
+    """
+    Ставит анализ отчетов в очередь и возвращает ID задачи.
+    
+    Без sources анализируются отчеты папки; с sources (например, ReportQueue) - отчеты
+    по мере поступления, число файлов задачи растет по ходу загрузки.
+    """
+    total_files = len(list_report_sources(folder_path)) if sources is None else 0
+    job_id = create_analysis_job(class_name, folder_path, total_files)
+    get_job_executor().submit(run_analysis_job, job_id, sources)
+    return job_id
+
+def run_analysis_job(job_id, sources=None):
+    """
+    Выполняет задачу анализа: разбирает отчеты, создает сессию анализа
+    и сохраняет результаты. Ход разбора записывается в задачу после каждого файла.
+    """
+    try:
+        job = get_analysis_job(job_id)
+        update_analysis_job(job_id, status='running', started_at=datetime.datetime.utcnow())
+
+        def progress(processed, total):
+            update_analysis_job(job_id, processed_files=processed, total_files=total)
+
+        if sources is None:
+            sources = list_report_sources(job['folder_path'])
+        analysis = analyze_report_files(sources, job['class_name'], workers=job_parse_workers(), progress=progress)
+        session_id = create_analysis_session(job['class_name'], job['folder_path'])
+        save_analysis_results(session_id, analysis['problems'], analysis['files'])
+
+        message = f"Проанализировано файлов: {len(analysis['files'])}"
+        if analysis['errors']:
+            message += f", не удалось разобрать: {', '.join(error['file'] for error in analysis['errors'])}"
+        update_analysis_job(job_id, status='done', session_id=session_id, message=message,
+                            errors=analysis['errors'], finished_at=datetime.datetime.utcnow())
+    except Exception as e:
+        logger.exception("Ошибка при выполнении задачи анализа %s", job_id)
+        update_analysis_job(job_id, status='failed', message=f'Ошибка при анализе файлов: {e}',
+                            finished_at=datetime.datetime.utcnow())
+    finally:
+        # Поток пула используется повторно - закрываем его сессию базы данных
+        remove_session()
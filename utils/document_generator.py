@@ -5,13 +5,19 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Pt
 import os
 from datetime import datetime
-from database.db import get_notification_with_details, get_session
-from database.models import NotificationMeta, NotificationConsultation, Subject
+from database.db import get_notification_with_details
 
-def generate_document(notification_id):
-    """Генерирует документ уведомления на основе данных из БД и шаблона"""
+def generate_document(notification_id, notification_data=None):
+    """
+    Генерирует документ уведомления на основе данных из БД и шаблона.
+    
+    notification_data - заранее загруженный NotificationDetails (например, из
+    get_notifications_with_details при пакетной генерации); если не передан,
+    данные загружаются по notification_id.
+    """
     # Получаем данные уведомления
-    notification_data = get_notification_with_details(notification_id)
+    if notification_data is None:
+        notification_data = get_notification_with_details(notification_id)
     
     if not notification_data:
         return {'success': False, 'message': 'Уведомление не найдено'}
@@ -26,34 +32,11 @@ def generate_document(notification_id):
         # Загружаем шаблон
         doc = Document(template_path)
         
-        # Получаем данные для подстановки
-        student = notification_data['student']
-        subjects = notification_data['subjects']
-        
-        # Получаем дополнительные метаданные и консультации с предварительной загрузкой связанных данных
-        session = get_session()
-        meta_records = session.query(NotificationMeta).filter_by(notification_id=notification_id).all()
-        meta = {item.key: item.value for item in meta_records}
-        
-        # Предзагружаем связанные объекты предметов в рамках одной сессии
-        from sqlalchemy.orm import joinedload
-        consultations_query = session.query(NotificationConsultation).options(
-            joinedload(NotificationConsultation.subject)
-        ).filter_by(notification_id=notification_id).all()
-        
-        # Создаем словарь с полной информацией о консультациях, включая имя предмета
-        consultations = []
-        for consultation in consultations_query:
-            consultations.append({
-                'subject_name': consultation.subject.name,
-                'topic_name': consultation.topic_name,
-                'date': consultation.date,
-                'time': consultation.time,
-                'topic_type': consultation.topic_type
-            })
-        
-        # Теперь можно закрыть сессию, так как все данные уже получены
-        session.close()
+        # Получаем данные для подстановки (все связанные данные уже загружены одним вызовом)
+        student = notification_data.student
+        subjects = notification_data.subjects
+        meta = notification_data.meta
+        consultations = notification_data.consultations
         
         # Определяем типы предметов
         failed_subjects = []
@@ -166,7 +149,7 @@ def generate_document(notification_id):
                 # Группируем консультации по предметам
                 consultations_by_subject = {}
                 for consultation in consultations:
-                    subject_name = consultation['subject_name']
+                    subject_name = consultation.subject_name
                     if subject_name not in consultations_by_subject:
                         consultations_by_subject[subject_name] = []
                     
@@ -183,10 +166,10 @@ def generate_document(notification_id):
                         else:
                             row_cells[0].text = ""
                         
-                        row_cells[1].text = consultation['topic_name'] or ""
+                        row_cells[1].text = consultation.topic_name or ""
                         
                         # Преобразуем формат даты в дд.мм.гггг
-                        date_str = consultation['date']
+                        date_str = consultation.date
                         try:
                             date_parts = date_str.split('-')
                             if len(date_parts) == 3:
@@ -197,7 +180,7 @@ def generate_document(notification_id):
                             formatted_date = date_str
                         
                         row_cells[2].text = formatted_date
-                        row_cells[3].text = consultation['time']
+                        row_cells[3].text = consultation.time
                 
                 # Добавляем пустую строку после таблицы
                 doc.add_paragraph("")
@@ -213,7 +196,7 @@ def generate_document(notification_id):
         
         # Формируем имя файла
         current_time = datetime.now().strftime('%Y%m%d_%H%M%S')
-        file_name = f"{student.full_name}_{student.class_name}_{notification_data['period']}_{current_time}.docx"
+        file_name = f"{student.full_name}_{student.class_name}_{notification_data.period}_{current_time}.docx"
         file_path = os.path.join(output_dir, file_name)
         
         # Сохраняем документ
@@ -1,67 +1,111 @@
 # utils/excel_analyzer.py
 
 import pandas as pd
+import numpy as np
+import numbers
+import io
+import logging
+import multiprocessing
 import os
 import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from itertools import chain, count, islice
+from openpyxl import load_workbook
+from concurrent.futures.process import BrokenProcessPool
+from config import get_config
+from utils.parse_cache import get_parse_cache
 from database.db import get_session
-from database.models import ClassProfile, Subject
+from database.models import ClassProfile, Subject, class_sort_key
 
-def extract_actuality_date(header_data):
-    """Извлекает дату актуальности данных из второй строки файла"""
+logger = logging.getLogger(__name__)
+logger.setLevel(get_config()['ANALYSIS_LOG_LEVEL'])
+
+# Форматы даты завершения модуля в порядке проверки
+MODULE_DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y')
+# Дата ДД.ММ.ГГГГ внутри текста ячейки
+DATE_IN_TEXT_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+STUDENT_NAME_IN_FILENAME_RE = re.compile(r'Отчёт об успеваемости\.\s*(.*?)\s*\.\s*\d+')
+CLASS_NAME_RE = re.compile(r'\d+[А-Я]')
+
+def extract_actuality_date(header_rows):
+    """Извлекает дату актуальности данных из второй строки файла (строки шапки - списки ячеек)"""
     try:
-        # Пытаемся получить значение из объединенных ячеек в строке 2 (индекс 1)
-        date_text = str(header_data.iloc[1, 0])
-        
-        # Ищем дату в формате ДД.ММ.ГГГГ
-        match = re.search(r'(\d{2}\.\d{2}\.\d{4})', date_text)
-        if match:
-            date_str = match.group(1)
-            # Преобразуем строку даты в объект datetime
-            from datetime import datetime
-            return datetime.strptime(date_str, '%d.%m.%Y')
+        if len(header_rows) < 2:
+            return None
         
-        # Если не найдено, ищем дату в других ячейках второй строки
-        for col in range(header_data.shape[1]):
-            cell_text = str(header_data.iloc[1, col])
-            date_match = re.search(r'(\d{2}\.\d{2}\.\d{4})', cell_text)
-            if date_match:
-                date_str = date_match.group(1)
-                from datetime import datetime
-                return datetime.strptime(date_str, '%d.%m.%Y')
+        # Ищем дату в формате ДД.ММ.ГГГГ сначала в первой ячейке (обычно объединенной),
+        # затем в остальных ячейках второй строки
+        for cell in header_rows[1]:
+            match = DATE_IN_TEXT_RE.search(str(cell))
+            if match:
+                return datetime.strptime(match.group(0), '%d.%m.%Y')
         
         # Если дата не найдена, возвращаем None
         return None
     except Exception as e:
-        print(f"Ошибка при извлечении даты актуальности: {str(e)}")
+        logger.warning("Ошибка при извлечении даты актуальности: %s", e)
         return None
 
 def parse_module_date(date_str):
-    """Преобразует дату завершения модуля в объект datetime"""
+    """Преобразует дату завершения модуля в объект datetime (для построчного разбора)"""
     try:
         if pd.isna(date_str) or not date_str:
             return None
             
         # Проверяем различные форматы даты
-        formats = ['%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y']
-        from datetime import datetime
-        
-        for fmt in formats:
+        for fmt in MODULE_DATE_FORMATS:
             try:
                 return datetime.strptime(str(date_str), fmt)
             except ValueError:
                 continue
                 
         # Если не удалось распознать дату, пробуем извлечь её регулярным выражением
-        match = re.search(r'(\d{2})\.(\d{2})\.(\d{4})', str(date_str))
+        match = DATE_IN_TEXT_RE.search(str(date_str))
         if match:
             day, month, year = map(int, match.groups())
             return datetime(year, month, day)
             
         return None
     except Exception as e:
-        print(f"Ошибка при преобразовании даты модуля '{date_str}': {str(e)}")
+        logger.debug("Ошибка при преобразовании даты модуля '%s': %s", date_str, e)
         return None
 
+def parse_module_dates(values):
+    """
+    Преобразует колонку дат завершения модулей; нераспознанные значения - NaT.
+    
+    Правила те же, что в parse_module_date, но каждый формат применяется ко всей
+    колонке одним вызовом pd.to_datetime, а следующий - только к оставшимся значениям.
+    Дата внутри текста ищется последней, тоже для всех оставшихся значений сразу.
+    """
+    values = pd.Series(values, dtype=object)
+    remaining = values[~values.isna()].astype(str)
+    parsed = []
+    
+    for fmt in MODULE_DATE_FORMATS:
+        if remaining.empty:
+            break
+        dates = pd.to_datetime(remaining, format=fmt, errors='coerce')
+        parsed.append(dates[dates.notna()])
+        remaining = remaining[dates.isna()]
+    
+    if not remaining.empty:
+        parts = remaining.str.extract(DATE_IN_TEXT_RE).dropna().astype(int)
+        parts.columns = ['day', 'month', 'year']
+        if not parts.empty:
+            # Несуществующая дата (например, 31.02) остается нераспознанной
+            parsed.append(pd.to_datetime(parts, errors='coerce'))
+    
+    parsed = [dates for dates in parsed if not dates.empty]
+    if not parsed:
+        return pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    return pd.concat(parsed).reindex(values.index)
+
 def get_profile_subjects_for_class(class_name):
     """Получает список профильных предметов для указанного класса"""
     session = get_session()
@@ -80,293 +124,963 @@ def get_profile_subjects_for_class(class_name):
     session.close()
     return subjects
 
-def analyze_excel_files(folder_path, class_name=None):
+# Предметы, по которым ищутся проблемы, если для класса не заданы профильные предметы
+DEFAULT_SUBJECTS_OF_INTEREST = [
+    'Алгебра', 'Геометрия', 'Физика', 'Информатика',
+    'Вероятность и статистика', 'Труд (технология)'
+]
+
+# Колонки таблицы успеваемости в отчете
+REPORT_COLUMNS = [
+    'Предмет',
+    'Период промежуточной аттестации',
+    'Дата промежуточной аттестации',
+    'Отметки',
+    'Средневзвешенный балл',
+    'Итоговая отметка'
+]
+
+def get_subjects_of_interest(class_name=None):
+    """Возвращает профильные предметы класса или предметы по умолчанию"""
+    subjects_of_interest = get_profile_subjects_for_class(class_name) if class_name else []
+    return subjects_of_interest or list(DEFAULT_SUBJECTS_OF_INTEREST)
+
+def list_report_files(folder_path):
+    """Возвращает отсортированный список Excel-файлов в папке"""
+    return sorted(
+        os.path.join(folder_path, file) for file in os.listdir(folder_path)
+        if file.endswith('.xlsx') or file.endswith('.xls')
+    )
+
+class ArchiveReport:
+    """Отчет внутри ZIP-архива; читается из архива в память, без распаковки на диск"""
+    __slots__ = ('archive_path', 'entry_name', 'name')
+
+    def __init__(self, archive_path, entry_name, name=None):
+        self.archive_path = archive_path
+        self.entry_name = entry_name  # Имя записи в архиве, как его возвращает zipfile
+        self.name = name or entry_name
+
+    @property
+    def path(self):
+        """Условный путь отчета: по нему определяются имя файла, ФИО и класс"""
+        return os.path.join(self.archive_path, self.name)
+
+    def __repr__(self):
+        return f"<ArchiveReport({self.path!r})>"
+
+def _archive_entry_name(info):
+    """Имя записи архива; архивы Windows хранят кириллицу в кодировке cp866 без флага UTF-8"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('cp866')
+    except UnicodeError:
+        return info.filename
+
+def list_archive_reports(archive_path):
+    """Возвращает Excel-отчеты из ZIP-архива, не распаковывая их"""
+    reports = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = _archive_entry_name(info)
+            if info.is_dir() or name.startswith('__MACOSX/'):
+                continue
+            if name.endswith('.xlsx') or name.endswith('.xls'):
+                reports.append(ArchiveReport(archive_path, info.filename, name))
+    return sorted(reports, key=lambda report: report.path)
+
+def list_report_sources(folder_path):
+    """Excel-файлы папки и отчеты из ZIP-архивов в ней (ArchiveReport) в порядке путей"""
+    sources = list_report_files(folder_path)
+    for file in os.listdir(folder_path):
+        if file.lower().endswith('.zip'):
+            sources.extend(list_archive_reports(os.path.join(folder_path, file)))
+    return sorted(sources, key=_source_path)
+
+def _source_path(source):
+    """Путь отчета: путь к файлу или условный путь отчета в архиве"""
+    return source.path if isinstance(source, ArchiveReport) else source
+
+class _ReportLoader:
+    """Открывает отчеты из файлов и архивов; архивы остаются открытыми до выхода из контекста"""
+
+    def __init__(self):
+        self.archives = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for archive in self.archives.values():
+            archive.close()
+
+    def _archive(self, archive_path):
+        if archive_path not in self.archives:
+            self.archives[archive_path] = zipfile.ZipFile(archive_path)
+        return self.archives[archive_path]
+
+    def open(self, source):
+        """Открывает отчет как двоичный файл (для хэша содержимого)"""
+        if isinstance(source, ArchiveReport):
+            return self._archive(source.archive_path).open(source.entry_name)
+        return open(source, 'rb')
+
+    def load(self, source):
+        """Данные для разбора в пуле процессов: путь к файлу или содержимое отчета из архива"""
+        if not isinstance(source, ArchiveReport):
+            return source
+        archive = self._archive(source.archive_path)
+        max_size = get_config()['MAX_CONTENT_LENGTH']
+        if archive.getinfo(source.entry_name).file_size > max_size:
+            raise ValueError(f"Отчет в архиве больше {max_size // (1024 * 1024)} МБ")
+        return archive.read(source.entry_name)
+
+def _cell_value(value):
     """
-    Анализирует Excel-файлы с успеваемостью и выявляет учеников с задолженностями
-    и тройками по профильным предметам
+    Приводит значение ячейки к общему виду для обоих движков чтения.
     
-    Args:
-        folder_path: путь к папке с Excel-файлами
-        class_name: название класса (если указано, используются профильные предметы этого класса)
+    Пустые ячейки - None, числа - float, даты - datetime; так результаты
+    не зависят от того, как pandas вывел тип колонки.
+    """
+    if isinstance(value, str):
+        return value
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, numbers.Number) and not isinstance(value, (bool, np.bool_)):
+        return float(value)
+    return value
+
+def _header_student_name(header_rows):
+    """ФИО ученика из первой строки шапки или None, если его там нет"""
+    first_row = header_rows[0] if header_rows else []
+    
+    # ФИО ученика обычно в ячейке D1, иначе ищем в других ячейках первой строки
+    if len(first_row) > 3 and first_row[3] is not None:
+        return str(first_row[3])
+    for val in first_row:
+        if val is not None and len(str(val).split()) >= 2:
+            return str(val)
+    return None
+
+def _file_student_name(file_path):
+    """ФИО ученика, извлеченное из имени файла"""
+    filename = os.path.basename(file_path)
+    name_match = STUDENT_NAME_IN_FILENAME_RE.search(filename)
+    if name_match:
+        return name_match.group(1).strip()
+    return os.path.splitext(filename)[0]
+
+def _find_student_name(header_rows, file_path):
+    """Определяет ФИО ученика по шапке отчета или по имени файла"""
+    return _header_student_name(header_rows) or _file_student_name(file_path)
+
+def _header_class_name(header_rows):
+    """Класс из первых двух строк шапки или None"""
+    for row in header_rows[:2]:
+        for val in row:
+            if val is not None and CLASS_NAME_RE.match(str(val)):
+                return str(val)
+    return None
+
+def _file_class_name(file_path):
+    """Класс, извлеченный из имени файла"""
+    class_match = CLASS_NAME_RE.search(os.path.basename(file_path))
+    if class_match:
+        return class_match.group(0)
+    return "Неизвестный класс"
+
+def _find_class_name(header_rows, file_path):
+    """Определяет класс по первым двум строкам отчета или по имени файла"""
+    return _header_class_name(header_rows) or _file_class_name(file_path)
+
+def _problem_record(subject, period, date, grade, problem_type):
+    """Формирует запись о проблеме с успеваемостью (ФИО и класс добавляются при сборке результата)"""
+    return {
+        'Предмет': subject,
+        'Период промежуточной аттестации': period,
+        'Дата промежуточной аттестации': date,
+        'Итоговая отметка': grade,
+        'Тип проблемы': problem_type
+    }
+
+# Строки шапки отчета и строка заголовков таблицы успеваемости (с нуля)
+REPORT_HEADER_ROWS = 5
+REPORT_TABLE_HEADER_ROW = 3
+
+def _header_rows(rows):
+    """Строки шапки одинаковой длины со значениями в общем виде"""
+    width = max((len(row) for row in rows), default=0)
+    return [[_cell_value(val) for val in row] + [None] * (width - len(row)) for row in rows]
+
+# Этапы разбора отчета, время которых замеряется для каждого файла
+REPORT_STAGES = ('open', 'header', 'body', 'classify')
+
+@contextmanager
+def _stage(timings, name):
+    """Добавляет время выполнения блока к timings[name] (секунды)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+def load_report(file_path, timings=None):
+    """
+    Загружает отчет об успеваемости за одно чтение файла (движок pandas).
+    
+    Первый лист читается целиком один раз, из него выделяются шапка, дата
+    актуальности, ФИО, класс и таблица успеваемости. Если передан словарь timings,
+    в него записывается время этапов open, header и body.
     
     Returns:
-        students_with_problems: список словарей с данными учеников и их проблемами
+        словарь с ключами file_path, header (DataFrame), header_rows (списки ячеек),
+        actuality_date (None, если даты нет), student_name, class_name (найденный в файле) и grades
     """
-    # Получаем список профильных предметов для указанного класса, если класс указан
-    subjects_of_interest = []
-    if class_name:
-        subjects_of_interest = get_profile_subjects_for_class(class_name)
+    timings = {} if timings is None else timings
+    with _stage(timings, 'open'):
+        raw = pd.read_excel(file_path, sheet_name=0, header=None)
     
-    # Если профильные предметы не найдены (или класс не указан), используем предметы по умолчанию
-    if not subjects_of_interest:
-        subjects_of_interest = [
-            'Алгебра', 'Геометрия', 'Физика', 'Информатика', 
-            'Вероятность и статистика', 'Труд (технология)'
-        ]
+    with _stage(timings, 'header'):
+        header = raw.iloc[:REPORT_HEADER_ROWS]
+        header_rows = _header_rows(header.values.tolist())
+        report = {
+            'file_path': file_path,
+            'header': header,
+            'header_rows': header_rows,
+            'actuality_date': extract_actuality_date(header_rows),
+            'student_name': _find_student_name(header_rows, file_path),
+            'class_name': _find_class_name(header_rows, file_path)
+        }
     
-    # Списки для хранения результатов
-    students_with_threes = []
-    students_with_failures = []
+    with _stage(timings, 'body'):
+        # Таблица начинается после строки заголовков; типы колонок выводим заново,
+        # как если бы таблица читалась отдельно (оценки - числа, а не object)
+        grades = raw.iloc[REPORT_TABLE_HEADER_ROW + 1:].reset_index(drop=True).infer_objects()
+        grades.columns = REPORT_COLUMNS
+    
+    report['grades'] = grades
+    return report
+
+@contextmanager
+def _open_report_openpyxl(file_path, timings=None):
+    """
+    Читает отчет потоково через openpyxl в режиме read_only, без DataFrame.
+    
+    Возвращает (report, итератор строк таблицы успеваемости); строки читаются
+    из файла по мере обхода итератора, пока открыт контекст. Если передан словарь
+    timings, в него записывается время этапов open и header, а в body - время
+    чтения строк таблицы при обходе итератора.
+    """
+    timings = {} if timings is None else timings
+    with _stage(timings, 'open'):
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        with _stage(timings, 'open'):
+            sheet = workbook.worksheets[0]
+            if sheet.max_column is not None and sheet.max_column != len(REPORT_COLUMNS):
+                raise ValueError(f"Ожидалось {len(REPORT_COLUMNS)} колонок, в отчете {sheet.max_column}")
+        
+        with _stage(timings, 'header'):
+            rows = sheet.iter_rows(values_only=True)
+            header_rows = _header_rows([list(row) for row in islice(rows, REPORT_HEADER_ROWS)])
+            report = {
+                'file_path': file_path,
+                'actuality_date': extract_actuality_date(header_rows),
+                'header_rows': header_rows
+            }
+        
+        # Строки шапки после строки заголовков уже относятся к таблице
+        table_rows = chain(header_rows[REPORT_TABLE_HEADER_ROW + 1:], rows)
+        width = len(REPORT_COLUMNS)
+        timings['body'] = 0.0
+        yield report, _timed_rows((
+            [_cell_value(val) for val in row[:width]] + [None] * (width - len(row))
+            for row in table_rows
+        ), timings)
+    finally:
+        workbook.close()
+
+def _timed_rows(rows, timings):
+    """Строки таблицы; время их чтения из файла добавляется к timings['body']"""
+    while True:
+        start = time.perf_counter()
+        row = next(rows, None)
+        timings['body'] += time.perf_counter() - start
+        if row is None:
+            return
+        yield row
+
+def _detect_problems(rows, subjects_of_interest, actuality_date):
+    """
+    Ищет тройки и задолженности в строках таблицы успеваемости (построчно, для потокового чтения).
     
-    # Получение списка всех файлов Excel в указанной папке
-    print(f"Получаем список всех файлов в папке: {folder_path}")
-    files_list = [os.path.join(folder_path, file) for file in os.listdir(folder_path) 
-                 if file.endswith('.xlsx') or file.endswith('.xls')]
-    print(f"Найдено {len(files_list)} файлов Excel для обработки.")
+    Returns:
+        события в порядке строк: ('problem', запись) или ('improved', предмет)
+    """
+    events = []
+    previous_grade = None
+    current_subject = None
     
+    for subject, period, date, _, _, current_grade in rows:
+        # Если в колонке 'Предмет' есть значение, это название нового предмета
+        if subject is not None:
+            current_subject = subject
+            previous_grade = None  # Сброс предыдущей оценки при смене предмета
+        
+        if current_subject not in subjects_of_interest:
+            continue
+        
+        if current_grade is None or current_grade == '':
+            # Модуль завершился до даты актуальности, а оценки нет - это задолженность
+            if date:
+                module_date = parse_module_date(date)
+                if module_date and module_date < actuality_date:
+                    events.append(('problem', _problem_record(
+                        current_subject, period, date,
+                        'Н/А', 'Задолженность (не выставлена оценка)'  # Не аттестован
+                    )))
+            continue
+        
+        # Проверка на задолженность (оценка < 3)
+        if current_grade < 3:
+            events.append(('problem', _problem_record(
+                current_subject, period, date, current_grade, 'Задолженность'
+            )))
+        
+        if previous_grade == 3 and current_grade > 3:
+            # Тройка исправлена следующей оценкой - исключаем ее
+            events.append(('improved', current_subject))
+        elif current_grade == 3:
+            events.append(('problem', _problem_record(
+                current_subject, period, date, current_grade, 'Тройка'
+            )))
+        
+        previous_grade = current_grade
+    
+    return events
 
+def _detect_problems_frame(grades, subjects_of_interest, actuality_date):
     """
-    Анализирует Excel-файлы с успеваемостью и выявляет учеников с задолженностями
-    и тройками по профильным предметам
+    Ищет тройки и задолженности в таблице успеваемости операциями над колонками.
+    
+    Правила те же, что в _detect_problems: предмет указан только в первой строке
+    своего блока, оценка сравнивается с предыдущей выставленной оценкой того же блока.
+    
+    Returns:
+        события в порядке строк: ('problem', запись) или ('improved', предмет)
     """
-    # Начало функции остается без изменений...
+    subject_cells = grades['Предмет'].to_numpy(dtype=object)
+    period_cells = grades['Период промежуточной аттестации'].to_numpy(dtype=object)
+    date_cells = grades['Дата промежуточной аттестации'].to_numpy(dtype=object)
+    grade_cells = grades['Итоговая отметка'].to_numpy(dtype=object)
     
-    for file_path in files_list:
-        # Загрузка данных из файла
-        print(f"Загружаем файл: {file_path}")
-        try:
-            excel_data = pd.ExcelFile(file_path)
-            sheet_name = excel_data.sheet_names[0]
-            print(f"Используем лист: {sheet_name}")
-            
-            # Читаем первые несколько строк для анализа структуры
-            header_data = pd.read_excel(file_path, sheet_name=sheet_name, nrows=5, header=None)
-            
-            # Выводим первые строки для отладки
-            print("Структура первой строки:")
-            for i in range(min(5, header_data.shape[1])):
+    # Блок предмета начинается со строки, где заполнена колонка 'Предмет';
+    # предмет строки - предмет ее блока (аналог ffill)
+    has_subject = ~pd.isna(subject_cells)
+    block = np.cumsum(has_subject)
+    block_subjects = subject_cells[has_subject]
+    block_of_interest = np.array([False] + [subject in subjects_of_interest for subject in block_subjects])
+    of_interest = block_of_interest[block]
+    if not of_interest.any():
+        return []
+    
+    no_grade = pd.isna(grade_cells) | (grade_cells == '')
+    graded_rows = np.flatnonzero(of_interest & ~no_grade)
+    if not all(isinstance(value, numbers.Number) for value in grade_cells[graded_rows]):
+        raise TypeError("Итоговая отметка должна быть числом")
+    graded = grade_cells[graded_rows].astype(float)
+    
+    # Предыдущая выставленная оценка в том же блоке (сдвиг внутри группы блока,
+    # строки без оценки пропускаются)
+    graded_blocks = block[graded_rows]
+    previous = np.full(len(graded), np.nan)
+    same_block = graded_blocks[1:] == graded_blocks[:-1]
+    previous[1:][same_block] = graded[:-1][same_block]
+    
+    failure = graded < 3
+    improved = (previous == 3) & (graded > 3)
+    three = (graded == 3) & ~improved
+    
+    # Оценки нет, а модуль завершился до даты актуальности - задолженность
+    # (даты всех таких строк разбираются одним вызовом)
+    candidate_rows = np.flatnonzero(of_interest & no_grade & ~pd.isna(date_cells))
+    module_dates = parse_module_dates(date_cells[candidate_rows])
+    missing_rows = candidate_rows[(module_dates < actuality_date).to_numpy()].tolist()
+    
+    flagged = np.flatnonzero(failure | improved | three)
+    row_events = [(graded_rows[i], i) for i in flagged] + [(row, None) for row in missing_rows]
+    
+    events = []
+    for row, i in sorted(row_events):
+        current_subject = _cell_value(block_subjects[block[row] - 1])
+        period, date = _cell_value(period_cells[row]), _cell_value(date_cells[row])
+        if i is None:
+            events.append(('problem', _problem_record(
+                current_subject, period, date,
+                'Н/А', 'Задолженность (не выставлена оценка)'  # Не аттестован
+            )))
+            continue
+        
+        current_grade = float(graded[i])
+        if failure[i]:
+            events.append(('problem', _problem_record(
+                current_subject, period, date, current_grade, 'Задолженность'
+            )))
+        if improved[i]:
+            events.append(('improved', current_subject))
+        elif three[i]:
+            events.append(('problem', _problem_record(
+                current_subject, period, date, current_grade, 'Тройка'
+            )))
+    
+    return events
+
+# Версия правил разбора отчетов; увеличивается при любом изменении результата разбора,
+# чтобы не использовать устаревшие записи кэша
+PARSER_VERSION = 1
+
+def read_report_events(file_path, subjects_of_interest, engine='pandas'):
+    """
+    Читает отчет и ищет в нем проблемы, не используя имя файла.
+    
+    Результат зависит только от содержимого файла и списка предметов, поэтому
+    его можно кэшировать по хэшу содержимого (см. utils/parse_cache.py).
+    
+    Returns:
+        словарь: student_name и class_name из шапки (None, если их там нет),
+        actuality_date (None, если ее нет) и events - события в порядке строк:
+        ('problem', запись без ФИО и класса) или ('improved', предмет),
+        timings - время этапов разбора в секундах (см. REPORT_STAGES)
+    """
+    timings = {}
+    if engine == 'openpyxl':
+        reader, detect_problems = _open_report_openpyxl(file_path, timings), _detect_problems
+    elif engine == 'pandas':
+        report = load_report(file_path, timings)
+        reader, detect_problems = nullcontext((report, report['grades'])), _detect_problems_frame
+    else:
+        raise ValueError(f"Неизвестный движок чтения отчетов: {engine}")
+    
+    with reader as (report, table):
+        body_before = timings['body']
+        with _stage(timings, 'classify'):
+            # Без даты актуальности считаем данные актуальными на текущий момент
+            events = detect_problems(table, subjects_of_interest, report['actuality_date'] or datetime.now())
+        # При потоковом чтении строки таблицы читаются во время поиска проблем и учтены в body
+        timings['classify'] -= timings['body'] - body_before
+    
+    return {
+        'student_name': _header_student_name(report['header_rows']),
+        'class_name': _header_class_name(report['header_rows']),
+        'actuality_date': report['actuality_date'],
+        'events': events,
+        'timings': timings
+    }
+
+def _complete_file_result(report_events, file_path, class_name=None):
+    """Дополняет результат чтения отчета ФИО и классом (из шапки, параметров или имени файла)"""
+    student_name = report_events['student_name'] or _file_student_name(file_path)
+    current_class = class_name or report_events['class_name'] or _file_class_name(file_path)
+    
+    events = [
+        (kind, {'ФИО ученика': student_name, 'Класс': current_class, **payload} if kind == 'problem' else payload)
+        for kind, payload in report_events['events']
+    ]
+    
+    return {
+        'file_path': file_path,
+        'student_name': student_name,
+        'class_name': current_class,
+        'actuality_date': report_events['actuality_date'],
+        'events': events,
+        'timings': report_events.get('timings')
+    }
+
+def parse_report_file(file_path, subjects_of_interest, class_name=None, engine='pandas'):
+    """
+    Разбирает один файл отчета об успеваемости.
+    
+    Функция не обращается к базе данных и не зависит от других файлов, поэтому
+    может выполняться в отдельном процессе.
+    
+    Args:
+        file_path: путь к Excel-файлу
+        subjects_of_interest: предметы, по которым ищутся проблемы
+        class_name: класс (если не указан, определяется по файлу)
+        engine: 'pandas' или 'openpyxl' (потоковое чтение без DataFrame)
+    
+    Returns:
+        словарь с ФИО, классом, датой актуальности (None, если ее нет в файле) и
+        событиями в порядке строк отчета: ('problem', запись) или
+        ('improved', предмет) - тройка по предмету исправлена
+    """
+    report_events = read_report_events(file_path, subjects_of_interest, engine)
+    return _complete_file_result(report_events, file_path, class_name)
+
+def _read_report_events_safe(file_path, subjects_of_interest, engine):
+    """Читает отчет (путь или содержимое файла), возвращая ошибку вместо исключения (для пула процессов)"""
+    try:
+        if isinstance(file_path, bytes):
+            file_path = io.BytesIO(file_path)
+        return read_report_events(file_path, subjects_of_interest, engine)
+    except Exception as e:
+        return {'error': str(e)}
+
+def _load_safe(loader, source):
+    """Данные отчета для разбора или результат с ошибкой, если отчет не удалось прочитать"""
+    try:
+        return loader.load(source), None
+    except Exception as e:
+        return None, {'error': str(e)}
+
+def _pool_context():
+    """
+    Способ запуска процессов пула. Анализ выполняется в потоке веб-приложения, а fork
+    многопоточного процесса может унаследовать захваченные блокировки и зависнуть,
+    поэтому процессы запускаются через forkserver (или spawn, где его нет).
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+def _read_files(file_paths, subjects_of_interest, workers, engine):
+    """
+    Читает отчеты в пуле процессов; результаты выдаются по мере готовности в порядке file_paths.
+    
+    file_paths может быть итератором, отчеты которого поступают по ходу загрузки:
+    каждый отчет отправляется в пул сразу после поступления. В пул отправляется
+    не больше ANALYSIS_MAX_INFLIGHT отчетов сразу: отчеты из архивов читаются в память
+    непосредственно перед отправкой, поэтому большой архив не загружается в память целиком.
+    
+    Первый отчет разбирается последовательно: пул запускается, только когда поступает
+    второй, поэтому один загруженный файл не порождает процессов.
+    """
+    max_inflight = max(workers, get_config()['ANALYSIS_MAX_INFLIGHT'])
+    if hasattr(file_paths, '__len__'):
+        workers = min(workers, len(file_paths) - 1)
+    sources = iter(file_paths)
+    pending = deque()  # (отчет, задача пула или готовая ошибка чтения) в порядке file_paths
+    
+    with _ReportLoader() as loader:
+        first = next(sources, None)
+        if first is None:
+            return
+        data, error = _load_safe(loader, first)
+        yield error or _read_report_events_safe(data, subjects_of_interest, engine)
+        
+        second = next(sources, None)
+        if second is None:
+            return
+        sources = chain([second], sources)
+        
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+                    exhausted = False
+                    while pending or not exhausted:
+                        item = pending[0][1] if pending else None
+                        ready = isinstance(item, dict) or (item is not None and item.done())
+                        if not ready and not exhausted and len(pending) < max_inflight:
+                            # Пока первый результат не готов, отправляем в пул следующий отчет
+                            source = next(sources, None)
+                            if source is None:
+                                exhausted = True
+                                continue
+                            data, error = _load_safe(loader, source)
+                            pending.append((source, error or executor.submit(
+                                _read_report_events_safe, data, subjects_of_interest, engine
+                            )))
+                            continue
+                        result = item if isinstance(item, dict) else item.result()
+                        pending.popleft()
+                        yield result
+                return
+            except (OSError, BrokenProcessPool) as e:
+                # Пул процессов недоступен (например, ограничения окружения) - разбираем последовательно
+                logger.warning("Пул процессов недоступен, файлы будут разобраны последовательно: %s", e)
+        
+        # Отчеты, уже полученные из пула, повторно не разбираем
+        for source in chain([source for source, _ in pending], sources):
+            data, error = _load_safe(loader, source)
+            yield error or _read_report_events_safe(data, subjects_of_interest, engine)
+
+def _file_result(report_events, file_path, class_name):
+    """Результат файла для сборки: ошибка разбора или события с ФИО и классом"""
+    if 'error' in report_events:
+        return {'file_path': file_path, 'error': report_events['error']}
+    return _complete_file_result(report_events, file_path, class_name)
+
+def _iter_parsed_files(file_paths, subjects_of_interest, class_name, workers, engine, cache=None, progress=None):
+    """
+    Разбирает отчеты, беря неизменившиеся из кэша, и выдает (индекс в file_paths, результат)
+    по мере готовности.
+    
+    file_paths может быть итератором (например, очередью загружаемых файлов): разбор
+    начинается с первого поступившего отчета. Для отчетов из кэша стоимость - один хэш
+    содержимого, остальные разбираются в пуле процессов, пока вызывающий код обрабатывает
+    уже готовые результаты. progress(обработано, всего) вызывается в начале и после
+    каждого отчета; для итератора "всего" - число поступивших отчетов. У результатов
+    из кэша нет времени этапов разбора (timings - None).
+    """
+    total = len(file_paths) if hasattr(file_paths, '__len__') else None
+    received = []   # Поступившие отчеты по индексу
+    keys = {}
+    missing = []    # Индексы отчетов, отправленных на разбор, в порядке отправки
+    hits = deque()  # (индекс, результат из кэша), еще не выданные
+    processed = 0
+    
+    def report_progress():
+        if progress is not None:
+            progress(processed, len(received) if total is None else total)
+    
+    def sources_to_parse(loader):
+        """Отчеты, которых нет в кэше; найденные в кэше откладываются в hits"""
+        for source in file_paths:
+            index = len(received)
+            received.append(source)
+            cached = None
+            if cache is not None:
                 try:
-                    val = header_data.iloc[0, i]
-                    print(f"  Ячейка {i+1}: {val}")
-                except:
-                    print(f"  Ячейка {i+1}: недоступна")
-            
-            # Пытаемся получить ФИО ученика из ячейки D1 (индекс 3)
-            if header_data.shape[1] > 3:  # Убедимся, что есть 4-я колонка
-                student_name = str(header_data.iloc[0, 3])
-                if student_name == 'nan' or pd.isna(student_name):
-                    # Если ячейка D1 пуста, ищем ФИО в других ячейках первой строки
-                    for i in range(header_data.shape[1]):
-                        val = str(header_data.iloc[0, i])
-                        if len(val.split()) >= 2 and val != 'nan' and not pd.isna(val):
-                            student_name = val
-                            print(f"Найдено ФИО в ячейке {i+1}: {student_name}")
-                            break
-                else:
-                    print(f"Найдено ФИО ученика в ячейке D1: {student_name}")
+                    with loader.open(source) as file:
+                        keys[index] = cache.make_key(file, PARSER_VERSION, sorted(subjects_of_interest))
+                    cached = cache.get(keys[index])
+                except (OSError, zipfile.BadZipFile):
+                    pass  # Отчет не читается - ошибку покажет разбор
+            if cached is None:
+                missing.append(index)
+                yield source
             else:
-                # Если нет 4-й колонки, ищем в других ячейках
-                student_name = "Неизвестный ученик"
-                for i in range(header_data.shape[1]):
-                    val = str(header_data.iloc[0, i])
-                    if len(val.split()) >= 2 and val != 'nan' and not pd.isna(val):
-                        student_name = val
-                        print(f"Найдено ФИО в ячейке {i+1}: {student_name}")
-                        break
-            
-            # Если не удалось найти ФИО, пробуем извлечь из имени файла
-            if student_name == "Неизвестный ученик" or student_name == 'nan':
-                # Извлекаем имя из имени файла
-                filename = os.path.basename(file_path)
-                name_match = re.search(r'Отчёт об успеваемости\.\s*(.*?)\s*\.\s*\d+', filename)
-                if name_match:
-                    student_name = name_match.group(1).strip()
-                    print(f"Извлечено ФИО из имени файла: {student_name}")
-                else:
-                    student_name = os.path.splitext(os.path.basename(file_path))[0]
-                    print(f"Используем имя файла как ФИО: {student_name}")
+                hits.append((index, cached))
+    
+    report_progress()
+    with _ReportLoader() as loader:
+        parsed = _read_files(sources_to_parse(loader), subjects_of_interest, workers, engine)
+        for position, result in enumerate(chain(parsed, [None])):
+            while hits:
+                index, cached = hits.popleft()
+                processed += 1
+                report_progress()
+                yield index, _file_result({**cached, 'timings': None}, _source_path(received[index]), class_name)
+            if result is None:
+                break
             
-            # Получаем класс из данных или используем переданный класс
-            if not class_name:
-                # Если класс не указан в параметрах, ищем в таблице или имени файла
-                file_class = "Неизвестный класс"
-                
-                # Ищем класс в таблице
-                for i in range(min(2, header_data.shape[0])):
-                    for j in range(header_data.shape[1]):
-                        try:
-                            val = str(header_data.iloc[i, j])
-                            if re.match(r'\d+[А-Я]', val):
-                                file_class = val
-                                print(f"Найден класс в таблице: {file_class}")
-                                break
-                        except:
-                            continue
-                
-                # Если не нашли в таблице, ищем в имени файла
-                if file_class == "Неизвестный класс":
-                    filename = os.path.basename(file_path)
-                    class_match = re.search(r'(\d+[А-Я])', filename)
-                    if class_match:
-                        file_class = class_match.group(1)
-                        print(f"Извлечен класс из имени файла: {file_class}")
-                
-                current_class = file_class
+            index = missing[position]
+            processed += 1
+            report_progress()
+            if 'error' in result:
+                logger.warning("Ошибка при обработке файла %s: %s", _source_path(received[index]), result['error'])
             else:
-                current_class = class_name
-            
-            print(f"Итоговые данные для анализа: ФИО ученика: '{student_name}', Класс: '{current_class}'")
-            
-            # Чтение данных об успеваемости - остальная часть кода не меняется
-            data = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=3)
-            
-            # Извлекаем дату актуальности данных из второй строки файла
-            actuality_date = extract_actuality_date(header_data)
-            if actuality_date:
-                print(f"Извлечена дата актуальности данных: {actuality_date.strftime('%d.%m.%Y')}")
+                logger.debug("Файл %s разобран за %.3f с: %s", _source_path(received[index]),
+                             sum(result['timings'].values()),
+                             ', '.join(f'{stage} {seconds:.3f}' for stage, seconds in result['timings'].items()))
+            # Без даты актуальности результат зависит от текущей даты - такие файлы не кэшируем
+            if index in keys and 'error' not in result and result['actuality_date'] is not None:
+                cache.put(keys[index], result)
+            yield index, _file_result(result, _source_path(received[index]), class_name)
+    
+    if cache is not None and missing:
+        cache.evict()
+
+def _parse_files(file_paths, subjects_of_interest, class_name, workers, engine, cache=None, progress=None):
+    """Разбирает отчеты (см. _iter_parsed_files); результаты в порядке поступления отчетов"""
+    results = dict(_iter_parsed_files(file_paths, subjects_of_interest, class_name, workers, engine,
+                                      cache, progress))
+    return [results[index] for index in range(len(results))]
+
+def _merge_file_results(file_results):
+    """
+    Собирает проблемы всех файлов, применяя события каждого файла по порядку строк.
+    
+    Тройки хранятся по порядковому номеру с индексом по (ученик, предмет), поэтому
+    исключение исправленных троек не требует просмотра всего списка.
+    """
+    threes = {}             # порядковый номер -> запись о тройке (в порядке добавления)
+    threes_by_subject = {}  # (ученик, предмет) -> порядковые номера его троек
+    sequence = count()
+    students_with_failures = []
+    
+    for file_result in file_results:
+        student_name = file_result['student_name']
+        for kind, payload in file_result['events']:
+            if kind == 'improved':
+                # Тройка по предмету исправлена - исключаем тройки ученика по нему
+                for number in threes_by_subject.pop((student_name, payload), ()):
+                    del threes[number]
+            elif payload['Тип проблемы'] == 'Тройка':
+                number = next(sequence)
+                threes[number] = payload
+                threes_by_subject.setdefault((student_name, payload['Предмет']), []).append(number)
             else:
-                print("Не удалось извлечь дату актуальности данных, используем текущую дату")
-                from datetime import datetime
-                actuality_date = datetime.now()
-            # Переименование колонок и анализ данных - без изменений...
-            
-            # Переименовываем колонки для удобства
-            data.columns = [
-                'Предмет',
-                'Период промежуточной аттестации',
-                'Дата промежуточной аттестации',
-                'Отметки',
-                'Средневзвешенный балл',
-                'Итоговая отметка'
-            ]
-            
-            # Проходим по всем строкам и ищем тройки и задолженности
-            previous_grade = None
-            current_subject = None
-            
-            for index, row in data.iterrows():
-                # Если в колонке 'Предмет' есть значение, это название нового предмета
-                if pd.notna(row['Предмет']):
-                    current_subject = row['Предмет']
-                    previous_grade = None  # Сброс предыдущей оценки при смене предмета
-                    print(f"Обрабатываем предмет: {current_subject}")
-                
-                # Проверяем, интересующий ли нас предмет, и существует ли оценка 'Итоговая отметка'
-                if current_subject in subjects_of_interest and pd.notna(row['Итоговая отметка']):
-                    current_grade = row['Итоговая отметка']
-                    
-                    # Проверка на задолженность (оценка < 3)
-                    if current_grade < 3:
-                        students_with_failures.append({
-                            'ФИО ученика': student_name,
-                            'Класс': current_class,
-                            'Предмет': current_subject,
-                            'Период промежуточной аттестации': row['Период промежуточной аттестации'],
-                            'Дата промежуточной аттестации': row['Дата промежуточной аттестации'],
-                            'Итоговая отметка': current_grade,
-                            'Тип проблемы': 'Задолженность'
-                        })
-                    
-                    # Логика исключения, если следующая оценка выше тройки
-                    if previous_grade == 3 and current_grade > 3:
-                        # Если предыдущая оценка была тройкой, но следующая улучшилась - исключаем
-                        students_with_threes = [entry for entry in students_with_threes if not (
-                            entry['ФИО ученика'] == student_name and 
-                            entry['Предмет'] == current_subject and 
-                            entry['Итоговая отметка'] == 3
-                        )]
-                    elif current_grade == 3:
-                        # Добавляем запись, если текущая оценка - тройка
-                        students_with_threes.append({
-                            'ФИО ученика': student_name,
-                            'Класс': current_class,
-                            'Предмет': current_subject,
-                            'Период промежуточной аттестации': row['Период промежуточной аттестации'],
-                            'Дата промежуточной аттестации': row['Дата промежуточной аттестации'],
-                            'Итоговая отметка': current_grade,
-                            'Тип проблемы': 'Тройка'
-                        })
-                    # Проверка ОТСУТСТВУЮЩИХ оценок (добавить этот блок внутри цикла)
-                    elif (pd.isna(row['Итоговая отметка']) or row['Итоговая отметка'] == ''):
-                        # Проверяем, есть ли дата завершения модуля
-                        if pd.notna(row['Дата промежуточной аттестации']) and row['Дата промежуточной аттестации']:
-                            # Преобразуем дату завершения модуля в datetime
-                            module_date = parse_module_date(row['Дата промежуточной аттестации'])
-                            
-                            # Если модуль завершился до даты актуальности, а оценки нет - это задолженность
-                            if module_date and module_date < actuality_date:
-                                students_with_failures.append({
-                                    'ФИО ученика': student_name,
-                                    'Класс': current_class,
-                                    'Предмет': current_subject,
-                                    'Период промежуточной аттестации': row['Период промежуточной аттестации'],
-                                    'Дата промежуточной аттестации': row['Дата промежуточной аттестации'],
-                                    'Итоговая отметка': 'Н/А',  # Не аттестован
-                                    'Тип проблемы': 'Задолженность (не выставлена оценка)'
-                                })
-                                print(f"Найдена задолженность по невыставленной оценке: {student_name}, {current_subject}, {row['Период промежуточной аттестации']}")
-                    # Обновляем предыдущую оценку
-                    previous_grade = current_grade
-        
-        except Exception as e:
-            print(f"Ошибка при обработке файла {file_path}: {str(e)}")
+                students_with_failures.append(payload)
+    
+    # Сначала тройки, затем задолженности
+    return list(threes.values()) + students_with_failures
+
+def _analysis_options(workers, engine, cache):
+    """Число процессов, движок чтения и кэш разбора с учетом значений по умолчанию из конфигурации"""
+    config = get_config()
+    if workers is None:
+        workers = config['ANALYSIS_WORKERS'] or os.cpu_count() or 1
+    engine = engine or config['ANALYSIS_ENGINE']
+    if cache is None:
+        cache = get_parse_cache()
+    return workers, engine, cache or None
+
+def analyze_report_files(file_paths, class_name=None, workers=None, engine=None, cache=None, progress=None):
+    """
+    Анализирует файлы отчетов, разбирая их параллельно в пуле процессов.
+    
+    Args:
+        file_paths: пути к Excel-файлам или отчеты из архивов (ArchiveReport, см. list_report_sources);
+                    может быть итератором отчетов, поступающих по ходу загрузки
+        class_name: название класса (если указано, используются профильные предметы этого класса);
+                    WHOLE_SCHOOL_CLASS_NAME - анализ всей школы (см. analyze_school_files)
+        workers: число процессов; по умолчанию ANALYSIS_WORKERS из конфигурации,
+                 1 - последовательный разбор в текущем процессе (для отладки)
+        engine: движок чтения 'pandas' или 'openpyxl'; по умолчанию ANALYSIS_ENGINE из конфигурации
+        cache: кэш результатов разбора (ParseCache); по умолчанию - из конфигурации,
+               False - не использовать кэш
+        progress: функция progress(обработано, всего), вызываемая по мере разбора файлов
+    
+    Returns:
+        словарь: problems - список проблем, errors - список {'file', 'message'}
+                 для файлов, которые не удалось разобрать, files - сведения о разобранных
+                 файлах (file, student_name, class_name, actuality_date и timings - время
+                 этапов разбора в секундах или None для файлов из кэша, см. slowest_files)
+    """
+    if class_name == WHOLE_SCHOOL_CLASS_NAME:
+        return analyze_school_files(file_paths, workers, engine, cache, progress)
+    
+    workers, engine, cache = _analysis_options(workers, engine, cache)
+    subjects_of_interest = get_subjects_of_interest(class_name)
+    file_results = _parse_files(file_paths, subjects_of_interest, class_name, workers, engine,
+                                cache, progress)
+    
+    errors = [
+        {'file': os.path.basename(result['file_path']), 'message': result['error']}
+        for result in file_results if 'error' in result
+    ]
+    parsed = [result for result in file_results if 'error' not in result]
+    files = [
+        {'file': os.path.basename(result['file_path']), 'student_name': result['student_name'],
+         'class_name': result['class_name'], 'actuality_date': result['actuality_date'],
+         'timings': result['timings']}
+        for result in parsed
+    ]
+    
+    return {'problems': _merge_file_results(parsed), 'errors': errors, 'files': files}
+
+# Класс сессии анализа всей школы: класс каждого файла определяется по самому отчету
+WHOLE_SCHOOL_CLASS_NAME = 'Вся школа'
+
+def get_profile_subjects_by_class():
+    """Профильные предметы всех классов одним запросом: словарь класс -> список предметов"""
+    session = get_session()
+    rows = session.query(ClassProfile.class_name, Subject.name).join(
+        Subject, ClassProfile.subject_id == Subject.id
+    ).order_by(ClassProfile.class_name, ClassProfile.id).all()
+    session.close()
+    
+    profiles = {}
+    for class_name, subject_name in rows:
+        profiles.setdefault(class_name, []).append(subject_name)
+    return profiles
+
+def _class_file_result(file_result, class_name, subjects):
+    """Результат файла с классом class_name и событиями только по предметам subjects"""
+    events = []
+    for kind, payload in file_result['events']:
+        if kind == 'problem' and payload['Предмет'] in subjects:
+            events.append((kind, {**payload, 'Класс': class_name}))
+        elif kind == 'improved' and payload in subjects:
+            events.append((kind, payload))
+    return {**file_result, 'class_name': class_name, 'events': events}
+
+def analyze_school_files(file_paths, workers=None, engine=None, cache=None, progress=None):
+    """
+    Анализирует отчеты учеников разных классов, определяя класс каждого файла по отчету.
+    
+    Профильные предметы всех классов загружаются одним запросом. Файлы разбираются в пуле
+    процессов по объединенному списку предметов; пока разбираются следующие файлы, готовые
+    распределяются по классам, и в них остаются события только по предметам своего класса.
+    События по разным предметам не зависят друг от друга, поэтому результат класса
+    совпадает с анализом его файлов отдельно.
+    
+    Args:
+        file_paths, workers, engine, cache, progress: см. analyze_report_files
+    
+    Returns:
+        словарь как у analyze_report_files и classes - сводка по классам (см. summarize_by_class)
+    """
+    workers, engine, cache = _analysis_options(workers, engine, cache)
+    
+    # Класс из отчета ("10А") сопоставляется с классом профиля ("10 А") по параллели и букве
+    profiles = get_profile_subjects_by_class()
+    profile_classes = {class_sort_key(class_name): class_name for class_name in profiles}
+    all_subjects = set(DEFAULT_SUBJECTS_OF_INTEREST).union(*profiles.values())
+    
+    errors = []
+    class_files = {}  # класс -> [(индекс файла, результат с событиями класса)]
+    for index, file_result in _iter_parsed_files(file_paths, sorted(all_subjects), None, workers, engine,
+                                                 cache, progress):
+        if 'error' in file_result:
+            errors.append((index, {'file': os.path.basename(file_result['file_path']),
+                                   'message': file_result['error']}))
             continue
-    # Проверяем случаи, когда оценка не выставлена за завершенный модуль
-    if current_subject in subjects_of_interest and (pd.isna(row['Итоговая отметка']) or row['Итоговая отметка'] == ''):
-        # Проверяем, есть ли дата завершения модуля
-        if pd.notna(row['Дата промежуточной аттестации']) and row['Дата промежуточной аттестации']:
-            # Преобразуем дату завершения модуля в datetime
-            module_date = parse_module_date(row['Дата промежуточной аттестации'])
-            
-            # Если модуль завершился до даты актуальности, а оценки нет - это задолженность
-            if module_date and module_date < actuality_date:
-                students_with_failures.append({
-                    'ФИО ученика': student_name,
-                    'Класс': current_class,
-                    'Предмет': current_subject,
-                    'Период промежуточной аттестации': row['Период промежуточной аттестации'],
-                    'Дата промежуточной аттестации': row['Дата промежуточной аттестации'],
-                    'Итоговая отметка': 'Н/А',  # Не аттестован
-                    'Тип проблемы': 'Задолженность (не выставлена оценка)'
-                })
-                print(f"Найдена задолженность по невыставленной оценке: {student_name}, {current_subject}, {row['Период промежуточной аттестации']}")
-
-    # Объединяем списки с тройками и задолженностями
-    all_problems = students_with_threes + students_with_failures
-    
-    # Создаем DataFrame для удобного отображения результатов
-    if all_problems:
-        result_df = pd.DataFrame(all_problems)
-        print("Ученики с проблемами по интересующим предметам:")
-        print(result_df[['ФИО ученика', 'Класс', 'Предмет', 'Период промежуточной аттестации', 'Итоговая отметка', 'Тип проблемы']])
         
-        # Возвращаем список с проблемами
-        return all_problems
-    else:
-        print("Не найдено проблем по интересующим предметам.")
-        return []
+        class_name = profile_classes.get(class_sort_key(file_result['class_name']), file_result['class_name'])
+        subjects = profiles.get(class_name) or DEFAULT_SUBJECTS_OF_INTEREST
+        class_files.setdefault(class_name, []).append((index, _class_file_result(file_result, class_name, subjects)))
+    
+    problems, files = [], []
+    for class_name in sorted(class_files, key=class_sort_key):
+        # Внутри класса файлы собираются в исходном порядке, как при анализе одного класса
+        parsed = [file_result for _, file_result in sorted(class_files[class_name], key=lambda item: item[0])]
+        class_problems = _merge_file_results(parsed)
+        problems.extend(class_problems)
+        files.extend(
+            {'file': os.path.basename(result['file_path']), 'student_name': result['student_name'],
+             'class_name': class_name, 'actuality_date': result['actuality_date'],
+             'timings': result['timings']}
+            for result in parsed
+        )
+    
+    return {
+        'problems': problems,
+        'errors': [error for _, error in sorted(errors, key=lambda item: item[0])],
+        'files': files,
+        'classes': summarize_by_class(problems, files)
+    }
+
+def summarize_by_class(problems, files):
+    """
+    Сводка результатов анализа по классам в порядке параллель -> буква.
+    
+    Returns:
+        список словарей: class_name, files - число файлов, students - учеников с проблемами,
+        failed - задолженностей, threes - троек
+    """
+    classes = {}
+    
+    def class_summary(class_name):
+        return classes.setdefault(class_name, {
+            'class_name': class_name, 'files': 0, 'students': set(), 'failed': 0, 'threes': 0
+        })
+    
+    for file in files:
+        class_summary(file['class_name'])['files'] += 1
+    for problem in problems:
+        summary = class_summary(problem['Класс'])
+        summary['students'].add(problem['ФИО ученика'])
+        if problem['Тип проблемы'] == 'Тройка':
+            summary['threes'] += 1
+        else:
+            summary['failed'] += 1
+    
+    return [
+        {**summary, 'students': len(summary['students'])}
+        for class_name, summary in sorted(classes.items(), key=lambda item: class_sort_key(item[0]))
+    ]
+
+def slowest_files(files, limit):
+    """
+    Самые медленно разобранные файлы по сведениям о файлах (analyze_report_files).
+    
+    Returns:
+        не больше limit словарей: file, student_name, total и время этапов REPORT_STAGES
+        в секундах, по убыванию total; файлы из кэша не учитываются
+    """
+    timed = [
+        {'file': file['file'], 'student_name': file['student_name'],
+         'total': sum(file['timings'].values()),
+         **{stage: file['timings'].get(stage, 0.0) for stage in REPORT_STAGES}}
+        for file in files if file.get('timings')
+    ]
+    return sorted(timed, key=lambda file: file['total'], reverse=True)[:limit]
+
+def analyze_excel_files(folder_path, class_name=None, workers=None, engine=None):
+    """
+    Анализирует Excel-файлы с успеваемостью и выявляет учеников с задолженностями
+    и тройками по профильным предметам
+    
+    Args:
+        folder_path: путь к папке с Excel-файлами
+        class_name: название класса (если указано, используются профильные предметы этого класса)
+        workers: число процессов для разбора файлов (см. analyze_report_files)
+        engine: движок чтения отчетов (см. analyze_report_files)
+    
+    Returns:
+        students_with_problems: список словарей с данными учеников и их проблемами
+    """
+    files_list = list_report_sources(folder_path)
+    logger.info("Найдено %d файлов Excel для обработки в папке: %s", len(files_list), folder_path)
+    
+    analysis = analyze_report_files(files_list, class_name, workers, engine)
+    all_problems = analysis['problems']
+    logger.info("Найдено проблем по интересующим предметам: %d", len(all_problems))
+    
+    return all_problems
 
 def save_results_to_csv(results, output_path='students_with_problems.csv'):
     """Сохраняет результаты анализа в CSV-файл"""
     if results:
         result_df = pd.DataFrame(results)
         result_df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        print(f"Результаты сохранены в файл '{output_path}'")
+        logger.info("Результаты сохранены в файл '%s'", output_path)
         return output_path
     else:
-        print("Нет результатов для сохранения.")
+        logger.info("Нет результатов для сохранения.")
         return None
     
-def extract_file_dates(folder_path):
-    """Extracts the earliest and latest dates from Excel files in a folder"""
-    earliest_date = None
-    latest_date = None
+def get_date_range(dates):
+    """Возвращает самую раннюю и самую позднюю из дат, пропуская None"""
+    dates = [date for date in dates if date]
+    if not dates:
+        return None, None
+    return min(dates), max(dates)
+
+def split_appended_files(stored_files, new_files):
+    """
+    Делит новые файлы сессии на принятые и устаревшие.
+    
+    Новые файлы ученика принимаются, если их дата актуальности не раньше даты уже
+    сохраненных файлов этого ученика (файл без даты считается самым старым);
+    тогда результаты ученика заменяются результатами новых файлов.
     
-    files_list = [os.path.join(folder_path, file) for file in os.listdir(folder_path) 
-                 if file.endswith('.xlsx') or file.endswith('.xls')]
+    Args:
+        stored_files: сведения о сохраненных файлах сессии (file, student_name, actuality_date)
+        new_files: сведения о новых разобранных файлах в том же формате
     
-    for file_path in files_list:
+    Returns:
+        (accepted, superseded) - списки сведений о новых файлах
+    """
+    def latest_dates(files):
+        dates = {}
+        for file in files:
+            date = file['actuality_date'] or datetime.min
+            dates[file['student_name']] = max(date, dates.get(file['student_name'], datetime.min))
+        return dates
+    
+    stored_dates = latest_dates(stored_files)
+    new_dates = latest_dates(new_files)
+    accepted_students = {
+        student_name for student_name, date in new_dates.items()
+        if student_name not in stored_dates or date >= stored_dates[student_name]
+    }
+    
+    accepted = [file for file in new_files if file['student_name'] in accepted_students]
+    superseded = [file for file in new_files if file['student_name'] not in accepted_students]
+    return accepted, superseded
+
+def extract_file_dates(folder_path):
+    """Extracts the earliest and latest dates from Excel files in a folder"""
+    dates = []
+    for file_path in list_report_files(folder_path):
         try:
-            # Read header data to extract date
-            header_data = pd.read_excel(file_path, sheet_name=0, nrows=5, header=None)
-            file_date = extract_actuality_date(header_data)
-            
-            if file_date:
-                if earliest_date is None or file_date < earliest_date:
-                    earliest_date = file_date
-                if latest_date is None or file_date > latest_date:
-                    latest_date = file_date
+            dates.append(load_report(file_path)['actuality_date'])
         except Exception as e:
-            print(f"Error extracting date from {file_path}: {str(e)}")
+            logger.warning("Error extracting date from %s: %s", file_path, e)
     
-    return earliest_date, latest_date
\ No newline at end of file
+    return get_date_range(dates)
@@ -16,17 +16,21 @@ def import_students_from_excel(file_path):
                 return {'success': False, 'message': f'В Excel-файле отсутствует обязательный столбец {column}'}
         
         # Преобразуем данные в нужный формат
-        students_data = []
-        for _, row in df.iterrows():
-            students_data.append({
-                'full_name': row['ФИО'],
-                'class_name': str(row['Класс'])
-            })
+        students_data = [
+            {'full_name': full_name, 'class_name': class_name}
+            for full_name, class_name in zip(df['ФИО'], df['Класс'].astype(str))
+        ]
         
         # Добавляем учеников в базу данных
-        added_count = import_students_from_list(students_data)
+        counts = import_students_from_list(students_data)
+        
+        message = f'Успешно импортировано {counts["added"]} учеников'
+        if counts['skipped']:
+            message += f', пропущено уже существующих: {counts["skipped"]}'
+        if counts['invalid']:
+            message += f', пропущено строк без ФИО или класса: {counts["invalid"]}'
         
-        return {'success': True, 'message': f'Успешно импортировано {added_count} учеников'}
+        return {'success': True, 'message': message, **counts}
     
     except Exception as e:
         return {'success': False, 'message': f'Ошибка при импорте: {str(e)}'}
@@ -0,0 +1,116 @@
+# utils/parse_cache.py
+#
+# Дисковый кэш результатов разбора Excel-отчетов.
+# Ключ записи - SHA-256 содержимого файла вместе с версией правил разбора и набором
+# предметов, поэтому одинаковые файлы из разных загрузок используют одну запись.
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+class ParseCache:
+    """Кэш результатов разбора файлов с вытеснением давно не использованных записей (LRU) по размеру"""
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+
+    @staticmethod
+    def file_digest(file_path):
+        """SHA-256 содержимого файла; вместо пути можно передать открытый двоичный файл"""
+        if hasattr(file_path, 'read'):
+            return ParseCache._stream_digest(file_path)
+        with open(file_path, 'rb') as file:
+            return ParseCache._stream_digest(file)
+
+    @staticmethod
+    def _stream_digest(file):
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def make_key(self, file_path, parser_version, subjects):
+        """Ключ записи: хэш содержимого файла (путь или открытый файл), версия разбора и набор предметов"""
+        parts = [self.file_digest(file_path), str(parser_version), *sorted(subjects)]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, f'{key}.pkl')
+
+    def get(self, key):
+        """Возвращает сохраненный результат или None; обращение продлевает жизнь записи"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+            os.utime(path)  # Время изменения файла - время последнего использования
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Поврежденную запись удаляем и разбираем файл заново
+            logger.warning("Не удалось прочитать запись кэша разбора %s: %s", key, e)
+            self._remove(path)
+            return None
+
+    def put(self, key, value):
+        """Сохраняет результат; запись появляется целиком или не появляется вовсе"""
+        descriptor, temp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except Exception:
+            self._remove(temp_path)
+            raise
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока общий размер больше max_bytes"""
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def total_size(self):
+        """Общий размер записей кэша в байтах"""
+        return sum(entry.stat().st_size for entry in os.scandir(self.folder) if entry.name.endswith('.pkl'))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+def get_parse_cache():
+    """Возвращает кэш разбора из конфигурации или None, если кэш отключен"""
+    global _parse_cache
+    config = get_config()
+    if not config['ANALYSIS_CACHE_DIR']:
+        return None
+
+    with _parse_cache_lock:
+        if _parse_cache is None or _parse_cache.folder != config['ANALYSIS_CACHE_DIR']:
+            _parse_cache = ParseCache(config['ANALYSIS_CACHE_DIR'], config['ANALYSIS_CACHE_MAX_BYTES'])
+        return _parse_cache